@@ -1,5 +1,8 @@
 import os
 import re
+import json
+import hashlib
+import argparse
 import pandas as pd
 import logging
 import matplotlib.pyplot as plt
@@ -349,40 +352,55 @@ def join_alarms_outages(df_alarms, df_outages):
     df_merged['backup_minutes'] = df_merged['battery_backup_time'].dt.total_seconds() / 60.0
     return df_merged
 
+def join_alarms_outages_stage(alarmas, outages):
+    df_joined = join_alarms_outages(alarmas, outages)
+    update_log(f"Registros finales en la unión: {len(df_joined)}")
+    return df_joined
+
 ###############################################
 # Exportar la tabla resultante a CSV
 ###############################################
-def export_joined_to_csv(db_file="etl_alarms.db", table_name="alarms_outages_joined", output_csv="resultados_joined.csv"):
+def export_joined_to_csv(db_file="etl_alarms.db", table_name="alarms_outages_joined", output_csv="resultados_joined.csv",
+                         df_joined=None):
     """
-    Recupera los datos de la tabla de unión en SQLite y los exporta a un archivo CSV.
+    Exporta la tabla de unión a un archivo CSV. Si se recibe `df_joined` (el DataFrame
+    ya calculado) se usa directamente; si no, se recupera la tabla desde SQLite.
     """
     try:
-        conn = sqlite3.connect(db_file)
-        query = f"SELECT * FROM {table_name}"
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        df.to_csv(output_csv, index=False)
+        if df_joined is None:
+            conn = sqlite3.connect(db_file)
+            query = f"SELECT * FROM {table_name}"
+            df = pd.read_sql_query(query, conn)
+            conn.close()
+        else:
+            df = df_joined
+        df.to_csv(output_csv, index=False, date_format="%Y-%m-%d %H:%M:%S")
         update_log(f"Datos exportados exitosamente a {output_csv}.")
+        return True
     except Exception as e:
         update_log(f"Error al exportar datos a CSV: {e}")
+        return False
 
 ###############################################
 # Generación de gráfica a partir del JOIN
 ###############################################
-def generate_graph_from_joined(db_file="etl_alarms.db", table_name="alarms_outages_joined"):
+def generate_graph_from_joined(db_file="etl_alarms.db", table_name="alarms_outages_joined", df_joined=None):
     """
-    Recupera los datos de la tabla de unión y genera una gráfica de barras que muestra 
-    el tiempo promedio de respaldo (en minutos) por sitio.
+    Genera una gráfica de barras que muestra el tiempo promedio de respaldo (en minutos)
+    por sitio. Usa `df_joined` si se recibe; si no, recupera la tabla de unión de SQLite.
     """
-    try:
-        conn = sqlite3.connect(db_file)
-        query = f"SELECT * FROM {table_name}"
-        df_db = pd.read_sql_query(query, conn)
-        update_log(f"Datos recuperados de la tabla '{table_name}'.")
-        conn.close()
-    except Exception as e:
-        update_log(f"Error al recuperar datos de la tabla de unión: {e}")
-        return
+    if df_joined is None:
+        try:
+            conn = sqlite3.connect(db_file)
+            query = f"SELECT * FROM {table_name}"
+            df_db = pd.read_sql_query(query, conn)
+            update_log(f"Datos recuperados de la tabla '{table_name}'.")
+            conn.close()
+        except Exception as e:
+            update_log(f"Error al recuperar datos de la tabla de unión: {e}")
+            return False
+    else:
+        df_db = df_joined.copy()
 
     df_db['site_id'] = df_db['site_parsed_alarm']
     df_grouped = df_db.groupby('site_id', as_index=False)['backup_minutes'].mean()
@@ -395,42 +413,150 @@ def generate_graph_from_joined(db_file="etl_alarms.db", table_name="alarms_outag
     plt.xticks(rotation=45, ha='right')
     plt.tight_layout()
     plt.show()
+    return True
+
+###############################################
+# Ejecución por etapas con checkpoints
+###############################################
+class Stage:
+    """
+    Etapa del pipeline.
+      name      nombre único de la etapa
+      func      recibe como argumentos (por nombre) los DataFrames de las etapas de `inputs`
+      inputs    etapas de las que depende
+      files     archivos de entrada; si cambia su contenido la etapa se vuelve a ejecutar
+      outputs   archivos que debe dejar la etapa; si faltan se vuelve a ejecutar
+      checkpoint  True si `func` devuelve un DataFrame que se guarda en disco
+      cache     False para etapas que se ejecutan siempre (descarga, gráfica)
+
+    `func` indica un fallo devolviendo None o False; el pipeline se detiene ahí y
+    la siguiente ejecución se reanuda desde esa etapa.
+    """
+    def __init__(self, name, func, inputs=(), files=(), outputs=(), checkpoint=False, cache=True):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.files = list(files)
+        self.outputs = list(outputs)
+        self.checkpoint = checkpoint
+        self.cache = cache
+
+def file_digest(path):
+    """
+    Hash del contenido de un archivo ('' si no existe).
+    """
+    if not os.path.exists(path):
+        return ''
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def run_pipeline(stages, checkpoint_dir=".checkpoints", force=False):
+    """
+    Ejecuta las etapas en orden. La firma de cada etapa combina el contenido de sus
+    archivos de entrada y las firmas de las etapas de las que depende; si coincide
+    con la del último éxito registrado (y sus salidas existen) la etapa se omite.
+    Los DataFrames pasan en memoria a las etapas siguientes; solo se leen del
+    checkpoint cuando una etapa que sí se ejecuta necesita un resultado omitido.
+    Devuelve True si todas las etapas terminaron correctamente.
+    """
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest_path = os.path.join(checkpoint_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path) and not force:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    signatures, frames = {}, {}
+
+    def frame(name):
+        if name not in frames:
+            frames[name] = pd.read_pickle(os.path.join(checkpoint_dir, f"{name}.pkl"))
+            update_log(f"Etapa '{name}': resultado leído del checkpoint.")
+        return frames[name]
+
+    for stage in stages:
+        # La firma se calcula justo antes de la etapa: una etapa previa (p. ej. la
+        # descarga de correos) puede haber cambiado los archivos de entrada
+        payload = json.dumps({
+            'files': {path: file_digest(path) for path in stage.files},
+            'inputs': {name: signatures[name] for name in stage.inputs},
+        }, sort_keys=True)
+        signatures[stage.name] = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+        previous = manifest.get(stage.name, {})
+        checkpoint_file = os.path.join(checkpoint_dir, f"{stage.name}.pkl")
+        up_to_date = (
+            stage.cache
+            and previous.get('signature') == signatures[stage.name]
+            and all(os.path.exists(path) for path in stage.outputs)
+            and (not stage.checkpoint or os.path.exists(checkpoint_file))
+        )
+        if up_to_date:
+            update_log(f"Etapa '{stage.name}': sin cambios en sus entradas, se omite.")
+            continue
+
+        update_log(f"Etapa '{stage.name}': ejecutando.")
+        result = stage.func(**{name: frame(name) for name in stage.inputs})
+        if result is None or result is False:
+            update_log(f"Etapa '{stage.name}' falló; la siguiente ejecución se reanudará desde aquí.")
+            return False
+        if stage.checkpoint:
+            frames[stage.name] = result
+            result.to_pickle(checkpoint_file)
+        if stage.cache:
+            # Se registra cada etapa al terminar para poder reanudar tras un fallo
+            manifest[stage.name] = {
+                'signature': signatures[stage.name],
+                'finished_at': datetime.datetime.now().isoformat(timespec="seconds"),
+            }
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, indent=2)
+    return True
 
 ###############################################
 # Programa Principal
 ###############################################
 if __name__ == '__main__':
-    # Paso 0: Descargar automáticamente los archivos desde Outlook
-    download_email_attachments()
-    
+    parser = argparse.ArgumentParser(description="ETL de alarmas y outages por etapas con checkpoints")
+    parser.add_argument("--force", action="store_true", help="Ignora los checkpoints y ejecuta todas las etapas")
+    parser.add_argument("--sin-descarga", action="store_true", help="No descarga los correos de Outlook")
+    parser.add_argument("--sin-grafica", action="store_true", help="No muestra la gráfica al final")
+    args = parser.parse_args()
+
     # Rutas de archivos de entrada (se asume que se descargaron en la carpeta actual)
     alarms_file = "LOGS DE AE SEMANA 01-2025.xlsx"   # Archivo Excel con 4 pestañas
     outages_file = "nodeb_unavailable_2025 01.csv"     # Archivo CSV de outages
+    db_file = "etl_alarms.db"
+    output_csv = "resultados_joined.csv"
 
-    # Procesar y normalizar los datos de cada archivo
-    df_alarms = etl_alarms(alarms_file)
-    df_outages = etl_outages(outages_file)
+    stages = []
+    if not args.sin_descarga:
+        # Paso 0: Descargar automáticamente los archivos desde Outlook (siempre se ejecuta;
+        # si los archivos descargados no cambiaron, las etapas siguientes se omiten)
+        stages.append(Stage("descarga", lambda: download_email_attachments() or True, cache=False))
+    stages += [
+        # Procesar y normalizar los datos de cada archivo
+        Stage("alarmas", lambda: etl_alarms(alarms_file), files=[alarms_file], checkpoint=True),
+        Stage("outages", lambda: etl_outages(outages_file), files=[outages_file], checkpoint=True),
+        # Cargar cada DataFrame en su respectiva tabla en SQLite
+        Stage("carga_alarmas", lambda alarmas: load_table(alarmas, db_file=db_file, table_name="alarms"),
+              inputs=["alarmas"], outputs=[db_file]),
+        Stage("carga_outages", lambda outages: load_table(outages, db_file=db_file, table_name="outages"),
+              inputs=["outages"], outputs=[db_file]),
+        # JOIN para obtener tiempos de respaldo para alarmas "MINOR RECT FAILURE"
+        Stage("join", join_alarms_outages_stage, inputs=["alarmas", "outages"], checkpoint=True),
+        Stage("carga_join", lambda join: load_table(join, db_file=db_file, table_name="alarms_outages_joined"),
+              inputs=["join"], outputs=[db_file]),
+        # La gráfica y el CSV usan el DataFrame del JOIN en memoria, sin releer SQLite
+        Stage("csv", lambda join: export_joined_to_csv(output_csv=output_csv, df_joined=join),
+              inputs=["join"], outputs=[output_csv]),
+    ]
+    if not args.sin_grafica:
+        stages.append(Stage("grafica", lambda join: generate_graph_from_joined(df_joined=join),
+                            inputs=["join"], cache=False))
 
-    # Cargar cada DataFrame en su respectiva tabla en SQLite
-    if df_alarms is not None:
-        update_log(f"Archivo de alarmas procesado: {len(df_alarms)} registros.")
-        load_table(df_alarms, db_file="etl_alarms.db", table_name="alarms") 
-    else:
-        update_log("Error en el procesamiento del archivo de alarmas.")
-
-    if df_outages is not None:
-        update_log(f"Archivo de outages procesado: {len(df_outages)} registros.")
-        load_table(df_outages, db_file="etl_alarms.db", table_name="outages")
-    else:
-        update_log("Error en el procesamiento del archivo de outages.")
-
-    # Realizar el JOIN para obtener tiempos de respaldo para alarmas "MINOR RECT FAILURE"
-    if df_alarms is not None and df_outages is not None:
-        df_joined = join_alarms_outages(df_alarms, df_outages)
-        update_log(f"Registros finales en la unión: {len(df_joined)}")
-        if load_table(df_joined, db_file="etl_alarms.db", table_name="alarms_outages_joined"):
-            generate_graph_from_joined(db_file="etl_alarms.db", table_name="alarms_outages_joined")
-            # Exportar los datos de la tabla resultante a CSV
-            export_joined_to_csv(db_file="etl_alarms.db", table_name="alarms_outages_joined", output_csv="resultados_joined.csv")
-    else:
-        update_log("No se pudo realizar el JOIN de datos.")
+    if not run_pipeline(stages, force=args.force):
+        update_log("El proceso terminó con errores.")
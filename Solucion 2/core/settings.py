@@ -20,12 +20,20 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-4oeeud3cyny*3))3gj0-6o*^g3te03l*v#q(+#h8n(@9o@s^ha'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-4oeeud3cyny*3))3gj0-6o*^g3te03l*v#q(+#h8n(@9o@s^ha',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Para desarrollo local: DJANGO_DEBUG=True python manage.py runserver
+DEBUG = os.environ.get('DJANGO_DEBUG', 'False') == 'True'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+    if host.strip()
+]
 
 
 # Application definition
@@ -43,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Sirve STATIC_ROOT precomprimido (br/gzip) con caché inmutable antes de las vistas
+    'etl_app.middleware.CompressedStaticMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,11 +61,35 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# Descomenta esta línea para programar la ejecución del comando 'process_etl'
-# cada viernes a las 2:00 AM.
-# CRONJOBS = [
-#     ('0 2 * * FRI', 'django.core.management.call_command', ['process_etl']),
+# Programación de trabajos del ETL. Los ejecuta el worker local
+# (python manage.py run_etl_worker); p. ej. 'process_etl' cada viernes a las 2:00 AM:
+# ETL_SCHEDULES = [
+#     {'name': 'etl-semanal', 'cron': '0 2 * * FRI', 'job_type': 'process_etl', 'params': {}},
 # ]
+ETL_SCHEDULES = []
+
+# Segundos hacia atrás en que el worker busca ejecuciones programadas que no se
+# encolaron (worker ocupado o detenido); las perdidas se juntan en una sola
+ETL_SCHEDULE_CATCHUP = 7 * 24 * 3600
+
+# Segundos tras los cuales un candado de trabajo se considera abandonado
+ETL_LOCK_TIMEOUT = 6 * 3600
+
+# Tipos de alarma (expresiones regulares, sin distinguir mayúsculas) cuyo tiempo
+# de anticipación al siguiente outage del sitio calcula el ETL, y ventana máxima
+ETL_CORRELATION_PATTERNS = [
+    'MINOR RECT FAILURE',
+    'MAJOR RECT FAILURE',
+    'MAINS INPUT OUT OF RANGE',
+    r'AC (POWER|PWR) FAIL',
+    r'LOW BATTERY VOLTAGE|BATTERY POWER UNAVAILABLE|LOW DC VOLTAGE',
+]
+ETL_CORRELATION_MAX_LEAD_HOURS = 72
+
+# Snapshot binario (mapeado en memoria por cada proceso web) que publica el ETL
+# con los agregados de los dashboards, y cada cuántos segundos se busca uno nuevo
+ETL_SNAPSHOT_PATH = os.environ.get('ETL_SNAPSHOT_PATH', BASE_DIR / 'dashboard.snapshot')
+ETL_SNAPSHOT_CHECK_SECONDS = 1.0
 ROOT_URLCONF = 'core.urls'
 
 TEMPLATES = [
@@ -80,10 +114,11 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# DJANGO_DB_PATH permite apuntar a otra base (p. ej. la base sintética de load_test)
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('DJANGO_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
@@ -127,6 +162,17 @@ STATIC_URL ='/static/'
 STATICFILES_DIRS = [
     os.path.join(BASE_DIR, "static"),
 ]
+# Destino de collectstatic: archivos con hash en el nombre y sus versiones .gz/.br
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'etl_app.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
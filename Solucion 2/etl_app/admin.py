@@ -1,3 +1,180 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db.models import Sum
+from django.utils.functional import cached_property
+from etl_app.models import Alarm, Outage, JoinedRecord, Site, WeekPartition
+from etl_app.partitions import parse_date_range
 
-# Register your models here.
+###############################################
+# Admin para las tablas de hechos (millones de filas)
+###############################################
+# El admin por defecto hace COUNT(*) de toda la tabla en cada página, búsquedas
+# LIKE '%...%' sin índice y, con RelatedOnlyFieldListFilter, DISTINCT sobre la
+# tabla de hechos. Aquí cada filtro y cada búsqueda usa un índice (week, FKs,
+# fechas de ocurrencia) y el total de filas se estima.
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Sin filtros el total sale de los conteos por semana que guarda el ETL en
+    WeekPartition (sin COUNT(*)). Con filtros se cuenta a lo más COUNT_LIMIT filas
+    (COUNT sobre una subconsulta con LIMIT): una búsqueda muy amplia muestra solo
+    esas páginas y conviene acotarla con más filtros.
+    """
+    COUNT_LIMIT = 10000
+    PARTITION_COUNTS = {Alarm: 'alarm_count', Outage: 'outage_count', JoinedRecord: 'joined_count'}
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        field = self.PARTITION_COUNTS.get(queryset.model)
+        if field and not queryset.query.has_filters():
+            return WeekPartition.objects.aggregate(total=Sum(field))['total'] or 0
+        # El orden no cambia el conteo; sin ORDER BY no hay que ordenar antes del LIMIT
+        return queryset.order_by()[:self.COUNT_LIMIT].count()
+
+class WeekFilter(admin.SimpleListFilter):
+    """
+    Semanas cargadas, tomadas de WeekPartition (no de un DISTINCT sobre los hechos).
+    """
+    title = 'semana'
+    parameter_name = 'week'
+
+    def lookups(self, request, model_admin):
+        return [(key, str(key)) for key in WeekPartition.objects.order_by('-key').values_list('key', flat=True)]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(week=int(self.value()))
+        return queryset
+
+class SiteCodeFilter(admin.SimpleListFilter):
+    """
+    Código exacto de sitio en un cuadro de texto: la lista de miles de sitios no
+    cabe en la barra lateral. Se resuelve con el índice único de Site.code y el
+    índice del FK site_id.
+    """
+    title = 'sitio'
+    parameter_name = 'site_code'
+    template = 'admin/etl_app/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'value': self.value() or '',
+            'hidden': [(name, value) for name, value in changelist.params.items() if name != self.parameter_name],
+            'clear': changelist.get_query_string(remove=[self.parameter_name]),
+        }
+
+    def queryset(self, request, queryset):
+        code = (self.value() or '').strip().upper()
+        if code:
+            return queryset.filter(site__code=code)
+        return queryset
+
+class DateRangeFilter(admin.FieldListFilter):
+    """
+    Rango "desde / hasta" (AAAA-MM-DD, hasta inclusivo) sobre la fecha de ocurrencia,
+    resuelto con su índice. Reemplaza a date_hierarchy, que en cada página hace un
+    SELECT DISTINCT con una función de truncado por fila sobre toda la tabla.
+    """
+    template = 'admin/etl_app/date_range_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.parameter_start = f'{field_path}_desde'
+        self.parameter_end = f'{field_path}_hasta'
+        super().__init__(field, request, params, model, model_admin, field_path)
+
+    def expected_parameters(self):
+        return [self.parameter_start, self.parameter_end]
+
+    def value(self, parameter):
+        value = self.used_parameters.get(parameter)
+        # Django >= 5.0 entrega cada parámetro como lista
+        return (value[-1] if isinstance(value, list) else value) or ''
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        own = self.expected_parameters()
+        yield {
+            'start': self.value(self.parameter_start),
+            'end': self.value(self.parameter_end),
+            'hidden': [(name, value) for name, value in changelist.params.items() if name not in own],
+            'clear': changelist.get_query_string(remove=own),
+        }
+
+    def queryset(self, request, queryset):
+        start, end = parse_date_range({'start': self.value(self.parameter_start),
+                                       'end': self.value(self.parameter_end)})
+        if start is not None:
+            queryset = queryset.filter(**{f'{self.field_path}__gte': start})
+        if end is not None:
+            queryset = queryset.filter(**{f'{self.field_path}__lt': end})
+        return queryset
+
+class FactAdmin(admin.ModelAdmin):
+    """
+    Base de solo lectura: las filas las cargan el ETL y el backfill y se borran por
+    semana con drop_partitions.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 100
+    # Búsqueda por prefijo del código de sitio (ver get_search_results)
+    search_fields = ['^site__code']
+    search_help_text = "Prefijo del código de sitio"
+    # Conteos por opción de filtro (Django >= 5.0): un COUNT por opción en cada página
+    if hasattr(admin, 'ShowFacets'):
+        show_facets = admin.ShowFacets.NEVER
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Los sitios con el prefijo se buscan en la tabla de sitios (pocos miles de
+        filas) y los hechos se filtran con site_id IN (subconsulta), que usa el
+        índice del FK en lugar de un LIKE por cada fila de la tabla de hechos.
+        """
+        term = search_term.strip().upper()
+        if not term:
+            return queryset, False
+        sites = Site.objects.filter(code__startswith=term).values('id')
+        return queryset.filter(site_id__in=sites), False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Alarm)
+class AlarmAdmin(FactAdmin):
+    list_display = ['id', 'week', 'site', 'region', 'alarm_type', 'alarm_occurred_on', 'alarm_cleared_on']
+    list_select_related = ['site', 'region', 'alarm_type']
+    list_filter = [WeekFilter, ('alarm_occurred_on', DateRangeFilter), 'region', 'alarm_type', SiteCodeFilter]
+    ordering = ['-alarm_occurred_on']
+    sortable_by = ['alarm_occurred_on']
+
+@admin.register(Outage)
+class OutageAdmin(FactAdmin):
+    list_display = ['id', 'week', 'site', 'outage_type', 'outage_occurred_on', 'outage_cleared_on']
+    list_select_related = ['site', 'outage_type']
+    list_filter = [WeekFilter, ('outage_occurred_on', DateRangeFilter), 'outage_type', SiteCodeFilter]
+    ordering = ['-outage_occurred_on']
+    sortable_by = ['outage_occurred_on']
+
+@admin.register(JoinedRecord)
+class JoinedRecordAdmin(FactAdmin):
+    list_display = ['id', 'week', 'site', 'region', 'alarm_type', 'alarm_occurred_on',
+                    'outage_occurred_on', 'backup_minutes']
+    list_select_related = ['site', 'region', 'alarm_type']
+    list_filter = [WeekFilter, ('alarm_occurred_on', DateRangeFilter), 'region', 'alarm_type', SiteCodeFilter]
+    ordering = ['-alarm_occurred_on']
+    sortable_by = ['alarm_occurred_on']
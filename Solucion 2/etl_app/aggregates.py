@@ -0,0 +1,225 @@
+from collections import defaultdict
+from django.db.models import Avg, Count, Sum, Min, Max, F
+from etl_app.models import (
+    Alarm, JoinedRecord, Site, Region, AlarmType, BackupSketch, AlarmLeadTime, AlarmRollup, OutageRollup,
+)
+from etl_app.partitions import partitioned, weeks_in_range
+from etl_app.sketches import merge_payloads
+
+###############################################
+# Agregados de los dashboards
+###############################################
+# Los usan las vistas (con rango de fechas) y el snapshot que publica el ETL
+# (sin rango), así ambos caminos calculan exactamente lo mismo.
+
+def backup_by_site(start=None, end=None):
+    """
+    Tiempo promedio de respaldo por sitio, ordenado por código de sitio.
+    Devuelve (códigos, promedios).
+    """
+    data = (
+        partitioned(JoinedRecord, start, end)
+        .values('site_id')
+        .annotate(avg_backup=Avg('backup_minutes'))
+        .order_by()
+    )
+    site_codes = dict(Site.objects.values_list('id', 'code'))
+    data = sorted(data, key=lambda d: site_codes[d['site_id']])
+    return [site_codes[d['site_id']] for d in data], [d['avg_backup'] for d in data]
+
+def alarm_type_counts(start=None, end=None, top=20):
+    """
+    Conteo por tipo de alarma, de mayor a menor (los `top` más frecuentes; None = todos).
+    Devuelve (nombres, conteos).
+    """
+    alarm_names = dict(AlarmType.objects.values_list('id', 'name'))
+    alarm_type_data = (
+        partitioned(Alarm, start, end)
+        .values('alarm_type_id').annotate(total=Count('id')).order_by('-total')
+    )
+    if top is not None:
+        alarm_type_data = alarm_type_data[:top]
+    return ([alarm_names.get(record['alarm_type_id'], '') for record in alarm_type_data],
+            [record['total'] for record in alarm_type_data])
+
+def minor_rect_site_count(start=None, end=None):
+    """
+    Número de sitios con alguna alarma MINOR RECT FAILURE.
+    """
+    minor_type_ids = [
+        type_id for type_id, name in AlarmType.objects.values_list('id', 'name')
+        if "MINOR RECT FAILURE" in name.upper()
+    ]
+    return (
+        partitioned(Alarm, start, end)
+        .filter(alarm_type_id__in=minor_type_ids)
+        .values('site_id')
+        .distinct()
+        .count()
+    )
+
+def region_top_alarms(start=None, end=None):
+    """
+    Alarma más frecuente por región. Devuelve (regiones, alarmas, conteos).
+    """
+    alarm_names = dict(AlarmType.objects.values_list('id', 'name'))
+    region_alarm_data = (
+        partitioned(Alarm, start, end)
+        .values('region_id', 'alarm_type_id').annotate(count=Count('id')).order_by()
+    )
+    region_names = dict(Region.objects.values_list('id', 'name'))
+    # Agrupar por región, y obtener la alarma con mayor count
+    region_top = defaultdict(lambda: {'alarm_name': '', 'count': 0})
+    for record in region_alarm_data:
+        reg = region_names.get(record['region_id'], '')
+        alarm = alarm_names.get(record['alarm_type_id'], '')
+        if record['count'] > region_top[reg]['count']:
+            region_top[reg] = {'alarm_name': alarm, 'count': record['count']}
+
+    region_labels = list(region_top.keys())
+    return (region_labels,
+            [region_top[reg]['alarm_name'] for reg in region_labels],
+            [region_top[reg]['count'] for reg in region_labels])
+
+def summary_context(type_counts, minor_site_count, region_tops):
+    """
+    Arma el contexto de dashboard_mas con los resultados de las tres consultas.
+    """
+    (labels, counts), (regions, top_alarms, top_counts) = type_counts, region_tops
+    return {
+        'graph1_labels': labels,
+        'graph1_counts': counts,
+        'minor_site_count': minor_site_count,
+        'region_labels': regions,
+        'region_top_counts': top_counts,
+        'region_top_alarm': top_alarms,
+    }
+
+def alarm_summary(start=None, end=None, top=20):
+    """
+    Conteo por tipo de alarma (los `top` más frecuentes; None = todos), número de
+    sitios con MINOR RECT FAILURE y la alarma más frecuente por región. Las tres
+    consultas son independientes; la vista asíncrona las lanza a la vez.
+    """
+    return summary_context(
+        alarm_type_counts(start, end, top),
+        minor_rect_site_count(start, end),
+        region_top_alarms(start, end),
+    )
+
+###############################################
+# Gráficas 4-6 de dashboard_mas (resúmenes semanales del ETL)
+###############################################
+def backup_percentiles(start=None, end=None, level='region', site_code=None):
+    """
+    Percentiles de backup_minutes por región o por sitio (`level`), combinando los
+    sketches semanales guardados por el ETL, sin leer JoinedRecord.
+    """
+    sketches = BackupSketch.objects.all()
+    if start is not None or end is not None:
+        sketches = sketches.filter(week__in=weeks_in_range(start, end))
+    if site_code:
+        sketches = sketches.filter(site__code=site_code.upper())
+    elif level == 'site':
+        sketches = sketches.filter(site__isnull=False)
+    else:
+        sketches = sketches.filter(region__isnull=False)
+
+    field = 'site_id' if level == 'site' else 'region_id'
+    payloads = defaultdict(list)
+    for key, payload in sketches.values_list(field, 'payload').iterator():
+        payloads[key].append(payload)
+    if level == 'site':
+        names = dict(Site.objects.filter(id__in=list(payloads)).values_list('id', 'code'))
+    else:
+        names = dict(Region.objects.values_list('id', 'name'))
+
+    results = []
+    for key, group in payloads.items():
+        sketch = merge_payloads(group)
+        results.append({
+            level: names.get(key, ''),
+            'count': sketch.count,
+            'mean': sketch.mean(),
+            'p50': sketch.quantile(0.5),
+            'p90': sketch.quantile(0.9),
+            'p99': sketch.quantile(0.99),
+        })
+    results.sort(key=lambda r: r[level])
+    return results
+
+def lead_times_by_type(start=None, end=None, region=None):
+    """
+    Por tipo de alarma (ETL_CORRELATION_PATTERNS): alarmas, cuántas siguió un
+    outage y el tiempo promedio/mínimo/máximo hasta él, del más corto al más largo.
+    """
+    rows = AlarmLeadTime.objects.all()
+    if start is not None or end is not None:
+        rows = rows.filter(week__in=weeks_in_range(start, end))
+    if region:
+        rows = rows.filter(region__name=region.upper())
+    rows = (
+        rows.values('alarm_type_id')
+        .annotate(alarms=Count('id'), matched=Count('lead_minutes'), avg_lead=Avg('lead_minutes'),
+                  min_lead=Min('lead_minutes'), max_lead=Max('lead_minutes'))
+        .order_by(F('avg_lead').asc(nulls_last=True))
+    )
+    names = dict(AlarmType.objects.values_list('id', 'name'))
+    return [{
+        'alarm_type': names.get(r['alarm_type_id'], ''),
+        'alarms': r['alarms'],
+        'matched': r['matched'],
+        'matched_pct': 100.0 * r['matched'] / r['alarms'] if r['alarms'] else None,
+        'avg_lead_minutes': r['avg_lead'],
+        'min_lead_minutes': r['min_lead'],
+        'max_lead_minutes': r['max_lead'],
+    } for r in rows]
+
+def timeseries_points(series, granularity, start=None, end=None, region=None, alarm_type=None, site=None):
+    """
+    Puntos {bucket, count[, minutes]} de los rollups de alarmas u outages ('alarms'
+    filtra por región y tipo; 'outages' por sitio).
+    """
+    if series == 'outages':
+        rows = OutageRollup.objects.filter(granularity=granularity)
+        if site:
+            rows = rows.filter(site__code=site.upper())
+        totals = {'count': Sum('count'), 'minutes': Sum('minutes')}
+    else:
+        rows = AlarmRollup.objects.filter(granularity=granularity)
+        if region:
+            rows = rows.filter(region__name=region.upper())
+        if alarm_type:
+            rows = rows.filter(alarm_type__name=alarm_type.upper())
+        totals = {'count': Sum('count')}
+    if start is not None:
+        rows = rows.filter(bucket__gte=start)
+    if end is not None:
+        rows = rows.filter(bucket__lt=end)
+    # Las cubetas compartidas por dos semanas se suman aquí
+    return list(rows.values('bucket').annotate(**totals).order_by('bucket'))
+
+def charts_context(start=None, end=None):
+    """
+    Datos de las gráficas 4 a 6 de dashboard_mas, listos para la plantilla (y para
+    el snapshot): la página ya no hace una petición a la API por gráfica.
+    """
+    regions = backup_percentiles(start, end)
+    leads = [r for r in lead_times_by_type(start, end) if r['matched']]
+    alarms = timeseries_points('alarms', 'day', start, end)
+    outages = timeseries_points('outages', 'day', start, end)
+    return {
+        'backup_regions': [r['region'] for r in regions],
+        'backup_p50': [round(r['p50'] or 0.0, 1) for r in regions],
+        'backup_p90': [round(r['p90'] or 0.0, 1) for r in regions],
+        'backup_p99': [round(r['p99'] or 0.0, 1) for r in regions],
+        'lead_types': [r['alarm_type'] for r in leads],
+        'lead_avg_minutes': [round(r['avg_lead_minutes'], 1) for r in leads],
+        'lead_matched': [r['matched'] for r in leads],
+        'lead_alarms': [r['alarms'] for r in leads],
+        # Milisegundos epoch, como los espera el eje datetime de ApexCharts
+        'alarm_days': [int(p['bucket'].timestamp() * 1000) for p in alarms],
+        'alarm_day_counts': [p['count'] for p in alarms],
+        'outage_days': [int(p['bucket'].timestamp() * 1000) for p in outages],
+        'outage_minutes': [round(p['minutes']) for p in outages],
+    }
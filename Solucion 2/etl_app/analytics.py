@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+###############################################
+# Motor de intervalos (barrido sobre eventos ordenados)
+###############################################
+# Todas las funciones trabajan por llave (sitio) con operaciones vectorizadas:
+# se ordenan los eventos una vez (O(n log n)) y el resto son sumas acumuladas
+# por grupo, sin comparar intervalos por pares.
+
+def clip_intervals(df, start_col, end_col, window_start, window_end):
+    """
+    Recorta los intervalos a la ventana [window_start, window_end]. Un intervalo sin
+    fecha de fin (aún abierto) se extiende hasta el final de la ventana.
+    Devuelve (inicio, fin, máscara de intervalos válidos).
+    """
+    start = df[start_col].clip(lower=window_start, upper=window_end)
+    end = df[end_col].fillna(window_end).clip(lower=window_start, upper=window_end)
+    valid = (start.notna() & (end > start)).to_numpy()
+    return start, end, valid
+
+def merged_intervals(df, key_col, start_col, end_col):
+    """
+    Unión de intervalos por llave: devuelve un DataFrame (key, start, end) con los
+    intervalos traslapados o contiguos fusionados. Un intervalo inicia un grupo
+    nuevo cuando empieza después del fin máximo visto hasta el anterior.
+    """
+    data = pd.DataFrame({
+        'key': np.asarray(df[key_col], dtype=object),
+        'start': df[start_col].to_numpy(),
+        'end': df[end_col].to_numpy(),
+    }).dropna().sort_values(['key', 'start'], kind='mergesort', ignore_index=True)
+    if data.empty:
+        return data
+    reach = data.groupby('key', sort=False)['end'].cummax()
+    prev_reach = reach.groupby(data['key'], sort=False).shift()
+    new_group = prev_reach.isna() | (data['start'] > prev_reach)
+    group_id = new_group.cumsum()
+    return (
+        data.groupby(group_id, sort=False)
+        .agg(key=('key', 'first'), start=('start', 'min'), end=('end', 'max'))
+        .reset_index(drop=True)
+    )
+
+def _events(df, key_col, start, end, valid, delta_col):
+    keys = np.asarray(df[key_col], dtype=object)[valid]
+    n = len(keys)
+    return pd.DataFrame({
+        'key': np.concatenate([keys, keys]),
+        't': np.concatenate([start.to_numpy()[valid], end.to_numpy()[valid]]),
+        delta_col: np.concatenate([np.ones(n, dtype=np.int32), -np.ones(n, dtype=np.int32)]),
+    })
+
+def outage_coverage(df_outages, df_windows, window_start, window_end,
+                    outage_key='site_parsed_outage', window_key='site_parsed_alarm',
+                    outage_cols=('outage_occurred_on', 'outage_cleared_on'),
+                    window_cols=('alarm_occurred_on', 'alarm_cleared_on')):
+    """
+    Barrido por sitio sobre los eventos de inicio/fin de outages y de las ventanas
+    de alarma (p. ej. MINOR RECT FAILURE), recortados a la ventana de análisis.
+
+    Devuelve por sitio:
+      outage_minutes  minutos cubiertos por al menos un outage (unión)
+      outage_intervals número de intervalos de la unión
+      overlap_minutes  minutos con outage y ventana de alarma activos a la vez
+    """
+    columns = ['outage_minutes', 'outage_intervals', 'overlap_minutes']
+    o_start, o_end, o_valid = clip_intervals(df_outages, *outage_cols, window_start, window_end)
+    w_start, w_end, w_valid = clip_intervals(df_windows, *window_cols, window_start, window_end)
+    events = pd.concat([
+        _events(df_outages, outage_key, o_start, o_end, o_valid, 'd_outage'),
+        _events(df_windows, window_key, w_start, w_end, w_valid, 'd_window'),
+    ], ignore_index=True)
+    if events.empty:
+        return pd.DataFrame(columns=columns)
+    events = events.fillna(0).sort_values(['key', 't'], kind='mergesort', ignore_index=True)
+
+    by_key = events.groupby('key', sort=False)
+    active_outages = by_key['d_outage'].cumsum()
+    active_windows = by_key['d_window'].cumsum()
+    # Cada evento abre un segmento que dura hasta el siguiente evento del mismo sitio
+    length = (by_key['t'].shift(-1) - events['t']).dt.total_seconds().fillna(0) / 60.0
+    in_outage = active_outages > 0
+    prev_in_outage = in_outage.groupby(events['key'], sort=False).shift(fill_value=False)
+
+    result = pd.DataFrame({
+        'key': events['key'],
+        'outage_minutes': length.where(in_outage, 0.0),
+        'outage_intervals': (in_outage & ~prev_in_outage).astype(int),
+        'overlap_minutes': length.where(in_outage & (active_windows > 0), 0.0),
+    }).groupby('key').sum()
+    # Solo interesan los sitios con algún outage en la ventana
+    return result[result['outage_intervals'] > 0]
+
+def bucket_minutes(df, key_col, start_col, end_col, freq):
+    """
+    Reparte la duración de cada intervalo entre las cubetas de tamaño `freq`
+    ('h' o 'D') que cubre. Los intervalos se expanden con np.repeat (una fila por
+    cubeta tocada) y el traslape se calcula en bloque.
+    Devuelve un DataFrame (key, bucket, minutes) sumado por llave y cubeta.
+    """
+    columns = ['key', 'bucket', 'minutes']
+    data = df[[key_col, start_col, end_col]].dropna()
+    data = data[data[end_col] > data[start_col]]
+    if data.empty:
+        return pd.DataFrame(columns=columns)
+    step = pd.Timedelta(1, unit=freq).to_timedelta64()
+    start = data[start_col].to_numpy()
+    end = data[end_col].to_numpy()
+    first = data[start_col].dt.floor(freq).to_numpy()
+    last = data[end_col].dt.floor(freq).to_numpy()
+    counts = ((last - first) // step).astype(np.int64) + 1
+
+    row = np.repeat(np.arange(len(data)), counts)
+    offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    bucket = first[row] + offset * step
+    overlap = np.minimum(end[row], bucket + step) - np.maximum(start[row], bucket)
+    result = pd.DataFrame({
+        'key': np.asarray(data[key_col], dtype=object)[row],
+        'bucket': bucket,
+        'minutes': overlap / np.timedelta64(1, 'm'),
+    })
+    result = result[result['minutes'] > 0]
+    return result.groupby(['key', 'bucket'], as_index=False, sort=False)['minutes'].sum()
+
+def availability(outage_minutes, window_minutes, site_count=1):
+    """
+    Porcentaje de disponibilidad dado el tiempo fuera de servicio acumulado.
+    """
+    total = window_minutes * site_count
+    if total <= 0:
+        return 100.0
+    return max(0.0, 100.0 * (1.0 - outage_minutes / total))
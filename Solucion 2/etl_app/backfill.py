@@ -0,0 +1,70 @@
+import os
+import re
+
+# Este módulo se importa en los procesos del pool antes de django.setup(),
+# por eso los imports que tocan modelos se hacen dentro de las funciones.
+
+# Patrones de los archivos semanales que llegan por correo
+ALARMS_FILE_PATTERN = re.compile(r'LOGS DE AE SEMANA .*\.xlsx$', re.IGNORECASE)
+OUTAGES_FILE_PATTERN = re.compile(r'nodeb_unavailable.*\.(csv|xlsx)$', re.IGNORECASE)
+
+def discover_week_pairs(folder):
+    """
+    Busca en `folder` los pares alarmas/outages de cada semana.
+    Devuelve una lista ordenada de (semana, archivo_alarmas, archivo_outages)
+    y la lista de archivos sin pareja.
+    """
+    from etl_app.partitions import week_from_filename
+
+    alarms, outages = {}, {}
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not os.path.isfile(path):
+            continue
+        if ALARMS_FILE_PATTERN.search(name):
+            target = alarms
+        elif OUTAGES_FILE_PATTERN.search(name):
+            target = outages
+        else:
+            continue
+        week = week_from_filename(name)
+        if week is not None:
+            target[week] = path
+    pairs = [(week, alarms[week], outages[week]) for week in sorted(alarms.keys() & outages.keys())]
+    unpaired = sorted(
+        [alarms[w] for w in alarms.keys() - outages.keys()] +
+        [outages[w] for w in outages.keys() - alarms.keys()]
+    )
+    return pairs, unpaired
+
+def init_worker():
+    """
+    Inicializador de los procesos del pool: con el método spawn (Windows) el hijo
+    arranca sin Django configurado.
+    """
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    django.setup()
+
+def parse_week(week, alarms_file, outages_file, lean=False):
+    """
+    Lee, normaliza y une los archivos de una semana (se ejecuta en el pool).
+    No escribe en la base de datos: las resoluciones de sitio nuevas se devuelven
+    junto con los DataFrames y las filas en cuarentena, y las guarda el escritor único.
+    """
+    from etl_app.pipeline import (
+        etl_alarms, etl_outages, join_alarms_outages, join_alarms_outages_lean,
+    )
+    from etl_app.resolver import SiteResolver
+
+    resolver = SiteResolver(persist=False)
+    quarantine = []
+    df_alarms = etl_alarms(alarms_file, lean=lean, resolver=resolver, quarantine=quarantine)
+    df_outages = etl_outages(outages_file, lean=lean, resolver=resolver, quarantine=quarantine)
+    if df_alarms is None or df_outages is None:
+        return week, None, None, None, resolver.pending, quarantine
+    if lean:
+        df_joined = join_alarms_outages_lean(df_alarms, df_outages)
+    else:
+        df_joined = join_alarms_outages(df_alarms, df_outages)
+    return week, df_alarms, df_outages, df_joined, resolver.pending, quarantine
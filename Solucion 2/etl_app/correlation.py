@@ -0,0 +1,60 @@
+import re
+import numpy as np
+import pandas as pd
+
+###############################################
+# Correlación alarma -> outage para varios tipos de alarma
+###############################################
+# Los patrones se evalúan una vez por nombre de alarma distinto (no por fila) y
+# todas las alarmas seleccionadas se cruzan con los outages en un único
+# merge_asof ordenado por fecha y agrupado por sitio: para cada alarma se toma
+# el primer outage del mismo sitio que ocurre en o después de ella.
+
+LEAD_TIME_COLUMNS = ['site_parsed_alarm', 'region', 'alarm_name', 'alarm_occurred_on',
+                     'outage_occurred_on', 'lead_minutes']
+
+def compile_patterns(patterns):
+    """
+    Une los patrones (expresiones regulares, sin distinguir mayúsculas) en una sola.
+    """
+    return re.compile('|'.join(f'(?:{p})' for p in patterns), re.IGNORECASE)
+
+def match_alarm_types(alarm_names, patterns):
+    """
+    Máscara de las filas cuyo nombre de alarma coincide con algún patrón.
+    """
+    if not patterns:
+        return pd.Series(False, index=alarm_names.index)
+    regex = compile_patterns(patterns)
+    names = pd.unique(alarm_names.dropna().to_numpy(dtype=object))
+    selected = [name for name in names if regex.search(str(name))]
+    return alarm_names.isin(selected)
+
+def lead_times(df_alarms, df_outages, patterns, max_lead=None):
+    """
+    Tiempo de anticipación (minutos) entre cada alarma de los tipos seleccionados
+    y el siguiente outage de su sitio. Las alarmas sin outage dentro de `max_lead`
+    (Timedelta; None = sin límite) se conservan con outage y tiempo vacíos.
+    """
+    selected = match_alarm_types(df_alarms['alarm_name'], patterns)
+    alarms = df_alarms.loc[selected, ['site_parsed_alarm', 'region', 'alarm_name', 'alarm_occurred_on']]
+    alarms = alarms[alarms['alarm_occurred_on'].notna()]
+    if alarms.empty:
+        return pd.DataFrame(columns=LEAD_TIME_COLUMNS)
+    # El sitio se compara como texto: en modo lean ambas columnas son categóricas
+    # con categorías distintas y merge_asof exige llaves del mismo tipo
+    alarms = alarms.assign(site=np.asarray(alarms['site_parsed_alarm'], dtype=object))
+    outages = df_outages.loc[df_outages['outage_occurred_on'].notna(), ['site_parsed_outage', 'outage_occurred_on']]
+    outages = pd.DataFrame({
+        'site': np.asarray(outages['site_parsed_outage'], dtype=object),
+        'outage_occurred_on': outages['outage_occurred_on'].astype(alarms['alarm_occurred_on'].dtype),
+    })
+
+    merged = pd.merge_asof(
+        alarms.sort_values('alarm_occurred_on'),
+        outages.sort_values('outage_occurred_on'),
+        left_on='alarm_occurred_on', right_on='outage_occurred_on',
+        by='site', direction='forward', tolerance=max_lead,
+    )
+    merged['lead_minutes'] = (merged['outage_occurred_on'] - merged['alarm_occurred_on']).dt.total_seconds() / 60.0
+    return merged[LEAD_TIME_COLUMNS]
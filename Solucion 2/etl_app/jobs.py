@@ -0,0 +1,338 @@
+import os
+import time
+import socket
+import datetime
+import traceback
+from contextlib import contextmanager
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from etl_app.models import EtlJob, JobLock, ScheduleState
+
+# Un candado sin latido (heartbeat) durante este tiempo se considera abandonado
+# (worker caído). Los trabajos laten en cada etapa y el backfill en cada semana.
+LOCK_TIMEOUT = datetime.timedelta(seconds=getattr(settings, 'ETL_LOCK_TIMEOUT', 6 * 3600))
+# Hasta dónde se buscan ejecuciones programadas perdidas
+SCHEDULE_CATCHUP = datetime.timedelta(seconds=getattr(settings, 'ETL_SCHEDULE_CATCHUP', 7 * 24 * 3600))
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+###############################################
+# Tipos de trabajo
+###############################################
+def job_process_etl(params, on_stage):
+    from etl_app.management.commands.process_etl import run_etl, DEFAULT_ALARMS_FILE, DEFAULT_OUTAGES_FILE
+    week = run_etl(
+        alarms_file=params.get('alarms_file', DEFAULT_ALARMS_FILE),
+        outages_file=params.get('outages_file', DEFAULT_OUTAGES_FILE),
+        lean=params.get('lean', False),
+        download=params.get('download', True),
+        on_stage=on_stage,
+    )
+    if week is None:
+        raise RuntimeError("Error en el procesamiento de archivos.")
+    return {'week': week}
+
+def job_backfill_etl(params, on_stage):
+    from django.core.management import call_command
+    on_stage('backfill')
+    args = [params['folder']] if params.get('folder') else []
+    call_command('backfill_etl', *args, lean=params.get('lean', False), force=params.get('force', False))
+    return {}
+
+JOB_TYPES = {
+    'process_etl': job_process_etl,
+    'backfill_etl': job_backfill_etl,
+}
+
+# Candado que toma cada tipo de trabajo. Los dos escriben las mismas particiones
+# semanales, así que comparten uno y no corren a la vez.
+LOCK_KEYS = {
+    'process_etl': 'etl-partitions',
+    'backfill_etl': 'etl-partitions',
+}
+
+def lock_key(job_type):
+    return LOCK_KEYS.get(job_type, job_type)
+
+###############################################
+# Cola
+###############################################
+def enqueue(job_type, params=None, single_flight=True):
+    """
+    Encola un trabajo. Con `single_flight` se devuelve el trabajo pendiente o en
+    ejecución del mismo tipo en lugar de crear otro.
+    """
+    if job_type not in JOB_TYPES:
+        raise ValueError(f"Tipo de trabajo desconocido: {job_type}")
+    with transaction.atomic():
+        if single_flight:
+            # Un trabajo 'running' cuyo candado venció es de un worker caído: se marca
+            # FAILED para que no bloquee para siempre las actualizaciones nuevas
+            expire_stale_locks(job_type)
+            active = (
+                EtlJob.objects
+                .filter(job_type=job_type, status__in=[EtlJob.QUEUED, EtlJob.RUNNING])
+                .order_by('created_at')
+                .first()
+            )
+            if active is not None:
+                return active, False
+        return EtlJob.objects.create(job_type=job_type, params=params or {}), True
+
+def heartbeat(job_type):
+    """
+    Marca como vivo el candado que tiene este proceso para `job_type`. Lo llaman
+    run_job en cada etapa y los ciclos largos (p. ej. cada semana del backfill).
+    """
+    JobLock.objects.filter(job_type=lock_key(job_type), owner=worker_name()).update(heartbeat=timezone.now())
+
+def expire_stale_locks(job_type=None):
+    """
+    Borra los candados sin latido durante LOCK_TIMEOUT (su worker murió sin
+    liberarlos) y marca como FAILED el trabajo que seguía 'running' con ellos.
+    Un trabajo largo que sigue latiendo no se toca. Devuelve el número de
+    candados liberados.
+    """
+    now = timezone.now()
+    cutoff = now - LOCK_TIMEOUT
+    stale = JobLock.objects.filter(Q(heartbeat__lt=cutoff) | Q(heartbeat__isnull=True, acquired_at__lt=cutoff))
+    if job_type is not None:
+        stale = stale.filter(job_type=lock_key(job_type))
+    expired = 0
+    for lock in stale:
+        # DELETE condicional: si el dueño latió entretanto, o dos workers ven el
+        # mismo candado vencido, no se borra (o solo uno lo borra)
+        if not JobLock.objects.filter(pk=lock.pk, acquired_at=lock.acquired_at,
+                                      heartbeat=lock.heartbeat).delete()[0]:
+            continue
+        expired += 1
+        last_seen = lock.heartbeat or lock.acquired_at
+        if lock.job_id is not None:
+            EtlJob.objects.filter(pk=lock.job_id, status=EtlJob.RUNNING).update(
+                status=EtlJob.FAILED, finished_at=now,
+                error=f"Trabajo abandonado: el candado de {lock.owner} no latió desde el "
+                      f"{timezone.localtime(last_seen):%Y-%m-%d %H:%M} y venció sin liberarse.",
+            )
+    return expired
+
+def acquire_lock(job):
+    """
+    Toma el candado del tipo de trabajo. Devuelve False si otro worker (o un
+    comando lanzado a mano) lo tiene.
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                JobLock.objects.create(job_type=lock_key(job.job_type), job=job, owner=worker_name(),
+                                       acquired_at=now, heartbeat=now)
+            return True
+        except IntegrityError:
+            # Recuperar candados abandonados por un worker que murió y reintentar una vez
+            if attempt or not expire_stale_locks(job.job_type):
+                return False
+    return False
+
+def release_lock(job):
+    JobLock.objects.filter(job_type=lock_key(job.job_type), owner=worker_name()).delete()
+
+@contextmanager
+def command_lock(job_type):
+    """
+    Candado para las ejecuciones directas de process_etl y backfill_etl desde la
+    consola, para que no se crucen entre sí ni con el worker. Si este proceso ya
+    lo tiene (el worker ejecutando un trabajo de backfill con call_command) se
+    reutiliza sin tomarlo de nuevo.
+    """
+    key = lock_key(job_type)
+    if JobLock.objects.filter(job_type=key, owner=worker_name()).exists():
+        yield
+        return
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                now = timezone.now()
+                JobLock.objects.create(job_type=key, owner=worker_name(), acquired_at=now, heartbeat=now)
+            break
+        except IntegrityError:
+            if attempt or not expire_stale_locks(job_type):
+                holder = JobLock.objects.filter(job_type=key).first()
+                since = f" ({holder.owner} desde {timezone.localtime(holder.acquired_at):%Y-%m-%d %H:%M})" if holder else ""
+                raise CommandError(f"Otro proceso está cargando particiones del ETL{since}; intente más tarde.")
+    try:
+        yield
+    finally:
+        JobLock.objects.filter(job_type=key, owner=worker_name()).delete()
+
+def claim_next_job():
+    """
+    Toma el siguiente trabajo en cola cuyo tipo no esté bloqueado.
+    El cambio de estado es un UPDATE condicional, así que dos workers no
+    pueden tomar el mismo trabajo.
+    """
+    expire_stale_locks()
+    busy_keys = set(JobLock.objects.values_list('job_type', flat=True))
+    busy = [job_type for job_type in JOB_TYPES if lock_key(job_type) in busy_keys]
+    for job in EtlJob.objects.filter(status=EtlJob.QUEUED).exclude(job_type__in=busy).order_by('created_at'):
+        if not acquire_lock(job):
+            continue
+        claimed = EtlJob.objects.filter(pk=job.pk, status=EtlJob.QUEUED).update(
+            status=EtlJob.RUNNING, started_at=timezone.now(), worker=worker_name()
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+        release_lock(job)
+    return None
+
+def run_job(job):
+    """
+    Ejecuta un trabajo ya reclamado, guardando la etapa actual y la duración de
+    cada etapa a medida que avanza para que la web pueda consultar el progreso.
+    """
+    durations = {}
+    current = {'name': None, 'started': time.monotonic()}
+
+    def close_stage():
+        if current['name'] is not None:
+            durations[current['name']] = round(time.monotonic() - current['started'], 3)
+
+    def on_stage(name):
+        close_stage()
+        current['name'], current['started'] = name, time.monotonic()
+        EtlJob.objects.filter(pk=job.pk).update(stage=name, stage_durations=dict(durations))
+        heartbeat(job.job_type)
+
+    try:
+        result = JOB_TYPES[job.job_type](job.params, on_stage)
+        close_stage()
+        EtlJob.objects.filter(pk=job.pk).update(
+            status=EtlJob.SUCCEEDED, finished_at=timezone.now(), stage='',
+            stage_durations=durations, result=result or {},
+        )
+    except Exception:
+        close_stage()
+        EtlJob.objects.filter(pk=job.pk).update(
+            status=EtlJob.FAILED, finished_at=timezone.now(),
+            stage_durations=durations, error=traceback.format_exc(),
+        )
+    finally:
+        release_lock(job)
+    job.refresh_from_db()
+    return job
+
+###############################################
+# Programación tipo cron
+###############################################
+DAY_NAMES = {'SUN': 0, 'MON': 1, 'TUE': 2, 'WED': 3, 'THU': 4, 'FRI': 5, 'SAT': 6}
+
+def parse_cron_field(field, low, high, names=None):
+    """
+    Convierte un campo cron (`*`, `5`, `1-5`, `*/15`, `5/10`, `MON,FRI`) en el conjunto de
+    valores permitidos. Como en cron estándar, `5/10` va de 5 hasta el máximo cada 10.
+    """
+    values = set()
+    for part in field.upper().split(','):
+        step = 1
+        stepped = '/' in part
+        if stepped:
+            part, step = part.split('/')
+            step = int(step)
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(names.get(p, p)) if names else int(p) for p in part.split('-'))
+        else:
+            start = end = int(names.get(part, part)) if names else int(part)
+            if stepped:
+                end = high
+        values.update(range(start, end + 1, step))
+    return values
+
+def parse_cron(expression):
+    """
+    Conjuntos de valores permitidos (minuto, hora, día, mes, día_semana) de una
+    expresión cron de 5 campos. Día de la semana: 0 o 7 = domingo.
+    """
+    minute, hour, day, month, weekday = expression.split()
+    weekdays = parse_cron_field(weekday, 0, 7, DAY_NAMES)
+    if 7 in weekdays:
+        weekdays.add(0)
+    return (
+        parse_cron_field(minute, 0, 59),
+        parse_cron_field(hour, 0, 23),
+        parse_cron_field(day, 1, 31),
+        parse_cron_field(month, 1, 12),
+        weekdays,
+    )
+
+def _date_matches(fields, moment):
+    return (moment.day in fields[2] and moment.month in fields[3]
+            and (moment.weekday() + 1) % 7 in fields[4])
+
+def cron_matches(expression, moment):
+    """
+    Indica si `moment` (hora local) cumple la expresión cron de 5 campos
+    (minuto hora día mes día_semana). Día de la semana: 0 o 7 = domingo.
+    """
+    fields = parse_cron(expression)
+    return moment.minute in fields[0] and moment.hour in fields[1] and _date_matches(fields, moment)
+
+def last_due(expression, after, until):
+    """
+    Último minuto en (after, until] que cumple la expresión cron, o None. Recorre
+    hacia atrás saltando días y horas completos que no coinciden, así que una
+    ventana de días cuesta pocas comparaciones.
+    """
+    fields = parse_cron(expression)
+    moment = until.replace(second=0, microsecond=0)
+    while moment > after:
+        if not _date_matches(fields, moment):
+            moment = moment.replace(hour=0, minute=0) - datetime.timedelta(minutes=1)
+        elif moment.hour not in fields[1]:
+            moment = moment.replace(minute=0) - datetime.timedelta(minutes=1)
+        elif moment.minute not in fields[0]:
+            moment -= datetime.timedelta(minutes=1)
+        else:
+            return moment
+    return None
+
+def enqueue_due_schedules(now=None):
+    """
+    Encola los trabajos de settings.ETL_SCHEDULES que vencieron desde la última
+    vez que se encolaron (ScheduleState). Si el worker estuvo ocupado o detenido
+    y se perdieron varias ejecuciones (dentro de SCHEDULE_CATCHUP), se encola una
+    sola, la más reciente. El avance del estado es un UPDATE condicional y la
+    restricción única (schedule, scheduled_for) evita duplicados entre workers.
+    """
+    now = timezone.localtime(now or timezone.now()).replace(second=0, microsecond=0)
+    created = []
+    for schedule in getattr(settings, 'ETL_SCHEDULES', []):
+        # Una programación nueva empieza a contar desde el minuto anterior
+        state, _ = ScheduleState.objects.get_or_create(
+            name=schedule['name'], defaults={'last_fired': now - datetime.timedelta(minutes=1)}
+        )
+        after = max(timezone.localtime(state.last_fired), now - SCHEDULE_CATCHUP)
+        due = last_due(schedule['cron'], after, now)
+        if due is None:
+            continue
+        try:
+            with transaction.atomic():
+                advanced = ScheduleState.objects.filter(
+                    name=state.name, last_fired=state.last_fired
+                ).update(last_fired=due)
+                if not advanced:
+                    continue
+                created.append(EtlJob.objects.create(
+                    job_type=schedule['job_type'],
+                    params=schedule.get('params', {}),
+                    schedule=schedule['name'],
+                    scheduled_for=due,
+                ))
+        except IntegrityError:
+            pass
+    return created
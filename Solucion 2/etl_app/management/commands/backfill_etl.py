@@ -0,0 +1,124 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from etl_app.backfill import discover_week_pairs, init_worker, parse_week
+from etl_app.jobs import command_lock, heartbeat
+from etl_app.models import WeekPartition
+from etl_app.partitions import drop_partition
+from etl_app.resolver import save_resolutions
+from etl_app.snapshot import publish_snapshot
+from etl_app.pipeline import store_results, update_log
+
+class Command(BaseCommand):
+    help = ("Reconstruye el histórico: procesa en paralelo todos los pares semanales "
+            "alarmas/outages de una carpeta y los guarda con un único escritor")
+
+    def add_arguments(self, parser):
+        parser.add_argument('folder', nargs='?', default=os.getcwd(),
+                            help="Carpeta con los archivos semanales (por defecto la actual)")
+        parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                            help="Procesos para leer y unir archivos")
+        parser.add_argument('--lean', action='store_true',
+                            help="Usa el modo lean del ETL (menos memoria por proceso)")
+        parser.add_argument('--force', action='store_true',
+                            help="Reprocesa también las semanas que ya están cargadas y reemplaza sus datos")
+
+    def pending_pairs(self, pairs, force):
+        """
+        Reanudación: se omiten las semanas ya registradas con los mismos archivos.
+        Cada semana se guarda en su propia transacción, así que una ejecución
+        interrumpida deja cargadas solo semanas completas.
+        """
+        if force:
+            return pairs
+        loaded = {
+            (p.key, p.alarms_file, p.outages_file)
+            for p in WeekPartition.objects.all()
+        }
+        return [
+            (week, alarms_file, outages_file) for week, alarms_file, outages_file in pairs
+            if (week, os.path.basename(alarms_file), os.path.basename(outages_file)) not in loaded
+        ]
+
+    def progress(self, done, total, week, status, started):
+        elapsed = time.monotonic() - started
+        rate = done / (elapsed / 60.0) if elapsed > 0 else 0.0
+        self.stdout.write(f"[{done:>{len(str(total))}}/{total}] semana {week}: {status} "
+                          f"({rate:.1f} semanas/min)")
+
+    def handle(self, *args, **options):
+        folder = options['folder']
+        if not os.path.isdir(folder):
+            raise CommandError(f"No existe la carpeta {folder}")
+        # Mismo candado que el worker y process_etl: escriben las mismas particiones
+        with command_lock('backfill_etl'):
+            self.backfill(folder, options)
+
+    def backfill(self, folder, options):
+        pairs, unpaired = discover_week_pairs(folder)
+        for path in unpaired:
+            update_log(f"Archivo sin pareja, se omite: {path}")
+        pending = self.pending_pairs(pairs, options['force'])
+        skipped = len(pairs) - len(pending)
+        update_log(f"{len(pairs)} semanas encontradas, {skipped} ya cargadas, {len(pending)} por procesar.")
+        if not pending:
+            self.stdout.write(self.style.SUCCESS("No hay semanas pendientes."))
+            return
+
+        workers = max(1, options['workers'])
+        files = {week: (alarms_file, outages_file) for week, alarms_file, outages_file in pending}
+        queue = list(pending)
+        in_flight = set()
+        done, failed, rows = 0, [], 0
+        started = time.monotonic()
+
+        # Los procesos hijos heredan (fork) la conexión SQLite abierta del padre;
+        # se cierra antes para que ninguno use el mismo descriptor
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            while queue or in_flight:
+                # Se limita el número de semanas en vuelo para que los resultados
+                # no se acumulen en memoria mientras el escritor guarda.
+                while queue and len(in_flight) < workers * 2:
+                    week, alarms_file, outages_file = queue.pop(0)
+                    in_flight.add(pool.submit(parse_week, week, alarms_file, outages_file, options['lean']))
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                # Cada semana terminada renueva el candado: un backfill largo no vence
+                heartbeat('backfill_etl')
+                for future in finished:
+                    done += 1
+                    try:
+                        week, df_alarms, df_outages, df_joined, resolutions, quarantine = future.result()
+                    except Exception as e:
+                        failed.append(str(e))
+                        self.progress(done, len(pending), '?', f"error ({e})", started)
+                        continue
+                    if df_alarms is None or df_outages is None:
+                        failed.append(str(week))
+                        self.progress(done, len(pending), week, "error al leer archivos", started)
+                        continue
+                    # Escritor único: solo este proceso toca la base de datos
+                    save_resolutions(resolutions)
+                    alarms_file, outages_file = files[week]
+                    with transaction.atomic():
+                        # Sin borrar la semana, sus huellas ya cargadas no se volverían a
+                        # insertar y --force no cambiaría nada
+                        if options['force']:
+                            drop_partition(week)
+                        rows += store_results(df_alarms, df_outages, df_joined, week,
+                                              alarms_file, outages_file, quarantine)
+                    self.progress(done, len(pending), week, f"{len(df_joined)} registros en el JOIN", started)
+
+        elapsed = time.monotonic() - started
+        loaded = len(pending) - len(failed)
+        if loaded:
+            publish_snapshot()
+        rate = loaded / (elapsed / 60.0) if elapsed > 0 else 0.0
+        summary = (f"Backfill: {loaded} semanas cargadas, {len(failed)} con error, {skipped} omitidas; "
+                   f"{rows} registros insertados en {elapsed:.1f} s ({rate:.2f} semanas/min, {workers} procesos).")
+        if failed:
+            self.stdout.write(self.style.WARNING(summary))
+        else:
+            self.stdout.write(self.style.SUCCESS(summary))
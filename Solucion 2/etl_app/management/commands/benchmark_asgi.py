@@ -0,0 +1,81 @@
+import os
+import tempfile
+import importlib.util
+from django.core.management.base import CommandError
+from etl_app.management.commands.load_test import Command as LoadTestCommand
+
+# Rango que cubre todas las semanas sintéticas: obliga a consultar la base en vez
+# de servir el snapshot, que es donde las vistas síncrona y asíncrona difieren
+RANGE = '?start=2024-01-01&end=2026-12-31'
+
+# (vista síncrona servida por WSGI, vista asíncrona servida por ASGI)
+PAIRS = [
+    ('/' + RANGE, '/async/' + RANGE),
+    ('/dashboard-mas/' + RANGE, '/async/dashboard-mas/' + RANGE),
+]
+
+SERVERS = {
+    'WSGI': ('core.wsgi:application', 'gthread'),
+    'ASGI': ('core.asgi:application', 'uvicorn_worker.UvicornWorker'),
+}
+
+class Command(LoadTestCommand):
+    help = ("Compara la latencia de los dashboards síncronos bajo WSGI (gunicorn gthread) con la de "
+            "las vistas asíncronas bajo ASGI (gunicorn + uvicorn) a varias escalas de datos")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,4,8',
+                            help="Semanas sintéticas por escala, separadas por coma (por defecto 1,4,8)")
+        parser.add_argument('--sites', type=int, default=500, help="Sitios sintéticos por semana")
+        parser.add_argument('--requests', type=int, default=30, help="Peticiones por endpoint, escala y concurrencia")
+        parser.add_argument('--concurrency', default='1,8',
+                            help="Clientes concurrentes a medir, separados por coma (por defecto 1,8)")
+        parser.add_argument('--gunicorn-workers', type=int, default=2)
+        parser.add_argument('--gunicorn-threads', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8766)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        scales = [int(s) for s in options['scales'].split(',') if s.strip()]
+        levels = [int(c) for c in options['concurrency'].split(',') if c.strip()]
+        # Falla antes de sembrar si falta el worker ASGI (gunicorn solo diría que no arrancó)
+        worker_module = SERVERS['ASGI'][1].rsplit('.', 1)[0]
+        if importlib.util.find_spec(worker_module) is None:
+            raise CommandError(f"Falta el paquete {worker_module} (pip install -r requirements.txt)")
+        # Las consultas concurrentes solo bajan la latencia si hay núcleos libres
+        self.stdout.write(f"CPUs disponibles: {os.cpu_count()}")
+
+        with tempfile.TemporaryDirectory(prefix='benchmark_asgi_') as folder:
+            for scale in scales:
+                db_path = os.path.join(folder, f"benchmark_x{scale}.sqlite3")
+                self.seed_scale(db_path, scale, options)
+
+                results = {}
+                for mode, (app, worker_class) in SERVERS.items():
+                    endpoints = [pair[0 if mode == 'WSGI' else 1] for pair in PAIRS]
+                    process, base_url = self.start_gunicorn(
+                        db_path, options, os.path.join(folder, f"{mode.lower()}_x{scale}.log"),
+                        app=app, worker_class=worker_class,
+                    )
+                    try:
+                        for clients in levels:
+                            metrics, _ = self.run_load(base_url, options['requests'], clients,
+                                                       options['seed'], endpoints=endpoints)
+                            for i, endpoint in enumerate(endpoints):
+                                if metrics[endpoint]['errors']:
+                                    raise CommandError(f"{mode} {endpoint}: {metrics[endpoint]['errors']} errores")
+                                results[mode, clients, i] = metrics[endpoint]
+                    finally:
+                        process.terminate()
+                        process.wait(timeout=30)
+
+                self.stdout.write(f"{'vista':<16}{'clientes':>9}{'WSGI p50':>10}{'WSGI p95':>10}"
+                                  f"{'ASGI p50':>10}{'ASGI p95':>10}{'ASGI/WSGI':>11}")
+                for clients in levels:
+                    for i, (sync_endpoint, _) in enumerate(PAIRS):
+                        wsgi, asgi = results['WSGI', clients, i], results['ASGI', clients, i]
+                        name = sync_endpoint.split('?')[0]
+                        self.stdout.write(f"{name:<16}{clients:>9}{wsgi['p50_ms']:>10.1f}{wsgi['p95_ms']:>10.1f}"
+                                          f"{asgi['p50_ms']:>10.1f}{asgi['p95_ms']:>10.1f}"
+                                          f"{asgi['p50_ms'] / wsgi['p50_ms']:>10.2f}x")
+                self.stdout.write("")
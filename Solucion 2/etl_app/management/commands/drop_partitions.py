@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from etl_app.models import WeekPartition
+from etl_app.partitions import drop_partition
+from etl_app.snapshot import publish_snapshot
+from etl_app.pipeline import update_log
+
+class Command(BaseCommand):
+    help = "Política de retención: elimina particiones semanales completas"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int,
+                            help="Conserva solo las N semanas más recientes")
+        parser.add_argument('--before', type=int,
+                            help="Elimina las semanas con llave menor a la indicada (AAAASS)")
+        parser.add_argument('--week', type=int, action='append', default=[],
+                            help="Elimina la semana indicada (AAAASS); puede repetirse")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Solo muestra las particiones que se eliminarían")
+
+    def handle(self, *args, **options):
+        keys = list(WeekPartition.objects.order_by('-key').values_list('key', flat=True))
+        if options['keep'] is None and options['before'] is None and not options['week']:
+            raise CommandError("Indica --keep, --before o --week.")
+
+        to_drop = set(options['week'])
+        if options['keep'] is not None:
+            to_drop.update(keys[options['keep']:])
+        if options['before'] is not None:
+            to_drop.update(k for k in keys if k < options['before'])
+
+        if not to_drop:
+            self.stdout.write("No hay particiones que eliminar.")
+            return
+        for key in sorted(to_drop):
+            if options['dry_run']:
+                self.stdout.write(f"Se eliminaría la partición {key}.")
+                continue
+            deleted = drop_partition(key)
+            update_log(f"Partición {key} eliminada ({deleted} registros).")
+        if not options['dry_run']:
+            publish_snapshot()
+            self.stdout.write(self.style.SUCCESS(f"{len(to_drop)} particiones eliminadas."))
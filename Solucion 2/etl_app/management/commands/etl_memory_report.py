@@ -0,0 +1,96 @@
+import os
+import gc
+import tempfile
+import tracemalloc
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from etl_app.pipeline import (
+    etl_alarms, etl_outages, join_alarms_outages, join_alarms_outages_lean, update_log,
+)
+from etl_app.resolver import LRUCache, SiteResolver
+
+def measure_peak(func, *args, **kwargs):
+    """
+    Ejecuta `func` y devuelve (resultado, pico de memoria en MB) medido con tracemalloc.
+    numpy y pandas reportan sus buffers a tracemalloc, así que el pico incluye los DataFrames.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / (1024 * 1024)
+
+def run_pipeline(alarms_file, outages_file, lean):
+    # Resolver nuevo por variante: LRU vacía (la primera medición no calienta la de la
+    # segunda) y sin guardar en SiteResolution, así medir no modifica la base
+    resolver = SiteResolver(persist=False, cache=LRUCache(getattr(settings, 'SITE_RESOLVER_CACHE_SIZE', 50000)))
+    df_alarms = etl_alarms(alarms_file, lean=lean, resolver=resolver)
+    df_outages = etl_outages(outages_file, lean=lean, resolver=resolver)
+    if lean:
+        df_joined = join_alarms_outages_lean(df_alarms, df_outages)
+    else:
+        df_joined = join_alarms_outages(df_alarms, df_outages)
+    return len(df_alarms), len(df_outages), len(df_joined)
+
+def build_synthetic_week(alarms_file, outages_file, scale, folder):
+    """
+    Genera una semana sintética `scale` veces más grande replicando los archivos
+    de muestra. Cada réplica usa sitios distintos (sufijo numérico) para que el
+    JOIN crezca de forma lineal y no cuadrática.
+    """
+    sheets = pd.read_excel(alarms_file, sheet_name=None)
+    synthetic_alarms = os.path.join(folder, f"alarms_x{scale}.xlsx")
+    with pd.ExcelWriter(synthetic_alarms) as writer:
+        for sheet_name, df_tab in sheets.items():
+            copies = []
+            for i in range(scale):
+                copy = df_tab.copy()
+                copy['Alarm Source'] = copy['Alarm Source'].astype(str) + f"{i:02d}"
+                copies.append(copy)
+            pd.concat(copies, ignore_index=True).to_excel(writer, sheet_name=sheet_name, index=False)
+
+    df_outages = pd.read_csv(outages_file)
+    copies = []
+    for i in range(scale):
+        copy = df_outages.copy()
+        copy['MO Name'] = copy['MO Name'].str.replace(
+            r'(NodeB Name=[A-Za-z0-9]+)', rf'\g<1>{i:02d}', regex=True)
+        copies.append(copy)
+    synthetic_outages = os.path.join(folder, f"outages_x{scale}.csv")
+    pd.concat(copies, ignore_index=True).to_csv(synthetic_outages, index=False)
+    return synthetic_alarms, synthetic_outages
+
+class Command(BaseCommand):
+    help = "Compara el pico de memoria del ETL actual contra el modo lean (semana de muestra y semana sintética)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alarms', default="LOGS DE AE SEMANA 01-2025.xlsx")
+        parser.add_argument('--outages', default="nodeb_unavailable_2025 01.csv")
+        parser.add_argument('--scale', type=int, default=10,
+                            help="Factor de la semana sintética (0 para omitirla)")
+
+    def report(self, label, alarms_file, outages_file):
+        counts, peak_default = measure_peak(run_pipeline, alarms_file, outages_file, lean=False)
+        lean_counts, peak_lean = measure_peak(run_pipeline, alarms_file, outages_file, lean=True)
+        if counts != lean_counts:
+            self.stdout.write(self.style.WARNING(
+                f"{label}: los conteos difieren entre modos {counts} vs {lean_counts}"))
+        saving = 100.0 * (peak_default - peak_lean) / peak_default if peak_default else 0.0
+        self.stdout.write(
+            f"{label:<22} alarmas={counts[0]:>8} outages={counts[1]:>7} join={counts[2]:>7} | "
+            f"pico actual={peak_default:8.1f} MB  pico lean={peak_lean:8.1f} MB  ahorro={saving:5.1f}%"
+        )
+
+    def handle(self, *args, **options):
+        self.report("Semana de muestra", options['alarms'], options['outages'])
+        scale = options['scale']
+        if scale > 1:
+            with tempfile.TemporaryDirectory() as folder:
+                update_log(f"Generando semana sintética x{scale}...")
+                alarms_file, outages_file = build_synthetic_week(
+                    options['alarms'], options['outages'], scale, folder)
+                self.report(f"Semana sintética x{scale}", alarms_file, outages_file)
@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import time
+import random
+import datetime
+import tempfile
+import subprocess
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+# Rango dentro de la primera semana sintética (202501 = semana ISO del 2024-12-30):
+# con varias semanas sembradas las consultas con rango solo deben leer esa partición
+RANGE = 'start=2024-12-31&end=2025-01-04'
+
+# Endpoints medidos: pantallas de pared (dashboards) y consultas de analistas (APIs).
+# Sin rango, `/` y `/dashboard-mas/` salen del snapshot; las variantes con rango y
+# por sitio son las que ejercitan la poda de particiones y el número de consultas.
+ENDPOINTS = [
+    '/',
+    '/dashboard-mas/',
+    '/api/availability/',
+    '/api/availability/?level=site',
+    f'/api/availability/?{RANGE}',
+    f'/api/availability/?site=SYN00000&{RANGE}',
+    '/api/backup-distribution/',
+    f'/api/backup-distribution/?{RANGE}',
+    '/api/lead-times/',
+    '/api/timeseries/?series=alarms',
+    '/api/timeseries/?series=outages',
+    f'/api/timeseries/?series=alarms&{RANGE}',
+    f'/api/timeseries/?series=outages&{RANGE}',
+]
+
+SYNTHETIC_REGIONS = ['NORTE', 'CENTRO PENINSULA', 'PACIFICOGOLFO', 'PENINSULA']
+# Tipos de alarma sintéticos y su peso relativo (aproximado al de los reportes reales)
+SYNTHETIC_ALARMS = {
+    'POWER SUPPLY DC OUTPUT OUT OF RANGE': 28,
+    'MAINS INPUT OUT OF RANGE': 17,
+    'MAJOR RECT FAILURE': 13,
+    'AC POWER FAIL': 6,
+    'HIGH TEMPERATURE': 4,
+    'GENERATOR RUNNING': 4,
+    'BATTERY POWER UNAVAILABLE': 2,
+    'MINOR RECT FAILURE': 2,
+    'LOW DC VOLTAGE': 2,
+    'LOW BATTERY VOLTAGE': 1,
+}
+
+def synthetic_week(week, sites, rng, alarms_per_site=20, outages_per_site=2):
+    """
+    DataFrames de alarmas y outages de una semana con la forma que deja el ETL
+    (columnas normalizadas y sitio ya resuelto). La semilla fija `rng` hace que
+    cada escala genere siempre los mismos datos.
+    """
+    year, number = divmod(week, 100)
+    start = pd.Timestamp(datetime.date.fromisocalendar(year, number, 1))
+    codes = np.array([f"SYN{i:05d}" for i in range(sites)], dtype=object)
+    regions = np.array([SYNTHETIC_REGIONS[i % len(SYNTHETIC_REGIONS)] for i in range(sites)], dtype=object)
+    names = np.array(list(SYNTHETIC_ALARMS), dtype=object)
+    weights = np.array(list(SYNTHETIC_ALARMS.values()), dtype=float)
+
+    n = sites * alarms_per_site
+    site = rng.integers(0, sites, n)
+    occurred = start + pd.to_timedelta(rng.integers(0, 7 * 24 * 3600, n), unit='s')
+    df_alarms = pd.DataFrame({
+        'alarm_occurred_on': occurred,
+        'alarm_cleared_on': occurred + pd.to_timedelta(rng.exponential(1800, n).astype(int), unit='s'),
+        'alarm_source': codes[site],
+        'alarm_name': names[rng.choice(len(names), n, p=weights / weights.sum())],
+        'region': regions[site],
+        'site_parsed_alarm': codes[site],
+    })
+
+    n = sites * outages_per_site
+    site = rng.integers(0, sites, n)
+    occurred = start + pd.to_timedelta(rng.integers(0, 7 * 24 * 3600, n), unit='s')
+    df_outages = pd.DataFrame({
+        'outage_occurred_on': occurred,
+        'outage_cleared_on': occurred + pd.to_timedelta(rng.exponential(1200, n).astype(int), unit='s'),
+        'mo_name': [f"NODEB NAME{code} LOGICRNCID141" for code in codes[site]],
+        'outage_name': 'NODEB UNAVAILABLE',
+        'site_parsed_outage': codes[site],
+    })
+    return df_alarms, df_outages
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else None
+
+class Command(BaseCommand):
+    help = ("Prueba de carga de los dashboards: siembra datos sintéticos a varias escalas, "
+            "levanta gunicorn y mide throughput, latencias p50/p95/p99 y consultas SQL por endpoint")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,4',
+                            help="Semanas sintéticas por escala, separadas por coma (por defecto 1,4)")
+        parser.add_argument('--sites', type=int, default=500, help="Sitios sintéticos por semana")
+        parser.add_argument('--requests', type=int, default=50, help="Peticiones por endpoint y escala")
+        parser.add_argument('--concurrency', type=int, default=8, help="Clientes concurrentes")
+        parser.add_argument('--gunicorn-workers', type=int, default=2)
+        parser.add_argument('--gunicorn-threads', type=int, default=4)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'loadtest_baseline.json'),
+                            help="Resultados de referencia para detectar regresiones")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Guarda los resultados de esta corrida como nueva referencia")
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help="Aumento relativo de p95 tolerado antes de fallar (0.25 = 25%%)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prepare', action='store_true',
+                            help="(interno) Migra y siembra la base de DJANGO_DB_PATH e imprime las consultas por endpoint")
+
+    ###############################################
+    # Preparación (se ejecuta en un subproceso con DJANGO_DB_PATH)
+    ###############################################
+    def prepare(self, weeks, sites, seed):
+        from django.db import connection
+        from django.test import Client
+        from django.test.utils import CaptureQueriesContext
+        from etl_app.pipeline import join_alarms_outages, store_results
+        from etl_app.snapshot import publish_snapshot
+
+        call_command('migrate', verbosity=0)
+        rng = np.random.default_rng(seed)
+        for i in range(weeks):
+            week = 202501 + i
+            df_alarms, df_outages = synthetic_week(week, sites, rng)
+            store_results(df_alarms, df_outages, join_alarms_outages(df_alarms, df_outages), week,
+                          f"synthetic_{week}.xlsx", f"synthetic_{week}.csv")
+        publish_snapshot()
+
+        client = Client(SERVER_NAME='localhost')
+        queries = {}
+        for endpoint in ENDPOINTS:
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(endpoint)
+            if response.status_code != 200:
+                raise CommandError(f"{endpoint} respondió {response.status_code}")
+            queries[endpoint] = len(captured.captured_queries)
+        self.stdout.write(json.dumps(queries))
+
+    def seed_scale(self, db_path, scale, options):
+        """
+        Siembra `scale` semanas en una base nueva (subproceso con DJANGO_DB_PATH) y
+        devuelve las consultas SQL por endpoint.
+        """
+        self.stdout.write(f"Escala {scale}: sembrando {scale} semanas x {options['sites']} sitios...")
+        prepared = subprocess.run(
+            [sys.executable, 'manage.py', 'load_test', '--prepare', '--scales', str(scale),
+             '--sites', str(options['sites']), '--seed', str(options['seed'])],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_DB_PATH=db_path, ETL_SNAPSHOT_PATH=db_path + '.snapshot'),
+            capture_output=True, text=True,
+        )
+        if prepared.returncode != 0:
+            raise CommandError(f"Error al sembrar la escala {scale}:\n{prepared.stderr[-2000:]}")
+        return json.loads(prepared.stdout.strip().splitlines()[-1])
+
+    ###############################################
+    # Servidor y cliente concurrente
+    ###############################################
+    def start_gunicorn(self, db_path, options, log_path, app='core.wsgi:application', worker_class='gthread'):
+        env = dict(os.environ,
+                   DJANGO_DB_PATH=db_path,
+                   ETL_SNAPSHOT_PATH=db_path + '.snapshot',
+                   DJANGO_ALLOWED_HOSTS='127.0.0.1,localhost',
+                   GUNICORN_BIND=f"127.0.0.1:{options['port']}",
+                   WEB_CONCURRENCY=str(options['gunicorn_workers']),
+                   GUNICORN_THREADS=str(options['gunicorn_threads']),
+                   GUNICORN_WORKER_CLASS=worker_class,
+                   GUNICORN_LOGLEVEL='warning')
+        log = open(log_path, 'w')
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', app],
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        base_url = f"http://127.0.0.1:{options['port']}"
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f"gunicorn terminó al iniciar; revisa {log_path}")
+            try:
+                urllib.request.urlopen(base_url + '/api/lead-times/', timeout=2).read()
+                return process, base_url
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.3)
+        process.terminate()
+        raise CommandError(f"gunicorn no respondió en 30 s; revisa {log_path}")
+
+    def fetch(self, url):
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                response.read()
+                ok = response.status == 200
+        except (urllib.error.URLError, ConnectionError):
+            ok = False
+        return time.perf_counter() - started, ok
+
+    def run_load(self, base_url, requests_per_endpoint, concurrency, seed, endpoints=ENDPOINTS):
+        """
+        Mezcla aleatoria (con semilla) de peticiones a todos los endpoints lanzada
+        con `concurrency` clientes a la vez. Devuelve {endpoint: métricas}.
+        """
+        for endpoint in endpoints:  # calentamiento: cachés de proceso y de SQLite
+            self.fetch(base_url + endpoint)
+        plan = list(endpoints) * requests_per_endpoint
+        random.Random(seed).shuffle(plan)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(lambda endpoint: (endpoint, *self.fetch(base_url + endpoint)), plan))
+        elapsed = time.perf_counter() - started
+
+        metrics = {}
+        for endpoint in endpoints:
+            latencies = [t * 1000 for e, t, ok in results if e == endpoint and ok]
+            errors = sum(1 for e, t, ok in results if e == endpoint and not ok)
+            metrics[endpoint] = {
+                'requests': len(latencies) + errors,
+                'errors': errors,
+                'rps': len(latencies) / elapsed if elapsed else 0.0,
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+            }
+        total_rps = sum(1 for _, _, ok in results if ok) / elapsed if elapsed else 0.0
+        return metrics, total_rps
+
+    ###############################################
+    # Regresiones
+    ###############################################
+    def regressions(self, results, baseline, threshold):
+        found = []
+        for key, current in results.items():
+            # Los errores cuentan aunque el endpoint aún no tenga referencia
+            if current['errors']:
+                found.append(f"{key}: {current['errors']} errores")
+            previous = baseline.get(key)
+            if not previous:
+                continue
+            if previous.get('p95_ms') and current['p95_ms'] and \
+                    current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+                found.append(f"{key}: p95 {current['p95_ms']:.1f} ms vs {previous['p95_ms']:.1f} ms")
+            if current['queries'] > previous.get('queries', current['queries']):
+                found.append(f"{key}: {current['queries']} consultas SQL vs {previous['queries']}")
+        return found
+
+    def handle(self, *args, **options):
+        scales = [int(s) for s in options['scales'].split(',') if s.strip()]
+        if options['prepare']:
+            self.prepare(scales[0], options['sites'], options['seed'])
+            return
+
+        results = {}
+        with tempfile.TemporaryDirectory(prefix='loadtest_') as folder:
+            for scale in scales:
+                db_path = os.path.join(folder, f"loadtest_x{scale}.sqlite3")
+                queries = self.seed_scale(db_path, scale, options)
+
+                process, base_url = self.start_gunicorn(db_path, options, os.path.join(folder, f"gunicorn_x{scale}.log"))
+                try:
+                    metrics, total_rps = self.run_load(base_url, options['requests'],
+                                                       options['concurrency'], options['seed'])
+                finally:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+                width = max(len(endpoint) for endpoint in ENDPOINTS) + 2
+                self.stdout.write(f"{'endpoint':<{width}}{'req':>6}{'err':>5}{'req/s':>8}"
+                                  f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'SQL':>5}")
+                for endpoint in ENDPOINTS:
+                    m = dict(metrics[endpoint], queries=queries[endpoint])
+                    results[f"x{scale} {endpoint}"] = m
+                    fmt = lambda v: f"{v:9.1f}" if v is not None else f"{'-':>9}"
+                    self.stdout.write(f"{endpoint:<{width}}{m['requests']:>6}{m['errors']:>5}{m['rps']:>8.1f}"
+                                      f"{fmt(m['p50_ms'])}{fmt(m['p95_ms'])}{fmt(m['p99_ms'])}{m['queries']:>5}")
+                self.stdout.write(f"Total escala {scale}: {total_rps:.1f} req/s con {options['concurrency']} clientes\n")
+
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        found = self.regressions(results, baseline, options['threshold'])
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Referencia guardada en {options['baseline']}")
+        if found:
+            raise CommandError("Regresiones detectadas:\n  " + "\n  ".join(found))
+        if baseline:
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto a la referencia."))
@@ -0,0 +1,27 @@
+import time
+from django.core.management.base import BaseCommand
+from etl_app.jobs import claim_next_job, enqueue_due_schedules, run_job
+from etl_app.pipeline import update_log
+
+class Command(BaseCommand):
+    help = "Worker local: encola los trabajos programados y ejecuta la cola del ETL"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=15.0,
+                            help="Segundos entre revisiones de la cola")
+        parser.add_argument('--once', action='store_true',
+                            help="Procesa la cola pendiente y termina")
+
+    def handle(self, *args, **options):
+        update_log("=== Worker del ETL iniciado ===")
+        while True:
+            enqueue_due_schedules()
+            job = claim_next_job()
+            while job is not None:
+                update_log(f"Ejecutando trabajo {job.pk} ({job.job_type}).")
+                job = run_job(job)
+                update_log(f"Trabajo {job.pk} terminó con estado '{job.status}' {job.stage_durations}.")
+                job = claim_next_job()
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,86 @@
+import os
+import re
+import mimetypes
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.http import http_date
+
+# Nombres generados por ManifestStaticFilesStorage: archivo.<hash de 12 hex>.ext
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+SHORT_CACHE = 'public, max-age=60'
+
+def accepted_encodings(header):
+    """
+    {codificación: q} de un encabezado Accept-Encoding ("br;q=1.0, gzip;q=0.5, *;q=0").
+    Una q inválida cuenta como 0 (no aceptada).
+    """
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+class CompressedStaticMiddleware:
+    """
+    Sirve los archivos de STATIC_ROOT (generados por collectstatic) antes de llegar
+    a las vistas. Si el cliente acepta br o gzip y existe la versión precomprimida
+    se envía esa; los archivos con hash en el nombre se marcan como inmutables
+    para que el navegador no vuelva a pedirlos.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.static_url = settings.STATIC_URL
+        self.static_root = str(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+
+    def __call__(self, request):
+        if (self.static_root and request.method in ('GET', 'HEAD')
+                and request.path.startswith(self.static_url)):
+            response = self.serve(request, request.path[len(self.static_url):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        try:
+            path = safe_join(self.static_root, name)
+        except (ValueError, SuspiciousFileOperation):
+            # Rutas fuera de STATIC_ROOT (../) siguen a las vistas y terminan en 404
+            return None
+        if not os.path.isfile(path):
+            return None
+
+        # Se elige la variante con mayor q (a igual q, br antes que gzip); q=0 la excluye
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        served_path, encoding, best = path, None, 0.0
+        for suffix, candidate, aliases in (('.br', 'br', ('br',)), ('.gz', 'gzip', ('gzip', 'x-gzip'))):
+            q = next((accepted[alias] for alias in aliases if alias in accepted), accepted.get('*', 0.0))
+            if q > best and os.path.isfile(path + suffix):
+                served_path, encoding, best = path + suffix, candidate, q
+
+        content_type, _ = mimetypes.guess_type(path)
+        stat = os.stat(served_path)
+        response = FileResponse(open(served_path, 'rb'), content_type=content_type or 'application/octet-stream')
+        # FileResponse agrega Content-Disposition con el nombre del archivo abierto;
+        # un recurso estático no lo lleva
+        response.headers.pop('Content-Disposition', None)
+        response['Content-Length'] = stat.st_size
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = IMMUTABLE_CACHE if HASHED_NAME.search(name) else SHORT_CACHE
+        if encoding:
+            response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,81 @@
+# Esquema normalizado: dimensiones Site/Region/AlarmType y tablas de hechos con
+# llaves enteras. Las tablas de hechos se recrean porque el ETL las recarga
+# completas en cada ejecución.
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Alarm',
+        ),
+        migrations.DeleteModel(
+            name='Outage',
+        ),
+        migrations.DeleteModel(
+            name='JoinedRecord',
+        ),
+        migrations.CreateModel(
+            name='AlarmType',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Region',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Site',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=100, unique=True)),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='etl_app.region')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Alarm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alarm_occurred_on', models.DateTimeField(blank=True, null=True)),
+                ('alarm_cleared_on', models.DateTimeField(blank=True, null=True)),
+                ('alarm_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.alarmtype')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Outage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outage_occurred_on', models.DateTimeField(blank=True, null=True)),
+                ('outage_cleared_on', models.DateTimeField(blank=True, null=True)),
+                ('outage_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.alarmtype')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JoinedRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('alarm_occurred_on', models.DateTimeField(blank=True, null=True)),
+                ('outage_occurred_on', models.DateTimeField(blank=True, null=True)),
+                ('outage_cleared_on', models.DateTimeField(blank=True, null=True)),
+                ('backup_minutes', models.FloatField(blank=True, null=True)),
+                ('alarm_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.alarmtype')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0002_normalized_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WeekPartition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.IntegerField(unique=True)),
+                ('start', models.DateTimeField(blank=True, null=True)),
+                ('end', models.DateTimeField(blank=True, null=True)),
+                ('alarms_file', models.CharField(blank=True, max_length=255)),
+                ('outages_file', models.CharField(blank=True, max_length=255)),
+                ('alarm_count', models.IntegerField(default=0)),
+                ('outage_count', models.IntegerField(default=0)),
+                ('joined_count', models.IntegerField(default=0)),
+                ('loaded_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='alarm',
+            name='week',
+            field=models.IntegerField(db_index=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='outage',
+            name='week',
+            field=models.IntegerField(db_index=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='joinedrecord',
+            name='week',
+            field=models.IntegerField(db_index=True, default=0),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0004_etl_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegionAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('site_count', models.IntegerField()),
+                ('window_minutes', models.FloatField()),
+                ('outage_minutes', models.FloatField()),
+                ('outage_intervals', models.IntegerField()),
+                ('availability_pct', models.FloatField()),
+                ('minor_overlap_minutes', models.FloatField()),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+            ],
+            options={
+                'unique_together': {('week', 'region')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SiteAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('window_minutes', models.FloatField()),
+                ('outage_minutes', models.FloatField()),
+                ('outage_intervals', models.IntegerField()),
+                ('availability_pct', models.FloatField()),
+                ('minor_overlap_minutes', models.FloatField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+            options={
+                'unique_together': {('week', 'site')},
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0005_availability'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteResolution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('raw_source', models.CharField(max_length=255, unique=True)),
+                ('site_code', models.CharField(blank=True, max_length=100)),
+                ('logic_rnc_id', models.IntegerField(blank=True, null=True)),
+                ('parser_version', models.IntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0006_site_resolution'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('count', models.IntegerField()),
+                ('payload', models.BinaryField()),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+                ('site', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+        ),
+    ]
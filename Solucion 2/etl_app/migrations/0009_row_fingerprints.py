@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0008_quarantine'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alarm',
+            name='fingerprint',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='joinedrecord',
+            name='fingerprint',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='outage',
+            name='fingerprint',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0009_row_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlarmLeadTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('alarm_occurred_on', models.DateTimeField()),
+                ('outage_occurred_on', models.DateTimeField(blank=True, null=True)),
+                ('lead_minutes', models.FloatField(blank=True, null=True)),
+                ('alarm_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.alarmtype')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['week', 'alarm_type'], name='etl_app_ala_week_35f1b8_idx')],
+            },
+        ),
+    ]
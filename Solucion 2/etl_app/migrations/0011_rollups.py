@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0010_alarm_lead_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AlarmRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('granularity', models.CharField(max_length=5)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField()),
+                ('alarm_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.alarmtype')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.region')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='etl_app_ala_granula_daabe9_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='OutageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week', models.IntegerField(db_index=True)),
+                ('granularity', models.CharField(max_length=5)),
+                ('bucket', models.DateTimeField()),
+                ('count', models.IntegerField()),
+                ('minutes', models.FloatField()),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='etl_app.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['granularity', 'bucket'], name='etl_app_out_granula_9d9393_idx')],
+            },
+        ),
+    ]
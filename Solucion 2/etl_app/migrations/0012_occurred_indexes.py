@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0011_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alarm',
+            name='alarm_occurred_on',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='joinedrecord',
+            name='alarm_occurred_on',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='outage',
+            name='outage_occurred_on',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0012_occurred_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleState',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('last_fired', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 05:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('etl_app', '0013_schedule_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='joblock',
+            name='heartbeat',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,31 +1,269 @@
 from django.db import models
 
+###############################################
+# Dimensiones
+###############################################
+class Region(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class Site(models.Model):
+    code = models.CharField(max_length=100, unique=True)
+    region = models.ForeignKey(Region, null=True, blank=True, on_delete=models.SET_NULL)
+
+    def __str__(self):
+        return self.code
+
+class AlarmType(models.Model):
+    name = models.CharField(max_length=255, unique=True)
+
+    def __str__(self):
+        return self.name
+
+class SiteResolution(models.Model):
+    """
+    Caché persistente de parse_site_name: cadena de origen (Alarm Source / MO Name
+    ya normalizada) -> sitio y LogicRNCID. `parser_version` invalida las entradas
+    cuando cambia el parser.
+    """
+    raw_source = models.CharField(max_length=255, unique=True)
+    site_code = models.CharField(max_length=100, blank=True)
+    logic_rnc_id = models.IntegerField(null=True, blank=True)
+    parser_version = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+###############################################
+# Particiones semanales
+###############################################
+class WeekPartition(models.Model):
+    """
+    Registro de particiones cargadas. `key` es la semana (AAAASS, p. ej. 202501)
+    y `start`/`end` el rango real de fechas que contiene, usado para el recorte.
+    """
+    key = models.IntegerField(unique=True)
+    start = models.DateTimeField(null=True, blank=True)
+    end = models.DateTimeField(null=True, blank=True)
+    alarms_file = models.CharField(max_length=255, blank=True)
+    outages_file = models.CharField(max_length=255, blank=True)
+    alarm_count = models.IntegerField(default=0)
+    outage_count = models.IntegerField(default=0)
+    joined_count = models.IntegerField(default=0)
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return str(self.key)
+
+###############################################
+# Hechos
+###############################################
 class Alarm(models.Model):
-    alarm_occurred_on = models.DateTimeField(null=True, blank=True)
+    week = models.IntegerField(db_index=True)
+    # Huella de los campos normalizados (etl_app.quality.row_fingerprint)
+    fingerprint = models.BigIntegerField(unique=True, null=True, blank=True)
+    # Índice para rangos de fechas (date_hierarchy del admin y recorte fino de particiones)
+    alarm_occurred_on = models.DateTimeField(null=True, blank=True, db_index=True)
     alarm_cleared_on = models.DateTimeField(null=True, blank=True)
-    alarm_source = models.CharField(max_length=255)
-    alarm_name = models.CharField(max_length=255)
-    region = models.CharField(max_length=100)
-    site_parsed_alarm = models.CharField(max_length=100)
+    alarm_type = models.ForeignKey(AlarmType, on_delete=models.PROTECT)
+    region = models.ForeignKey(Region, on_delete=models.PROTECT)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
 
 class Outage(models.Model):
-    outage_occurred_on = models.DateTimeField(null=True, blank=True)
+    week = models.IntegerField(db_index=True)
+    fingerprint = models.BigIntegerField(unique=True, null=True, blank=True)
+    outage_occurred_on = models.DateTimeField(null=True, blank=True, db_index=True)
     outage_cleared_on = models.DateTimeField(null=True, blank=True)
-    mo_name = models.CharField(max_length=255)
-    outage_name = models.CharField(max_length=255)
-    site_parsed_outage = models.CharField(max_length=100)
+    outage_type = models.ForeignKey(AlarmType, on_delete=models.PROTECT)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
 
 class JoinedRecord(models.Model):
-    alarm_occurred_on = models.DateTimeField(null=True, blank=True)
-    alarm_cleared_on = models.DateTimeField(null=True, blank=True)
-    alarm_source = models.CharField(max_length=255)
-    alarm_name = models.CharField(max_length=255)
-    region = models.CharField(max_length=100)
-    site_parsed_alarm = models.CharField(max_length=100)
+    """
+    Tabla de hechos del JOIN alarma/outage. Solo guarda las llaves y los tiempos
+    necesarios para el cálculo del respaldo; el resto se obtiene de las dimensiones.
+    """
+    week = models.IntegerField(db_index=True)
+    fingerprint = models.BigIntegerField(unique=True, null=True, blank=True)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
+    region = models.ForeignKey(Region, on_delete=models.PROTECT)
+    alarm_type = models.ForeignKey(AlarmType, on_delete=models.PROTECT)
+    alarm_occurred_on = models.DateTimeField(null=True, blank=True, db_index=True)
     outage_occurred_on = models.DateTimeField(null=True, blank=True)
     outage_cleared_on = models.DateTimeField(null=True, blank=True)
-    mo_name = models.CharField(max_length=255)
-    outage_name = models.CharField(max_length=255)
-    site_parsed_outage = models.CharField(max_length=100)
-    battery_backup_time = models.CharField(max_length=100, blank=True)
-    backup_minutes = models.FloatField(null=True, blank=True)
\ No newline at end of file
+    backup_minutes = models.FloatField(null=True, blank=True)
+
+###############################################
+# Ejecuciones del ETL (cola, candados e historial)
+###############################################
+class EtlJob(models.Model):
+    """
+    Cola e historial de ejecuciones. El worker (run_etl_worker) toma los trabajos
+    en estado 'queued' y registra el progreso y la duración de cada etapa.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'En cola'),
+        (RUNNING, 'En ejecución'),
+        (SUCCEEDED, 'Completado'),
+        (FAILED, 'Fallido'),
+    ]
+
+    job_type = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    schedule = models.CharField(max_length=100, blank=True)
+    scheduled_for = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    stage = models.CharField(max_length=50, blank=True)
+    stage_durations = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        constraints = [
+            # Una ejecución programada se encola una sola vez aunque haya varios workers
+            models.UniqueConstraint(fields=['schedule', 'scheduled_for'], name='unique_scheduled_run',
+                                    condition=models.Q(scheduled_for__isnull=False)),
+        ]
+
+class JobLock(models.Model):
+    """
+    Candado single-flight: la fila existe mientras un worker (o un comando
+    lanzado a mano, sin job) ejecuta un trabajo. `job_type` guarda la llave del
+    candado (jobs.LOCK_KEYS), compartida por los tipos que escriben lo mismo.
+    El dueño actualiza `heartbeat` mientras avanza; el candado vence cuando deja
+    de hacerlo, no por lo que lleva tomado.
+    """
+    job_type = models.CharField(max_length=50, primary_key=True)
+    job = models.ForeignKey(EtlJob, null=True, on_delete=models.SET_NULL)
+    owner = models.CharField(max_length=100)
+    acquired_at = models.DateTimeField()
+    heartbeat = models.DateTimeField(null=True)
+
+class ScheduleState(models.Model):
+    """
+    Último minuto en que se encoló cada programación de settings.ETL_SCHEDULES,
+    para recuperar las ejecuciones que cayeron mientras el worker estaba ocupado
+    o detenido.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    last_fired = models.DateTimeField()
+
+###############################################
+# Disponibilidad (motor de intervalos)
+###############################################
+class SiteAvailability(models.Model):
+    """
+    Resultado semanal por sitio: minutos fuera de servicio (unión de outages),
+    número de intervalos fusionados y traslape con ventanas de MINOR RECT FAILURE.
+    """
+    week = models.IntegerField(db_index=True)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
+    window_minutes = models.FloatField()
+    outage_minutes = models.FloatField()
+    outage_intervals = models.IntegerField()
+    availability_pct = models.FloatField()
+    minor_overlap_minutes = models.FloatField()
+
+    class Meta:
+        unique_together = [('week', 'site')]
+
+class RegionAvailability(models.Model):
+    week = models.IntegerField(db_index=True)
+    region = models.ForeignKey(Region, on_delete=models.PROTECT)
+    site_count = models.IntegerField()
+    window_minutes = models.FloatField()
+    outage_minutes = models.FloatField()
+    outage_intervals = models.IntegerField()
+    availability_pct = models.FloatField()
+    minor_overlap_minutes = models.FloatField()
+
+    class Meta:
+        unique_together = [('week', 'region')]
+
+###############################################
+# Distribución de backup_minutes (sketches de cuantiles)
+###############################################
+class BackupSketch(models.Model):
+    """
+    Sketch serializado (etl_app.sketches.QuantileSketch) de backup_minutes por semana
+    y sitio, o por semana y región (site vacío). Se combinan al consultar un rango.
+    """
+    week = models.IntegerField(db_index=True)
+    site = models.ForeignKey(Site, null=True, blank=True, on_delete=models.PROTECT)
+    region = models.ForeignKey(Region, null=True, blank=True, on_delete=models.PROTECT)
+    count = models.IntegerField()
+    payload = models.BinaryField()
+
+###############################################
+# Cuarentena de calidad de datos
+###############################################
+class QuarantinedRow(models.Model):
+    """
+    Fila rechazada por la etapa de calidad (etl_app.quality). `reasons` lista los
+    códigos separados por coma y `raw` guarda la fila original en JSON.
+    """
+    week = models.IntegerField(db_index=True)
+    source = models.CharField(max_length=20)
+    sheet = models.CharField(max_length=100, blank=True)
+    reasons = models.CharField(max_length=200)
+    raw = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+###############################################
+# Correlación alarma -> outage por tipo de alarma
+###############################################
+class AlarmLeadTime(models.Model):
+    """
+    Tiempo entre una alarma de los tipos configurados en ETL_CORRELATION_PATTERNS
+    y el siguiente outage de su sitio (etl_app.correlation). Sin outage dentro de
+    la ventana, outage_occurred_on y lead_minutes quedan vacíos.
+    """
+    week = models.IntegerField(db_index=True)
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
+    region = models.ForeignKey(Region, on_delete=models.PROTECT)
+    alarm_type = models.ForeignKey(AlarmType, on_delete=models.PROTECT)
+    alarm_occurred_on = models.DateTimeField()
+    outage_occurred_on = models.DateTimeField(null=True, blank=True)
+    lead_minutes = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['week', 'alarm_type'])]
+
+###############################################
+# Rollups por hora / día (series de tiempo)
+###############################################
+class AlarmRollup(models.Model):
+    """
+    Alarmas por región, tipo y cubeta (`granularity` 'hour' o 'day'). Una cubeta
+    puede tener filas de dos semanas; las consultas las suman.
+    """
+    week = models.IntegerField(db_index=True)
+    granularity = models.CharField(max_length=5)
+    bucket = models.DateTimeField()
+    region = models.ForeignKey(Region, on_delete=models.PROTECT)
+    alarm_type = models.ForeignKey(AlarmType, on_delete=models.PROTECT)
+    count = models.IntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['granularity', 'bucket'])]
+
+class OutageRollup(models.Model):
+    """
+    Outages iniciados y minutos fuera de servicio por sitio y cubeta.
+    """
+    week = models.IntegerField(db_index=True)
+    granularity = models.CharField(max_length=5)
+    bucket = models.DateTimeField()
+    site = models.ForeignKey(Site, on_delete=models.PROTECT)
+    count = models.IntegerField()
+    minutes = models.FloatField()
+
+    class Meta:
+        indexes = [models.Index(fields=['granularity', 'bucket'])]
@@ -0,0 +1,127 @@
+import re
+import datetime
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+from etl_app.models import (
+    Alarm, Outage, JoinedRecord, WeekPartition, SiteAvailability, RegionAvailability,
+    BackupSketch, QuarantinedRow, AlarmLeadTime, AlarmRollup, OutageRollup,
+)
+
+# Tablas particionadas por semana y el campo de fecha usado para el recorte fino
+PARTITIONED_MODELS = {
+    Alarm: 'alarm_occurred_on',
+    Outage: 'outage_occurred_on',
+    JoinedRecord: 'alarm_occurred_on',
+}
+
+# Resultados calculados por semana (se recortan solo por llave)
+WEEKLY_SUMMARY_MODELS = [
+    SiteAvailability, RegionAvailability, BackupSketch, QuarantinedRow, AlarmLeadTime,
+    AlarmRollup, OutageRollup,
+]
+
+###############################################
+# Llaves de partición
+###############################################
+def week_key(year, week):
+    """
+    Llave entera de la partición: 2025, 1 -> 202501.
+    """
+    return int(year) * 100 + int(week)
+
+def week_from_filename(filename):
+    """
+    Obtiene la llave de semana a partir del nombre de los archivos de entrada.
+
+    Ejemplos:
+      "LOGS DE AE SEMANA 01-2025.xlsx"  -> 202501
+      "nodeb_unavailable_2025 01.csv"   -> 202501
+    """
+    name = str(filename).upper()
+    m = re.search(r'SEMANA\s*(\d{1,2})\D+(\d{4})', name)
+    if m:
+        return week_key(m.group(2), m.group(1))
+    m = re.search(r'(\d{4})[\s_-]+(\d{1,2})(?!\d)', name)
+    if m:
+        return week_key(m.group(1), m.group(2))
+    return None
+
+def week_from_dates(dates):
+    """
+    Llave ISO de la semana de la fecha mínima (respaldo cuando el nombre del archivo no la trae).
+    """
+    first = dates.min()
+    if pd.isnull(first):
+        return None
+    iso = first.isocalendar()
+    return week_key(iso[0], iso[1])
+
+###############################################
+# Capa de consulta con recorte de particiones
+###############################################
+def weeks_in_range(start=None, end=None):
+    """
+    Llaves de las particiones cuyo rango de datos se cruza con [start, end).
+    """
+    partitions = WeekPartition.objects.all()
+    if start is not None:
+        partitions = partitions.filter(end__gte=start)
+    if end is not None:
+        partitions = partitions.filter(start__lt=end)
+    return list(partitions.values_list('key', flat=True))
+
+def partitioned(model, start=None, end=None):
+    """
+    QuerySet del modelo limitado a las particiones semanales que tocan [start, end).
+    Primero se descartan particiones completas por llave (índice sobre `week`) y
+    después se aplica el filtro exacto sobre la fecha del registro.
+    """
+    queryset = model.objects.all()
+    if start is None and end is None:
+        return queryset
+    queryset = queryset.filter(week__in=weeks_in_range(start, end))
+    date_field = PARTITIONED_MODELS[model]
+    if start is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{date_field}__lt': end})
+    return queryset
+
+def parse_date_range(params):
+    """
+    Lee `start` y `end` (YYYY-MM-DD) de un QueryDict. `end` es inclusivo para el usuario,
+    por lo que se convierte al inicio del día siguiente.
+    """
+    def parse(value):
+        if not value:
+            return None
+        try:
+            day = datetime.datetime.strptime(value, '%Y-%m-%d')
+        except ValueError:
+            return None
+        return timezone.make_aware(day)
+
+    start = parse(params.get('start'))
+    end = parse(params.get('end'))
+    if end is not None:
+        end = end + datetime.timedelta(days=1)
+    return start, end
+
+###############################################
+# Mantenimiento de particiones
+###############################################
+def drop_partition(key):
+    """
+    Elimina una partición completa. Cada DELETE se resuelve por el índice de `week`
+    y, como ninguna tabla referencia a los hechos, Django lo ejecuta como un solo
+    DELETE sin cargar objetos en memoria.
+    """
+    deleted = 0
+    # Todo o nada: una interrupción no deja hechos sin resúmenes ni la semana a medias
+    with transaction.atomic():
+        for model in list(PARTITIONED_MODELS) + WEEKLY_SUMMARY_MODELS:
+            count, _ = model.objects.filter(week=key).delete()
+            deleted += count
+        WeekPartition.objects.filter(key=key).delete()
+    return deleted
@@ -0,0 +1,642 @@
+import os
+import re
+import logging
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from etl_app.models import (
+    Alarm, Outage, JoinedRecord, Region, Site, AlarmType, WeekPartition,
+    SiteAvailability, RegionAvailability, BackupSketch, QuarantinedRow, AlarmLeadTime,
+    AlarmRollup, OutageRollup,
+)
+from etl_app import quality
+from etl_app.analytics import outage_coverage, availability
+from etl_app.correlation import lead_times
+from etl_app.rollups import GRANULARITIES, alarm_rollup, outage_rollup
+from etl_app.sketches import QuantileSketch
+from etl_app.resolver import SiteResolver
+from etl_app.partitions import week_from_filename, week_from_dates
+
+###############################################
+# Etapas del ETL (lectura, JOIN y carga)
+###############################################
+# Sin dependencias de Windows: lo usan process_etl, backfill_etl, el worker de
+# la cola, drop_partitions y la prueba de carga. La descarga de Outlook
+# (pythoncom/win32com) se queda en el comando process_etl.
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+
+# Tamaño de lote para bulk_create
+BATCH_SIZE = 2000
+
+def update_log(message):
+    logging.info(message)
+
+###############################################
+# Funciones de normalización y parseo
+###############################################
+def normalize_string(s):
+    if not isinstance(s, str):
+        return s
+    s = s.strip().upper()
+    s = re.sub(r'[^A-Z0-9 ]', '', s)
+    s = re.sub(r'\s+', ' ', s)
+    return s
+
+def to_category(series, func):
+    """
+    Aplica `func` solo sobre los valores distintos de la serie y devuelve el
+    resultado como categórica. Los valores que colapsan al mismo resultado
+    comparten categoría, así que no se materializa una cadena por fila.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped_codes, categories = pd.factorize(pd.Index([func(u) for u in uniques], dtype=object))
+    return pd.Series(
+        pd.Categorical.from_codes(mapped_codes[codes], categories=categories),
+        index=series.index, name=series.name,
+    )
+
+def normalize_category(series):
+    return to_category(series, lambda u: normalize_string(str(u)))
+###############################################
+# Función para hacer aware los datetimes si son naive
+###############################################
+def make_aware_if_naive(dt):
+    if dt is None or pd.isnull(dt):
+        return None
+    if timezone.is_naive(dt):
+        return timezone.make_aware(dt)
+    return dt
+
+###############################################
+# ETL: Procesamiento de archivos
+###############################################
+# Columnas de origen que realmente se usan (modo lean: proyección al leer)
+ALARM_SOURCE_COLUMNS = ['Occurred On (NT)', 'Last Occurred (NT)', 'Cleared On (NT)', 'Alarm Source', 'Name']
+OUTAGE_SOURCE_COLUMNS = ['Occurred On (NT)', 'Cleared On (NT)', 'MO Name', 'Name']
+
+def etl_alarms(alarms_file, lean=False, resolver=None, quarantine=None):
+    """
+    Con `lean=True` solo se leen las columnas necesarias y las columnas de texto
+    (region, alarm_name, alarm_source, site_parsed_alarm) quedan como categóricas.
+    El sitio se obtiene con `resolver` (SiteResolver): solo se parsean las cadenas
+    de origen que no están en la caché.
+    Las filas que no pasan la etapa de calidad (y las hojas sin las columnas
+    esperadas) se agregan a la lista `quarantine` en lugar de descartarse.
+    """
+    try:
+        if lean:
+            sheets_dict = pd.read_excel(alarms_file, sheet_name=None,
+                                        usecols=lambda c: c in ALARM_SOURCE_COLUMNS)
+        else:
+            sheets_dict = pd.read_excel(alarms_file, sheet_name=None)
+    except Exception as e:
+        update_log(f"Error al leer el archivo de alarmas: {e}")
+        return None
+
+    frames = []
+    for sheet_name, df_tab in sheets_dict.items():
+        # Para la pestaña PENINSULA, si existe "Last Occurred (NT)", renombrarlo a "Occurred On (NT)"
+        if sheet_name.upper() == "PENINSULA":
+            if "Last Occurred (NT)" in df_tab.columns:
+                df_tab.rename(columns={"Last Occurred (NT)": "Occurred On (NT)"}, inplace=True)
+        expected_columns = ['Occurred On (NT)', 'Cleared On (NT)', 'Alarm Source', 'Name']
+        if not all(col in df_tab.columns for col in expected_columns):
+            update_log(f"La hoja '{sheet_name}' no contiene todas las columnas esperadas. Se omitirá.")
+            if quarantine is not None:
+                quarantine.append(quality.quarantine_frame(
+                    df_tab, 'alarmas', quality.COLUMNAS_FALTANTES, sheet=sheet_name))
+            continue
+        df_tab['region'] = sheet_name
+        df_tab.rename(columns={
+            'Occurred On (NT)': 'alarm_occurred_on',
+            'Cleared On (NT)': 'alarm_cleared_on',
+            'Alarm Source': 'alarm_source',
+            'Name': 'alarm_name'
+        }, inplace=True)
+        for col in ['alarm_occurred_on', 'alarm_cleared_on']:
+            df_tab[col], df_tab[f'{col}_raw'] = quality.parse_dates(df_tab[col])
+        if not lean:
+            for col in ['alarm_source', 'alarm_name', 'region']:
+                df_tab[col] = df_tab[col].astype(str).apply(normalize_string)
+        frames.append(df_tab)
+    
+    if not frames:
+        update_log("Ninguna hoja contenía las columnas esperadas en el archivo de alarmas.")
+        return None
+    df_alarms = pd.concat(frames, ignore_index=True)
+    if lean:
+        # Normalizar una vez por valor distinto ya concatenado (las categóricas
+        # con categorías distintas por hoja se convertirían a object en el concat)
+        for col in ['alarm_source', 'alarm_name', 'region']:
+            df_alarms[col] = normalize_category(df_alarms[col])
+    resolver = resolver or SiteResolver()
+    df_alarms['site_parsed_alarm'] = resolver.resolve_series(df_alarms['alarm_source'], as_category=lean)
+    resolver.log_stats('alarmas')
+    df_alarms, rejected = quality.validate_alarms(df_alarms)
+    if quarantine is not None:
+        quarantine.append(rejected)
+    update_log(f"Archivo de alarmas procesado con {len(df_alarms)} registros ({len(rejected)} en cuarentena).")
+    return df_alarms
+
+def etl_outages(outages_file, lean=False, resolver=None, quarantine=None):
+    """
+    Con `lean=True` solo se leen las columnas necesarias y mo_name, outage_name y
+    site_parsed_outage quedan como categóricas. El sitio se obtiene con `resolver`.
+    Las filas rechazadas por la etapa de calidad se agregan a `quarantine`.
+    """
+    read_kwargs = {}
+    if lean:
+        read_kwargs = {'usecols': OUTAGE_SOURCE_COLUMNS}
+    try:
+        if outages_file.lower().endswith('.csv'):
+            if lean:
+                read_kwargs['dtype'] = {'MO Name': 'category', 'Name': 'category'}
+            df_outages = pd.read_csv(outages_file, **read_kwargs)
+        else:
+            df_outages = pd.read_excel(outages_file, **read_kwargs)
+    except Exception as e:
+        update_log(f"Error al leer el archivo de outages: {e}")
+        return None
+
+    df_outages.rename(columns={
+        'Occurred On (NT)': 'outage_occurred_on',
+        'Cleared On (NT)': 'outage_cleared_on',
+        'MO Name': 'mo_name',
+        'Name': 'outage_name'
+    }, inplace=True)
+    for col in ['outage_occurred_on', 'outage_cleared_on']:
+        df_outages[col], df_outages[f'{col}_raw'] = quality.parse_dates(df_outages[col])
+    if lean:
+        for col in ['mo_name', 'outage_name']:
+            df_outages[col] = normalize_category(df_outages[col])
+    else:
+        for col in ['mo_name', 'outage_name']:
+            df_outages[col] = df_outages[col].astype(str).apply(normalize_string)
+    resolver = resolver or SiteResolver()
+    df_outages['site_parsed_outage'] = resolver.resolve_series(df_outages['mo_name'], as_category=lean)
+    resolver.log_stats('outages')
+    df_outages, rejected = quality.validate_outages(df_outages)
+    if quarantine is not None:
+        quarantine.append(rejected)
+    update_log(f"Archivo de outages procesado con {len(df_outages)} registros ({len(rejected)} en cuarentena).")
+    return df_outages
+
+def join_alarms_outages(df_alarms, df_outages):
+    df_minor = df_alarms[df_alarms['alarm_name'].str.contains("MINOR RECT FAILURE", case=False, na=False)]
+    update_log(f"Filtradas {len(df_minor)} alarmas de tipo 'MINOR RECT FAILURE'.")
+    df_merged = pd.merge(df_minor, df_outages, left_on='site_parsed_alarm', right_on='site_parsed_outage', how='inner')
+    update_log(f"JOIN resultante: {len(df_merged)} registros.")
+    df_merged = df_merged[df_merged['outage_occurred_on'] >= df_merged['alarm_occurred_on']]
+    update_log(f"Después de filtrar por tiempos válidos, quedan {len(df_merged)} registros.")
+    df_merged['battery_backup_time'] = df_merged['outage_occurred_on'] - df_merged['alarm_occurred_on']
+    df_merged['backup_minutes'] = df_merged['battery_backup_time'].dt.total_seconds() / 60.0
+    return df_merged
+
+def join_alarms_outages_lean(df_alarms, df_outages):
+    """
+    Variante del JOIN para el modo lean: proyecta solo las columnas que se
+    almacenan antes del merge y aplica el filtro de tiempos y el cálculo del
+    respaldo en una sola asignación, sin copias intermedias encadenadas.
+    No genera la columna battery_backup_time (se deriva de backup_minutes).
+    """
+    is_minor = df_alarms['alarm_name'].str.contains("MINOR RECT FAILURE", case=False, na=False)
+    update_log(f"Filtradas {int(is_minor.sum())} alarmas de tipo 'MINOR RECT FAILURE'.")
+    df_merged = pd.merge(
+        df_alarms.loc[is_minor, ['site_parsed_alarm', 'region', 'alarm_name', 'alarm_occurred_on']],
+        df_outages[['site_parsed_outage', 'outage_occurred_on', 'outage_cleared_on']],
+        left_on='site_parsed_alarm', right_on='site_parsed_outage', how='inner',
+    )
+    update_log(f"JOIN resultante: {len(df_merged)} registros.")
+    backup = df_merged['outage_occurred_on'] - df_merged['alarm_occurred_on']
+    valid = (backup >= pd.Timedelta(0)).to_numpy()
+    df_merged = df_merged.loc[valid].assign(
+        backup_minutes=backup[valid].dt.total_seconds() / 60.0
+    )
+    update_log(f"Después de filtrar por tiempos válidos, quedan {len(df_merged)} registros.")
+    return df_merged
+
+###############################################
+# Carga: resolución de llaves y bulk insert
+###############################################
+def resolve_keys(model, field, values, defaults=None):
+    """
+    Devuelve un diccionario {valor: id} para la dimensión indicada.
+    La tabla se lee completa una sola vez y los valores nuevos se crean en bloque;
+    `defaults` permite asignar campos extra ({valor: {campo: valor}}) al crearlos.
+    """
+    defaults = defaults or {}
+    keys = dict(model.objects.values_list(field, 'id'))
+    missing = {v for v in values if isinstance(v, str) and v and v not in keys}
+    if missing:
+        model.objects.bulk_create(
+            [model(**{field: v}, **defaults.get(v, {})) for v in sorted(missing)],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        keys = dict(model.objects.values_list(field, 'id'))
+        update_log(f"{len(missing)} nuevos registros en la dimensión {model.__name__}.")
+    return keys
+
+def resolve_dimensions(df_alarms, df_outages):
+    """
+    Resuelve las llaves de Region, AlarmType y Site para los DataFrames de entrada.
+    """
+    region_keys = resolve_keys(Region, 'name', df_alarms['region'].unique())
+    type_keys = resolve_keys(
+        AlarmType, 'name',
+        set(df_alarms['alarm_name'].unique()) | set(df_outages['outage_name'].unique())
+    )
+    # La región de un sitio se toma de la primera alarma en la que aparece
+    site_region = (
+        df_alarms.drop_duplicates('site_parsed_alarm')
+        .set_index('site_parsed_alarm')['region']
+        .map(region_keys)
+    )
+    site_defaults = {site: {'region_id': int(region_id)} for site, region_id in site_region.dropna().items()}
+    site_keys = resolve_keys(
+        Site, 'code',
+        set(df_alarms['site_parsed_alarm'].unique()) | set(df_outages['site_parsed_outage'].unique()),
+        defaults=site_defaults,
+    )
+    # Un sitio visto antes solo en outages se creó sin región: la toma de la primera
+    # alarma que lo trae (si no, no contaría en la disponibilidad de su región)
+    by_region = {}
+    for site, region_id in site_defaults.items():
+        by_region.setdefault(region_id['region_id'], []).append(site)
+    for region_id, codes in by_region.items():
+        for i in range(0, len(codes), BATCH_SIZE):
+            Site.objects.filter(code__in=codes[i:i + BATCH_SIZE], region__isnull=True).update(region_id=region_id)
+    return region_keys, type_keys, site_keys
+
+def _with_keys(df, mapping, label):
+    """
+    Agrega las columnas de llaves indicadas en `mapping` ({columna_nueva: (columna, dict)})
+    y descarta las filas que no pudieron resolverse.
+    """
+    df = df.assign(**{new: df[col].map(keys) for new, (col, keys) in mapping.items()})
+    valid = df[list(mapping)].notna().all(axis=1)
+    if not valid.all():
+        update_log(f"Se descartan {(~valid).sum()} registros de {label} sin llave de sitio/región/tipo.")
+    df = df[valid]
+    return df.astype({new: 'int64' for new in mapping})
+
+def resolve_week(alarms_file, outages_file, df_alarms):
+    """
+    Semana (partición) de un par de archivos: se toma del nombre de los archivos y,
+    si no la traen, de la fecha mínima de las alarmas.
+    """
+    week = week_from_filename(alarms_file) or week_from_filename(outages_file)
+    if week is None:
+        week = week_from_dates(df_alarms['alarm_occurred_on'])
+    return week
+
+def store_results(df_alarms, df_outages, df_joined, week, alarms_file='', outages_file='',
+                  quarantine=None):
+    """
+    Carga los DataFrames procesados en la partición semanal `week` y actualiza su
+    registro en WeekPartition. Las llaves de dimensiones se resuelven con
+    diccionarios en memoria y la inserción se hace con bulk_create.
+    `quarantine` es la lista de filas rechazadas que llenaron etl_alarms/etl_outages.
+
+    La carga es idempotente: cada fila lleva una huella única y solo se insertan
+    las que no existen. Las filas que ya pertenecen a otra semana (reportes que se
+    traslapan o correos reenviados) no se vuelven a contar en los resúmenes. Los
+    resúmenes de la semana (disponibilidad, sketches, correlación, rollups) se
+    recalculan con todas las filas de la partición en la base, no solo con las del
+    archivo actual. Para reemplazar por completo una semana se borra antes con
+    drop_partitions. Devuelve el número de filas insertadas.
+    """
+    region_keys, type_keys, site_keys = resolve_dimensions(df_alarms, df_outages)
+    df_alarms, new_alarms = _fingerprinted(Alarm, df_alarms, quality.ALARM_KEY_COLUMNS, week, 'alarmas')
+    df_outages, new_outages = _fingerprinted(Outage, df_outages, quality.OUTAGE_KEY_COLUMNS, week, 'outages')
+    new_joined = None
+    if df_joined is not None:
+        df_joined, new_joined = _fingerprinted(JoinedRecord, df_joined, quality.JOINED_KEY_COLUMNS, week, 'JOIN')
+    with transaction.atomic():
+        before = sum(model.objects.filter(week=week).count() for model in (Alarm, Outage, JoinedRecord))
+        _insert_facts(df_alarms[new_alarms], df_outages[new_outages],
+                      None if df_joined is None else df_joined[new_joined],
+                      week, region_keys, type_keys, site_keys)
+        # La partición puede tener filas de cargas anteriores que este archivo no trae
+        df_alarms, df_outages, df_joined = _partition_frames(week, region_keys, type_keys, site_keys)
+        dates = pd.concat([df_alarms['alarm_occurred_on'], df_outages['outage_occurred_on']])
+        window_start, window_end = dates.min(), dates.max()
+        _replace_availability(df_alarms, df_outages, week, site_keys, window_start, window_end)
+        _replace_backup_sketches(df_joined, week, site_keys, region_keys)
+        _replace_lead_times(df_alarms, df_outages, week, site_keys, region_keys, type_keys)
+        _replace_rollups(df_alarms, df_outages, week, site_keys, region_keys, type_keys,
+                         window_start, window_end)
+        _replace_quarantine(quarantine, week)
+        WeekPartition.objects.update_or_create(key=week, defaults={
+            'start': make_aware_if_naive(window_start),
+            'end': make_aware_if_naive(window_end),
+            'alarms_file': os.path.basename(str(alarms_file)),
+            'outages_file': os.path.basename(str(outages_file)),
+            'alarm_count': len(df_alarms),
+            'outage_count': len(df_outages),
+            'joined_count': len(df_joined),
+        })
+    inserted = len(df_alarms) + len(df_outages) + len(df_joined) - before
+    update_log(f"Datos almacenados en la partición {week} ({inserted} filas nuevas).")
+    return inserted
+
+def existing_fingerprints(model, fingerprints):
+    """
+    {huella: semana} de las filas ya cargadas, consultando por lotes con el índice único.
+    """
+    values = list(set(fingerprints))
+    found = {}
+    for i in range(0, len(values), BATCH_SIZE):
+        found.update(model.objects.filter(fingerprint__in=values[i:i + BATCH_SIZE])
+                     .values_list('fingerprint', 'week'))
+    return found
+
+def _fingerprinted(model, df, key_columns, week, label):
+    """
+    Agrega la columna `fingerprint` y descarta las filas que ya pertenecen a otra
+    semana. Devuelve (DataFrame, máscara de filas nuevas por insertar).
+    """
+    fingerprints = quality.row_fingerprint(df, key_columns)
+    # Duplicados dentro del mismo lote (p. ej. dos fuentes del mismo sitio en el JOIN)
+    keep = ~fingerprints.duplicated()
+    df, fingerprints = df.loc[keep].assign(fingerprint=fingerprints[keep]), fingerprints[keep]
+    loaded_in = fingerprints.map(existing_fingerprints(model, fingerprints.tolist()))
+    other_week = loaded_in.notna() & (loaded_in != week)
+    new = loaded_in.isna()
+    update_log(f"Huellas {label}: {int(new.sum())} nuevas, {int((~new & ~other_week).sum())} ya cargadas, "
+               f"{int(other_week.sum())} pertenecen a otra semana.")
+    return df.loc[~other_week], new[~other_week]
+
+def _insert_facts(df_alarms, df_outages, df_joined, week, region_keys, type_keys, site_keys):
+    # INSERT OR IGNORE: una fila cuya huella ya existe no se vuelve a insertar
+    df_a = _with_keys(df_alarms, {
+        'alarm_type_id': ('alarm_name', type_keys),
+        'region_id': ('region', region_keys),
+        'site_id': ('site_parsed_alarm', site_keys),
+    }, 'alarmas')
+    Alarm.objects.bulk_create((
+        Alarm(
+            week=week,
+            fingerprint=fingerprint,
+            alarm_occurred_on=make_aware_if_naive(occurred),
+            alarm_cleared_on=make_aware_if_naive(cleared),
+            alarm_type_id=alarm_type_id,
+            region_id=region_id,
+            site_id=site_id,
+        )
+        for fingerprint, occurred, cleared, alarm_type_id, region_id, site_id in zip(
+            df_a['fingerprint'].tolist(), df_a['alarm_occurred_on'], df_a['alarm_cleared_on'],
+            df_a['alarm_type_id'].tolist(), df_a['region_id'].tolist(), df_a['site_id'].tolist())
+    ), batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    df_o = _with_keys(df_outages, {
+        'outage_type_id': ('outage_name', type_keys),
+        'site_id': ('site_parsed_outage', site_keys),
+    }, 'outages')
+    Outage.objects.bulk_create((
+        Outage(
+            week=week,
+            fingerprint=fingerprint,
+            outage_occurred_on=make_aware_if_naive(occurred),
+            outage_cleared_on=make_aware_if_naive(cleared),
+            outage_type_id=outage_type_id,
+            site_id=site_id,
+        )
+        for fingerprint, occurred, cleared, outage_type_id, site_id in zip(
+            df_o['fingerprint'].tolist(), df_o['outage_occurred_on'], df_o['outage_cleared_on'],
+            df_o['outage_type_id'].tolist(), df_o['site_id'].tolist())
+    ), batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    if df_joined is not None:
+        df_j = _with_keys(df_joined, {
+            'alarm_type_id': ('alarm_name', type_keys),
+            'region_id': ('region', region_keys),
+            'site_id': ('site_parsed_alarm', site_keys),
+        }, 'JOIN')
+        JoinedRecord.objects.bulk_create((
+            JoinedRecord(
+                week=week,
+                fingerprint=fingerprint,
+                site_id=site_id,
+                region_id=region_id,
+                alarm_type_id=alarm_type_id,
+                alarm_occurred_on=make_aware_if_naive(alarm_occurred),
+                outage_occurred_on=make_aware_if_naive(outage_occurred),
+                outage_cleared_on=make_aware_if_naive(outage_cleared),
+                backup_minutes=backup_minutes,
+            )
+            for fingerprint, site_id, region_id, alarm_type_id, alarm_occurred, outage_occurred, outage_cleared, backup_minutes in zip(
+                df_j['fingerprint'].tolist(), df_j['site_id'].tolist(), df_j['region_id'].tolist(),
+                df_j['alarm_type_id'].tolist(), df_j['alarm_occurred_on'], df_j['outage_occurred_on'],
+                df_j['outage_cleared_on'], df_j['backup_minutes'])
+        ), batch_size=BATCH_SIZE, ignore_conflicts=True)
+def _local_naive(series):
+    # Hora local sin zona, como las columnas que produce el ETL a partir de los archivos
+    return pd.to_datetime(series, utc=True).dt.tz_convert(timezone.get_current_timezone()).dt.tz_localize(None)
+
+def _partition_frames(week, region_keys, type_keys, site_keys):
+    """
+    Lee de la base todos los hechos de la semana (cargas anteriores más lo recién
+    insertado) con las columnas de etl_alarms, etl_outages y el JOIN que usan los
+    resúmenes. Las llaves se traducen de vuelta con los diccionarios de dimensiones.
+    """
+    regions = {v: k for k, v in region_keys.items()}
+    types = {v: k for k, v in type_keys.items()}
+    sites = {v: k for k, v in site_keys.items()}
+
+    df_alarms = pd.DataFrame.from_records(
+        Alarm.objects.filter(week=week).values_list(
+            'alarm_type_id', 'region_id', 'site_id', 'alarm_occurred_on', 'alarm_cleared_on'),
+        columns=['alarm_type_id', 'region_id', 'site_id', 'alarm_occurred_on', 'alarm_cleared_on'],
+    )
+    df_alarms = pd.DataFrame({
+        'alarm_name': df_alarms['alarm_type_id'].map(types),
+        'region': df_alarms['region_id'].map(regions),
+        'site_parsed_alarm': df_alarms['site_id'].map(sites),
+        'alarm_occurred_on': _local_naive(df_alarms['alarm_occurred_on']),
+        'alarm_cleared_on': _local_naive(df_alarms['alarm_cleared_on']),
+    })
+
+    df_outages = pd.DataFrame.from_records(
+        Outage.objects.filter(week=week).values_list(
+            'outage_type_id', 'site_id', 'outage_occurred_on', 'outage_cleared_on'),
+        columns=['outage_type_id', 'site_id', 'outage_occurred_on', 'outage_cleared_on'],
+    )
+    df_outages = pd.DataFrame({
+        'outage_name': df_outages['outage_type_id'].map(types),
+        'site_parsed_outage': df_outages['site_id'].map(sites),
+        'outage_occurred_on': _local_naive(df_outages['outage_occurred_on']),
+        'outage_cleared_on': _local_naive(df_outages['outage_cleared_on']),
+    })
+
+    df_joined = pd.DataFrame.from_records(
+        JoinedRecord.objects.filter(week=week).values_list('region_id', 'site_id', 'backup_minutes'),
+        columns=['region_id', 'site_id', 'backup_minutes'],
+    )
+    df_joined = pd.DataFrame({
+        'region': df_joined['region_id'].map(regions),
+        'site_parsed_alarm': df_joined['site_id'].map(sites),
+        'backup_minutes': df_joined['backup_minutes'].astype(float),
+    })
+    return df_alarms, df_outages, df_joined
+
+def _replace_quarantine(quarantine, week):
+    QuarantinedRow.objects.filter(week=week).delete()
+    frames = [df for df in (quarantine or []) if not df.empty]
+    if not frames:
+        return
+    df_q = pd.concat(frames, ignore_index=True)
+    QuarantinedRow.objects.bulk_create((
+        QuarantinedRow(week=week, source=source, sheet=sheet, reasons=reasons, raw=raw)
+        for source, sheet, reasons, raw in zip(df_q['source'], df_q['sheet'], df_q['reasons'], df_q['raw'])
+    ), batch_size=BATCH_SIZE)
+    update_log(f"{len(df_q)} filas en cuarentena para la semana {week}.")
+
+def _replace_availability(df_alarms, df_outages, week, site_keys, window_start, window_end):
+    """
+    Calcula con el motor de intervalos la disponibilidad semanal por sitio y por región
+    y reemplaza los resultados de la semana.
+    """
+    SiteAvailability.objects.filter(week=week).delete()
+    RegionAvailability.objects.filter(week=week).delete()
+    if pd.isnull(window_start) or pd.isnull(window_end):
+        return
+    window_minutes = (window_end - window_start).total_seconds() / 60.0
+    is_minor = df_alarms['alarm_name'].str.contains("MINOR RECT FAILURE", case=False, na=False)
+    coverage = outage_coverage(df_outages, df_alarms[is_minor], window_start, window_end)
+    coverage = coverage[coverage.index.isin(list(site_keys))]
+
+    SiteAvailability.objects.bulk_create([
+        SiteAvailability(
+            week=week,
+            site_id=site_keys[row.Index],
+            window_minutes=window_minutes,
+            outage_minutes=row.outage_minutes,
+            outage_intervals=int(row.outage_intervals),
+            availability_pct=availability(row.outage_minutes, window_minutes),
+            minor_overlap_minutes=row.overlap_minutes,
+        )
+        for row in coverage.itertuples()
+    ], batch_size=BATCH_SIZE)
+
+    # Región: todos los sitios vistos en la semana cuentan en el denominador
+    site_region = dict(Site.objects.values_list('id', 'region_id'))
+    week_sites = {
+        site_keys[code]
+        for code in set(df_alarms['site_parsed_alarm'].unique()) | set(df_outages['site_parsed_outage'].unique())
+        if code in site_keys
+    }
+    regions = {}
+    for site_id in week_sites:
+        region_id = site_region.get(site_id)
+        if region_id is not None:
+            regions.setdefault(region_id, {'sites': 0, 'minutes': 0.0, 'intervals': 0, 'overlap': 0.0})
+            regions[region_id]['sites'] += 1
+    for row in coverage.itertuples():
+        region_id = site_region.get(site_keys[row.Index])
+        if region_id in regions:
+            regions[region_id]['minutes'] += row.outage_minutes
+            regions[region_id]['intervals'] += int(row.outage_intervals)
+            regions[region_id]['overlap'] += row.overlap_minutes
+    RegionAvailability.objects.bulk_create([
+        RegionAvailability(
+            week=week,
+            region_id=region_id,
+            site_count=totals['sites'],
+            window_minutes=window_minutes,
+            outage_minutes=totals['minutes'],
+            outage_intervals=totals['intervals'],
+            availability_pct=availability(totals['minutes'], window_minutes, totals['sites']),
+            minor_overlap_minutes=totals['overlap'],
+        )
+        for region_id, totals in regions.items()
+    ])
+
+def _replace_backup_sketches(df_joined, week, site_keys, region_keys):
+    """
+    Construye los sketches de backup_minutes de la semana por sitio y por región.
+    Solo se procesan las filas del JOIN de esta semana; las demás semanas
+    conservan sus sketches y se combinan al consultar.
+    """
+    BackupSketch.objects.filter(week=week).delete()
+    if df_joined is None or df_joined.empty:
+        return
+    sketches = []
+    for column, keys, field in (('site_parsed_alarm', site_keys, 'site_id'),
+                                ('region', region_keys, 'region_id')):
+        for value, minutes in df_joined.groupby(column, observed=True)['backup_minutes']:
+            if value not in keys:
+                continue
+            sketch = QuantileSketch().add_many(minutes.to_numpy())
+            if sketch.count:
+                sketches.append(BackupSketch(week=week, count=sketch.count,
+                                             payload=sketch.to_bytes(), **{field: keys[value]}))
+    BackupSketch.objects.bulk_create(sketches, batch_size=BATCH_SIZE)
+
+def _replace_lead_times(df_alarms, df_outages, week, site_keys, region_keys, type_keys):
+    """
+    Calcula en una sola pasada el tiempo alarma -> outage de todos los tipos de
+    ETL_CORRELATION_PATTERNS y reemplaza los resultados de la semana.
+    """
+    AlarmLeadTime.objects.filter(week=week).delete()
+    patterns = getattr(settings, 'ETL_CORRELATION_PATTERNS', [])
+    max_lead = pd.Timedelta(hours=getattr(settings, 'ETL_CORRELATION_MAX_LEAD_HOURS', 72))
+    df_lead = lead_times(df_alarms, df_outages, patterns, max_lead)
+    if df_lead.empty:
+        return
+    df_lead = _with_keys(df_lead, {
+        'alarm_type_id': ('alarm_name', type_keys),
+        'region_id': ('region', region_keys),
+        'site_id': ('site_parsed_alarm', site_keys),
+    }, 'correlación')
+    AlarmLeadTime.objects.bulk_create((
+        AlarmLeadTime(
+            week=week,
+            site_id=site_id,
+            region_id=region_id,
+            alarm_type_id=alarm_type_id,
+            alarm_occurred_on=make_aware_if_naive(alarm_occurred),
+            outage_occurred_on=make_aware_if_naive(outage_occurred),
+            lead_minutes=None if pd.isnull(lead) else lead,
+        )
+        for site_id, region_id, alarm_type_id, alarm_occurred, outage_occurred, lead in zip(
+            df_lead['site_id'].tolist(), df_lead['region_id'].tolist(), df_lead['alarm_type_id'].tolist(),
+            df_lead['alarm_occurred_on'], df_lead['outage_occurred_on'], df_lead['lead_minutes'])
+    ), batch_size=BATCH_SIZE)
+    matched = df_lead['lead_minutes'].notna().sum()
+    update_log(f"Correlación: {len(df_lead)} alarmas de {df_lead['alarm_type_id'].nunique()} tipos, "
+               f"{matched} seguidas de un outage.")
+
+def _replace_rollups(df_alarms, df_outages, week, site_keys, region_keys, type_keys,
+                     window_start, window_end):
+    """
+    Rollups por hora y por día de la semana cargada (reemplaza solo esa semana).
+    """
+    AlarmRollup.objects.filter(week=week).delete()
+    OutageRollup.objects.filter(week=week).delete()
+    if pd.isnull(window_start) or pd.isnull(window_end):
+        return
+    for granularity, freq in GRANULARITIES.items():
+        df_a = _with_keys(alarm_rollup(df_alarms, freq), {
+            'alarm_type_id': ('alarm_name', type_keys),
+            'region_id': ('region', region_keys),
+        }, f'rollup de alarmas ({granularity})')
+        AlarmRollup.objects.bulk_create((
+            AlarmRollup(week=week, granularity=granularity, bucket=make_aware_if_naive(bucket),
+                        region_id=region_id, alarm_type_id=alarm_type_id, count=count)
+            for bucket, region_id, alarm_type_id, count in zip(
+                df_a['bucket'], df_a['region_id'].tolist(), df_a['alarm_type_id'].tolist(),
+                df_a['count'].tolist())
+        ), batch_size=BATCH_SIZE)
+
+        df_o = _with_keys(outage_rollup(df_outages, window_start, window_end, freq), {
+            'site_id': ('key', site_keys),
+        }, f'rollup de outages ({granularity})')
+        OutageRollup.objects.bulk_create((
+            OutageRollup(week=week, granularity=granularity, bucket=make_aware_if_naive(bucket),
+                         site_id=site_id, count=count, minutes=minutes)
+            for bucket, site_id, count, minutes in zip(
+                df_o['bucket'], df_o['site_id'].tolist(), df_o['count'].tolist(), df_o['minutes'].tolist())
+        ), batch_size=BATCH_SIZE)
@@ -0,0 +1,125 @@
+import logging
+import numpy as np
+import pandas as pd
+
+###############################################
+# Etapa de calidad de datos
+###############################################
+# Todas las validaciones son operaciones por columna sobre el DataFrame completo;
+# solo las filas rechazadas (normalmente pocas) se serializan para la cuarentena.
+
+# Códigos de motivo guardados en QuarantinedRow.reasons
+FECHA_INICIO_INVALIDA = 'FECHA_INICIO_INVALIDA'
+FECHA_FIN_INVALIDA = 'FECHA_FIN_INVALIDA'
+FIN_ANTES_DE_INICIO = 'FIN_ANTES_DE_INICIO'
+SITIO_VACIO = 'SITIO_VACIO'
+DUPLICADO = 'DUPLICADO'
+COLUMNAS_FALTANTES = 'COLUMNAS_FALTANTES'
+
+# Valores que en los reportes significan "sin fecha" (p. ej. alarma aún activa)
+EMPTY_DATE_VALUES = {'', '-', 'NAN', 'NAT', 'NONE'}
+# Sitios que resultan de una fuente vacía ("nan" normalizado)
+EMPTY_SITE_VALUES = ['', 'NAN']
+
+QUARANTINE_COLUMNS = ['source', 'sheet', 'reasons', 'raw']
+
+# Campos normalizados que identifican una fila: se usan para marcar duplicados
+# dentro de un archivo y para la huella que evita duplicados entre archivos
+ALARM_KEY_COLUMNS = ['alarm_occurred_on', 'alarm_source', 'alarm_name', 'region']
+OUTAGE_KEY_COLUMNS = ['outage_occurred_on', 'mo_name', 'outage_name']
+JOINED_KEY_COLUMNS = ['alarm_occurred_on', 'site_parsed_alarm', 'alarm_name', 'region', 'outage_occurred_on']
+
+def parse_dates(series):
+    """
+    Convierte una columna de fechas y conserva el texto original solo de los
+    valores que no pudieron interpretarse. Devuelve (fechas, texto_original);
+    el texto es NaN en las filas válidas o vacías.
+    """
+    parsed = pd.to_datetime(series, dayfirst=True, errors='coerce')
+    text = series.astype(str).str.strip().str.upper()
+    invalid = parsed.isna() & series.notna() & ~text.isin(EMPTY_DATE_VALUES)
+    return parsed, series.where(invalid)
+
+def quarantine_frame(rows, source, reasons, sheet=''):
+    """
+    Filas rechazadas en formato de cuarentena: origen, hoja, motivos y la fila
+    original serializada como JSON. `reasons` puede ser un código o una Serie.
+    """
+    if rows.empty:
+        return pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    payload = rows.copy()
+    for col in [c for c in payload.columns if c.endswith('_raw')]:
+        # Conservar el texto original en lugar del NaT de la fecha inválida
+        target = col[:-len('_raw')]
+        if target in payload.columns:
+            payload[target] = payload[target].astype(object).where(payload[col].isna(), payload[col])
+        payload = payload.drop(columns=col)
+    raw = payload.to_json(orient='records', lines=True, date_format='iso', force_ascii=False).splitlines()
+    return pd.DataFrame({
+        'source': source,
+        'sheet': sheet if isinstance(sheet, pd.Series) else str(sheet),
+        'reasons': reasons,
+        'raw': raw,
+    }, index=rows.index)[QUARANTINE_COLUMNS].reset_index(drop=True)
+
+def validate(df, source, occurred, cleared, site, key_columns, sheet_column=None):
+    """
+    Aplica las validaciones a un DataFrame ya normalizado y devuelve
+    (filas_válidas, filas_en_cuarentena).
+    """
+    cleared_raw = f'{cleared}_raw'
+    checks = pd.DataFrame({
+        FECHA_INICIO_INVALIDA: df[occurred].isna(),
+        FECHA_FIN_INVALIDA: df[cleared_raw].notna() if cleared_raw in df else False,
+        FIN_ANTES_DE_INICIO: (df[cleared] < df[occurred]).fillna(False),
+        SITIO_VACIO: df[site].isna() | df[site].isin(EMPTY_SITE_VALUES),
+        DUPLICADO: df.duplicated(subset=key_columns),
+    }, index=df.index)
+    bad = checks.any(axis=1)
+    raw_columns = [c for c in df.columns if c.endswith('_raw')]
+
+    quarantined = pd.DataFrame(columns=QUARANTINE_COLUMNS)
+    if bad.any():
+        failed = checks[bad]
+        # Lista de motivos por fila: producto de la matriz booleana con los códigos
+        reasons = failed.dot(failed.columns + ',').str.rstrip(',')
+        sheet = df.loc[bad, sheet_column].astype(str) if sheet_column else ''
+        quarantined = quarantine_frame(df[bad], source, reasons, sheet)
+        counts = ', '.join(f"{code}={int(n)}" for code, n in failed.sum().items() if n)
+        logging.info(f"Calidad de datos ({source}): {int(bad.sum())} filas en cuarentena ({counts}).")
+    return df.loc[~bad].drop(columns=raw_columns), quarantined
+
+def validate_alarms(df_alarms):
+    return validate(
+        df_alarms, 'alarmas', 'alarm_occurred_on', 'alarm_cleared_on', 'site_parsed_alarm',
+        ALARM_KEY_COLUMNS, sheet_column='region',
+    )
+
+def validate_outages(df_outages):
+    return validate(
+        df_outages, 'outages', 'outage_occurred_on', 'outage_cleared_on', 'site_parsed_outage',
+        OUTAGE_KEY_COLUMNS,
+    )
+
+###############################################
+# Huella estable de filas
+###############################################
+_FINGERPRINT_MULTIPLIER = np.uint64(1000003)
+
+def row_fingerprint(df, columns):
+    """
+    Huella de 64 bits (con signo, para BigIntegerField) de los campos `columns`.
+    Solo depende de los valores: las fechas se llevan a nanosegundos y el texto se
+    hashea igual sea object o categórica, así que el modo lean y el normal, y
+    cualquier reenvío del mismo reporte, producen la misma huella.
+    """
+    combined = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for col in columns:
+            series = df[col]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.astype('datetime64[ns]').to_numpy().view(np.int64)
+            else:
+                values = series.to_numpy(dtype=object)
+            combined = combined * _FINGERPRINT_MULTIPLIER ^ pd.util.hash_array(values)
+    return pd.Series(combined.view(np.int64), index=df.index)
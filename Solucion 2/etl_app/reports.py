@@ -0,0 +1,146 @@
+import re
+from django.db.models import Avg, Count, Sum, F
+from django.utils import timezone
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from etl_app.analytics import availability
+from etl_app.models import Alarm, JoinedRecord, RegionAvailability, Region, Site, AlarmType
+
+###############################################
+# Reporte Excel por región
+###############################################
+# Se escribe con openpyxl en modo write-only: cada fila se serializa en el archivo
+# temporal de su hoja en cuanto se agrega y los registros del JOIN se leen de la
+# base por bloques (iterator), así que la memoria no depende del número de filas.
+# Hoja "Resumen" con una fila por región y después una hoja por región con sus
+# registros del JOIN.
+
+# Límite de filas de una hoja de Excel (con encabezado); lo que sobra sigue en "REGION (2)"
+MAX_SHEET_ROWS = 1048576
+CHUNK_SIZE = 5000
+
+SUMMARY_COLUMNS = ['Región', 'Sitios', 'Registros JOIN', 'Backup promedio (min)',
+                   'Minutos fuera de servicio', 'Disponibilidad %', 'Falla top', 'Conteo falla top']
+DETAIL_COLUMNS = ['Semana', 'Sitio', 'Tipo de alarma', 'Inicio alarma', 'Inicio outage',
+                  'Fin outage', 'Minutos de respaldo']
+
+def sheet_title(name, used):
+    """
+    Nombre de hoja válido para Excel (máx. 31 caracteres, sin []:*?/\\) y que no
+    se repita en `used` (Excel no distingue mayúsculas).
+    """
+    base = re.sub(r'[\[\]:*?/\\]', ' ', name or '').strip()[:31] or 'SIN REGION'
+    title, n = base, 2
+    while title.upper() in used:
+        suffix = f" ({n})"
+        title = base[:31 - len(suffix)] + suffix
+        n += 1
+    used.add(title.upper())
+    return title
+
+def _in_weeks(queryset, weeks):
+    return queryset if weeks is None else queryset.filter(week__in=list(weeks))
+
+def _local(dt, tz):
+    # Excel no guarda zona horaria: se escribe la hora local del proyecto
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(tz).replace(tzinfo=None)
+
+def _append_header(ws, columns):
+    cells = []
+    for column in columns:
+        cell = WriteOnlyCell(ws, value=column)
+        cell.font = Font(bold=True)
+        cells.append(cell)
+    ws.append(cells)
+
+def region_summary(weeks=None):
+    """
+    Una fila por región: sitios y registros del JOIN, backup promedio, minutos
+    fuera de servicio, disponibilidad y la alarma más frecuente.
+    """
+    joined = {
+        r['region_id']: r for r in
+        _in_weeks(JoinedRecord.objects.all(), weeks)
+        .values('region_id')
+        .annotate(sites=Count('site_id', distinct=True), records=Count('id'), avg_backup=Avg('backup_minutes'))
+        .order_by()
+    }
+    outages = {
+        r['region_id']: r for r in
+        _in_weeks(RegionAvailability.objects.all(), weeks)
+        .values('region_id')
+        .annotate(outage=Sum('outage_minutes'), site_window=Sum(F('window_minutes') * F('site_count')))
+        .order_by()
+    }
+    top = {}
+    for r in (_in_weeks(Alarm.objects.all(), weeks)
+              .values('region_id', 'alarm_type_id').annotate(count=Count('id')).order_by()):
+        if r['count'] > top.get(r['region_id'], (None, 0))[1]:
+            top[r['region_id']] = (r['alarm_type_id'], r['count'])
+
+    region_names = dict(Region.objects.values_list('id', 'name'))
+    alarm_names = dict(AlarmType.objects.values_list('id', 'name'))
+    rows = []
+    for region_id in sorted(set(joined) | set(outages) | set(top), key=lambda k: region_names.get(k, '')):
+        j = joined.get(region_id, {})
+        o = outages.get(region_id)
+        type_id, count = top.get(region_id, (None, None))
+        rows.append((
+            region_id,
+            [
+                region_names.get(region_id, ''),
+                j.get('sites', 0),
+                j.get('records', 0),
+                j.get('avg_backup'),
+                o['outage'] if o else None,
+                availability(o['outage'], o['site_window']) if o else None,
+                alarm_names.get(type_id, ''),
+                count,
+            ],
+        ))
+    return rows
+
+def write_report(target, weeks=None):
+    """
+    Escribe el reporte en `target` (ruta o archivo binario abierto) para las
+    semanas `weeks` (llaves AAAASS; None = todas). Devuelve el número de
+    registros del JOIN escritos.
+    """
+    wb = Workbook(write_only=True)
+    used = set()
+    ws = wb.create_sheet(sheet_title('Resumen', used))
+    _append_header(ws, SUMMARY_COLUMNS)
+    summary = region_summary(weeks)
+    for _, row in summary:
+        ws.append(row)
+
+    site_codes = dict(Site.objects.values_list('id', 'code'))
+    alarm_names = dict(AlarmType.objects.values_list('id', 'name'))
+    tz = timezone.get_current_timezone()
+    total = 0
+    for region_id, row in summary:
+        records = (
+            _in_weeks(JoinedRecord.objects.filter(region_id=region_id), weeks)
+            .order_by('alarm_occurred_on', 'id')
+            .values_list('week', 'site_id', 'alarm_type_id', 'alarm_occurred_on',
+                         'outage_occurred_on', 'outage_cleared_on', 'backup_minutes')
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        ws, written = None, MAX_SHEET_ROWS
+        for week, site_id, type_id, alarm_on, outage_on, cleared_on, backup in records:
+            if written >= MAX_SHEET_ROWS:
+                ws = wb.create_sheet(sheet_title(row[0], used))
+                _append_header(ws, DETAIL_COLUMNS)
+                written = 1
+            ws.append([week, site_codes.get(site_id, ''), alarm_names.get(type_id, ''),
+                       _local(alarm_on, tz), _local(outage_on, tz), _local(cleared_on, tz), backup])
+            written += 1
+            total += 1
+        if ws is None:
+            _append_header(wb.create_sheet(sheet_title(row[0], used)), DETAIL_COLUMNS)
+
+    wb.save(target)
+    return total
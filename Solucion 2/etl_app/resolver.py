@@ -0,0 +1,176 @@
+import re
+import logging
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+# Versión del parser de sitios. Incrementarla al cambiar parse_site_name o
+# parse_logic_rnc_id invalida las entradas guardadas con versiones anteriores.
+PARSER_VERSION = 1
+
+# Longitud máxima de la cadena original que se guarda en la caché persistente
+MAX_RAW_LENGTH = 255
+
+###############################################
+# Parseo de identificadores
+###############################################
+def parse_site_name(site_str):
+    """
+    Extrae el identificador del sitio a partir de cadenas con formatos variables.
+
+    Ejemplos:
+      "NODEB NAME=TAMREY1591, LOGICRNCID=141"   -> "TAMREY1591"
+      "NODEB NAMETAMREY1591 LOGICRNCID141"        -> "TAMREY1591"
+      "YUCYAX0519"                               -> "YUCYAX0519"
+    """
+    if not isinstance(site_str, str):
+        return site_str
+    s = site_str.strip().upper()
+    m = re.search(r'NODEB\s*NAME[=]?\s*([A-Z0-9]+)', s)
+    if m:
+        return m.group(1).strip()
+    m = re.search(r'NAME[=]?\s*([A-Z0-9]+)', s)
+    if m:
+        return m.group(1).strip()
+    s = re.sub(r'[^A-Z0-9]', '', s)
+    return s
+
+def parse_logic_rnc_id(site_str):
+    """
+    "NODEB NAME=TAMREY1591, LOGICRNCID=141" -> 141 (None si la cadena no lo trae).
+    """
+    if not isinstance(site_str, str):
+        return None
+    m = re.search(r'LOGICRNCID\s*[=]?\s*(\d+)', site_str.upper())
+    return int(m.group(1)) if m else None
+
+###############################################
+# Caché persistente cadena original -> sitio
+###############################################
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key):
+        value = self.data.get(key)
+        if value is not None:
+            self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+# Caché en memoria compartida por todas las ejecuciones del mismo proceso
+_front_cache = LRUCache(getattr(settings, 'SITE_RESOLVER_CACHE_SIZE', 50000))
+
+class SiteResolver:
+    """
+    Resuelve cadenas de origen ("NODEB NAME=XXX, LOGICRNCID=NN") a (sitio, LogicRNCID).
+
+    Orden de búsqueda: caché LRU en memoria -> tabla SiteResolution (misma versión
+    del parser) -> parseo. Solo se parsean las cadenas nunca vistas; las nuevas se
+    guardan al final de cada llamada, o se acumulan en `pending` si `persist=False`
+    (los procesos del backfill las devuelven al escritor único). `cache` reemplaza
+    la caché LRU compartida del proceso (p. ej. una vacía para medir en frío).
+    """
+    def __init__(self, persist=True, cache=None):
+        self.persist = persist
+        self.cache = _front_cache if cache is None else cache
+        self.pending = {}
+        self.stats = {'memoria': 0, 'tabla': 0, 'parseadas': 0}
+
+    def resolve_many(self, raws):
+        """
+        Devuelve {cadena: (sitio, logic_rnc_id)} para las cadenas dadas.
+        """
+        from etl_app.models import SiteResolution
+
+        resolved, missing = {}, []
+        for raw in raws:
+            if not isinstance(raw, str):
+                resolved[raw] = (parse_site_name(raw), None)
+                continue
+            cached = self.cache.get(raw)
+            if cached is not None:
+                resolved[raw] = cached
+                self.stats['memoria'] += 1
+            else:
+                missing.append(raw)
+
+        storable = [raw for raw in missing if len(raw) <= MAX_RAW_LENGTH]
+        for i in range(0, len(storable), 500):
+            rows = SiteResolution.objects.filter(
+                raw_source__in=storable[i:i + 500], parser_version=PARSER_VERSION
+            ).values_list('raw_source', 'site_code', 'logic_rnc_id')
+            for raw, site_code, logic_rnc_id in rows:
+                resolved[raw] = (site_code, logic_rnc_id)
+                self.cache.put(raw, resolved[raw])
+                self.stats['tabla'] += 1
+
+        for raw in missing:
+            if raw in resolved:
+                continue
+            value = (parse_site_name(raw), parse_logic_rnc_id(raw))
+            resolved[raw] = value
+            self.cache.put(raw, value)
+            self.stats['parseadas'] += 1
+            if len(raw) <= MAX_RAW_LENGTH:
+                self.pending[raw] = value
+
+        if self.persist:
+            self.save_pending()
+        return resolved
+
+    def resolve_series(self, series, as_category=False):
+        """
+        Columna de sitios para `series`. Solo se resuelven los valores distintos;
+        con `as_category=True` el resultado es categórico.
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        mapping = self.resolve_many(list(uniques))
+        sites = [mapping[u][0] for u in uniques]
+        if as_category:
+            site_codes, categories = pd.factorize(pd.Index(sites, dtype=object))
+            values = pd.Categorical.from_codes(site_codes[codes], categories=categories)
+        else:
+            values = np.asarray(sites, dtype=object)[codes]
+        return pd.Series(values, index=series.index, name=series.name)
+
+    def save_pending(self):
+        save_resolutions(self.pending)
+        self.pending = {}
+
+    def log_stats(self, label):
+        total = sum(self.stats.values())
+        hits = self.stats['memoria'] + self.stats['tabla']
+        rate = 100.0 * hits / total if total else 0.0
+        logging.info(
+            f"Caché de sitios ({label}): {total} cadenas distintas, {rate:.1f}% aciertos "
+            f"({self.stats['memoria']} en memoria, {self.stats['tabla']} en tabla, "
+            f"{self.stats['parseadas']} parseadas)."
+        )
+        self.stats = dict.fromkeys(self.stats, 0)
+
+def save_resolutions(entries):
+    """
+    Guarda en bloque {cadena: (sitio, logic_rnc_id)} con la versión actual del parser,
+    reemplazando las entradas de versiones anteriores.
+    """
+    from etl_app.models import SiteResolution
+
+    if not entries:
+        return
+    raws = list(entries)
+    for i in range(0, len(raws), 500):
+        SiteResolution.objects.filter(raw_source__in=raws[i:i + 500]).exclude(
+            parser_version=PARSER_VERSION).delete()
+    SiteResolution.objects.bulk_create([
+        SiteResolution(raw_source=raw, site_code=site_code or '', logic_rnc_id=logic_rnc_id,
+                       parser_version=PARSER_VERSION)
+        for raw, (site_code, logic_rnc_id) in entries.items()
+    ], batch_size=500, ignore_conflicts=True)
@@ -0,0 +1,47 @@
+import pandas as pd
+from etl_app.analytics import clip_intervals, merged_intervals, bucket_minutes
+
+###############################################
+# Rollups por hora y por día
+###############################################
+# Se calculan en el ETL para cada semana cargada y se guardan con la llave de la
+# semana; una cubeta que cae entre dos reportes semanales queda en dos filas que
+# el endpoint suma, así que cargar una semana nueva nunca recalcula las demás.
+
+# Granularidad guardada -> frecuencia de pandas
+GRANULARITIES = {'hour': 'h', 'day': 'D'}
+
+def alarm_rollup(df_alarms, freq):
+    """
+    Conteo de alarmas por región, tipo y cubeta de fecha de inicio.
+    """
+    return (
+        df_alarms.assign(bucket=df_alarms['alarm_occurred_on'].dt.floor(freq))
+        .dropna(subset=['bucket'])
+        .groupby(['region', 'alarm_name', 'bucket'], observed=True, sort=False)
+        .size().rename('count').reset_index()
+    )
+
+def outage_rollup(df_outages, window_start, window_end, freq):
+    """
+    Por sitio y cubeta: outages iniciados y minutos fuera de servicio. Los minutos
+    salen de la unión de intervalos por sitio (recortada a la ventana), para no
+    contar dos veces los outages traslapados.
+    """
+    start, end, valid = clip_intervals(df_outages, 'outage_occurred_on', 'outage_cleared_on',
+                                       window_start, window_end)
+    intervals = merged_intervals(
+        pd.DataFrame({'site': df_outages['site_parsed_outage'], 'start': start, 'end': end})[valid],
+        'site', 'start', 'end',
+    )
+    minutes = bucket_minutes(intervals, 'key', 'start', 'end', freq)
+    counts = (
+        pd.DataFrame({
+            'key': df_outages['site_parsed_outage'].to_numpy(dtype=object),
+            'bucket': df_outages['outage_occurred_on'].dt.floor(freq).to_numpy(),
+        })
+        .dropna()
+        .groupby(['key', 'bucket'], sort=False).size().rename('count').reset_index()
+    )
+    result = counts.merge(minutes, on=['key', 'bucket'], how='outer')
+    return result.fillna({'count': 0, 'minutes': 0.0}).astype({'count': 'int64'})
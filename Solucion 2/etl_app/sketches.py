@@ -0,0 +1,118 @@
+import math
+import struct
+import numpy as np
+
+###############################################
+# Sketch de cuantiles con error relativo acotado (estilo DDSketch)
+###############################################
+# Cada valor positivo cae en la cubeta ceil(log_gamma(x)); cualquier cuantil
+# estimado queda dentro de ±`relative_accuracy` del valor real. Los sketches se
+# combinan sumando los conteos por cubeta, así que un sketch por sitio y semana
+# puede fusionarse en cualquier rango de semanas o en la región completa.
+
+# Formato binario: versión, precisión, conteo de ceros, n cubetas, suma, mín, máx
+_HEADER = struct.Struct('<BdQIddd')
+_FORMAT_VERSION = 1
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self):
+        return self.zero_count + sum(self.buckets.values())
+
+    def add_many(self, values):
+        """
+        Agrega un arreglo de valores (los negativos y NaN se ignoran).
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values) & (values >= 0)]
+        if values.size == 0:
+            return self
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > 0]
+        self.zero_count += int(values.size - positive.size)
+        if positive.size:
+            keys = np.ceil(np.log(positive) / self.log_gamma).astype(np.int64)
+            unique, counts = np.unique(keys, return_counts=True)
+            for key, count in zip(unique.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+        return self
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Solo se pueden combinar sketches con la misma precisión.")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q):
+        """
+        Valor aproximado del cuantil q (0-1); None si el sketch está vacío.
+        """
+        count = self.count
+        if count == 0:
+            return None
+        rank = q * (count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                # Punto medio (en escala relativa) de la cubeta, acotado al rango observado
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self):
+        count = self.count
+        return self.total / count if count else None
+
+    def to_bytes(self):
+        keys = np.fromiter(sorted(self.buckets), dtype=np.int32, count=len(self.buckets))
+        counts = np.array([self.buckets[k] for k in keys.tolist()], dtype=np.uint32)
+        header = _HEADER.pack(_FORMAT_VERSION, self.relative_accuracy, self.zero_count,
+                              len(keys), self.total, self.min, self.max)
+        # Las llaves se guardan como diferencias: casi siempre consecutivas
+        deltas = np.diff(keys, prepend=0).astype(np.int32)
+        return header + deltas.tobytes() + counts.tobytes()
+
+    @classmethod
+    def from_bytes(cls, payload):
+        payload = bytes(payload)
+        version, accuracy, zero_count, n, total, minimum, maximum = _HEADER.unpack_from(payload)
+        if version != _FORMAT_VERSION:
+            raise ValueError(f"Versión de sketch no soportada: {version}")
+        sketch = cls(accuracy)
+        offset = _HEADER.size
+        deltas = np.frombuffer(payload, dtype=np.int32, count=n, offset=offset)
+        counts = np.frombuffer(payload, dtype=np.uint32, count=n, offset=offset + 4 * n)
+        sketch.buckets = dict(zip(np.cumsum(deltas).tolist(), counts.tolist()))
+        sketch.zero_count = zero_count
+        sketch.total, sketch.min, sketch.max = total, minimum, maximum
+        return sketch
+
+def merge_payloads(payloads):
+    """
+    Combina varios sketches serializados en uno solo.
+    """
+    merged = None
+    for payload in payloads:
+        sketch = QuantileSketch.from_bytes(payload)
+        merged = sketch if merged is None else merged.merge(sketch)
+    return merged
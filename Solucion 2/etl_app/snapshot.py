@@ -0,0 +1,160 @@
+import os
+import mmap
+import time
+import struct
+import logging
+import threading
+import numpy as np
+from django.conf import settings
+
+###############################################
+# Snapshot binario de los agregados del dashboard
+###############################################
+# El ETL escribe los agregados en un archivo columnar y lo publica con
+# os.replace (atómico). Cada proceso de gunicorn lo mapea en modo solo lectura:
+# los arreglos numéricos son vistas (np.frombuffer) sobre páginas que el sistema
+# operativo comparte entre todos los procesos, y cuando aparece una versión nueva
+# se mapea el archivo nuevo y se reemplaza la referencia. El mapeo anterior se
+# libera cuando ninguna petición en curso lo usa.
+#
+# Formato (little-endian): cabecera MAGIC, versión (ns), número de secciones;
+# tabla de secciones (nombre, tipo, offset, n); datos alineados a 8 bytes.
+# Tipo 'i' = int64, 'f' = float64, 's' = textos (n+1 offsets int64 + bytes UTF-8).
+
+MAGIC = b'ETLSNAP1'
+_HEADER = struct.Struct('<8sQI')
+_ENTRY = struct.Struct('<16scQQ')
+_DTYPES = {b'i': '<i8', b'f': '<f8'}
+
+def snapshot_path():
+    return str(getattr(settings, 'ETL_SNAPSHOT_PATH', os.path.join(settings.BASE_DIR, 'dashboard.snapshot')))
+
+def _pad(data):
+    return data + b'\0' * (-len(data) % 8)
+
+def write_snapshot(path, sections, version=None):
+    """
+    Escribe `sections` ({nombre: lista o arreglo}) y publica el archivo de forma
+    atómica. Las listas de str se guardan como textos; las de enteros como int64.
+    """
+    version = version or time.time_ns()
+    encoded = []
+    for name, values in sections.items():
+        if len(name.encode('ascii')) > 16:
+            raise ValueError(f"Nombre de sección demasiado largo (máx. 16): {name}")
+        if len(values) and isinstance(values[0], str):
+            blobs = [value.encode('utf-8') for value in values]
+            offsets = np.zeros(len(blobs) + 1, dtype='<i8')
+            np.cumsum([len(b) for b in blobs], out=offsets[1:])
+            encoded.append((name, b's', len(blobs), _pad(offsets.tobytes() + b''.join(blobs))))
+        else:
+            array = np.asarray(values)
+            kind = b'f' if array.dtype.kind == 'f' else b'i'
+            array = np.asarray(array, dtype=_DTYPES[kind])
+            encoded.append((name, kind, len(array), _pad(array.tobytes())))
+
+    offset = _HEADER.size + _ENTRY.size * len(encoded)
+    offset += -offset % 8
+    table, body = [], []
+    for name, kind, count, data in encoded:
+        table.append(_ENTRY.pack(name.encode('ascii'), kind, offset, count))
+        body.append(data)
+        offset += len(data)
+    head = _HEADER.pack(MAGIC, version, len(encoded)) + b''.join(table)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_pad(head))
+        for data in body:
+            f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+class Snapshot:
+    """
+    Snapshot mapeado en memoria (solo lectura).
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.version, count = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise ValueError(f"{path} no es un snapshot del dashboard")
+        self._sections = {}
+        for i in range(count):
+            name, kind, offset, n = _ENTRY.unpack_from(self._mm, _HEADER.size + i * _ENTRY.size)
+            self._sections[name.rstrip(b'\0').decode('ascii')] = (kind, offset, n)
+
+    def __contains__(self, name):
+        return name in self._sections
+
+    def array(self, name):
+        """
+        Arreglo numérico sin copia (vista de solo lectura sobre el mapeo).
+        """
+        kind, offset, n = self._sections[name]
+        return np.frombuffer(self._mm, dtype=_DTYPES[kind], count=n, offset=offset)
+
+    def strings(self, name):
+        kind, offset, n = self._sections[name]
+        if n == 0:
+            return []
+        offsets = np.frombuffer(self._mm, dtype='<i8', count=n + 1, offset=offset)
+        base = offset + 8 * (n + 1)
+        return [self._mm[base + a:base + b].decode('utf-8')
+                for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+_lock = threading.Lock()
+_current = None
+_file_key = None
+_checked_at = 0.0
+
+def current_snapshot():
+    """
+    Snapshot vigente del proceso o None si no se ha publicado. A lo más una vez por
+    ETL_SNAPSHOT_CHECK_SECONDS se revisa (con os.stat) si hay un archivo nuevo.
+    """
+    global _current, _file_key, _checked_at
+    interval = getattr(settings, 'ETL_SNAPSHOT_CHECK_SECONDS', 1.0)
+    if time.monotonic() - _checked_at < interval:
+        return _current
+    with _lock:
+        _checked_at = time.monotonic()
+        path = snapshot_path()
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            _current, _file_key = None, None
+            return None
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key != _file_key:
+            try:
+                _current, _file_key = Snapshot(path), key
+            except (OSError, ValueError, struct.error) as e:
+                logging.warning(f"No se pudo mapear el snapshot {path}: {e}")
+        return _current
+
+def publish_snapshot():
+    """
+    Calcula los agregados de los dashboards sobre todas las particiones y publica
+    un snapshot nuevo. Lo llaman el ETL, el backfill y drop_partitions.
+    """
+    from etl_app.aggregates import backup_by_site, alarm_summary, charts_context
+
+    site_codes, site_avg = backup_by_site()
+    summary = alarm_summary(top=None)
+    version = write_snapshot(snapshot_path(), {
+        **charts_context(),
+        'site_code': site_codes,
+        'site_avg_backup': np.array([np.nan if v is None else v for v in site_avg], dtype=float),
+        'type_name': summary['graph1_labels'],
+        'type_count': summary['graph1_counts'],
+        'minor_sites': [summary['minor_site_count']],
+        'region_name': summary['region_labels'],
+        'region_top_alarm': summary['region_top_alarm'],
+        'region_top_count': summary['region_top_counts'],
+    })
+    logging.info(f"Snapshot del dashboard publicado (versión {version}).")
+    return version
@@ -0,0 +1,51 @@
+import gzip
+import os
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él solo se generan los .gz
+    brotli = None
+
+# Extensiones de texto que vale la pena precomprimir (las imágenes ya vienen comprimidas)
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.html', '.json', '.txt', '.map', '.xml'}
+
+# Solo se conserva la versión comprimida si ahorra al menos este porcentaje
+MIN_SAVING = 0.05
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Storage de collectstatic que, además de agregar el hash al nombre de cada
+    archivo, deja junto a cada archivo de texto sus versiones .gz y .br para que
+    CompressedStaticMiddleware las sirva sin comprimir en cada petición.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        # Si una plantilla referencia un archivo que no existe (p. ej. el video de
+        # fondo) se usa el nombre sin hash en lugar de fallar con un 500.
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            content = f.read()
+        variants = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', lambda data: brotli.compress(data, quality=11)))
+        for suffix, compressor in variants:
+            compressed = compressor(content)
+            if len(compressed) < len(content) * (1 - MIN_SAVING):
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
@@ -1,3 +1,984 @@
-from django.test import TestCase
+import io
+import os
+import datetime
+import tempfile
+from unittest import mock
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from django.contrib.auth.models import User
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from etl_app.analytics import outage_coverage, availability
+from etl_app.correlation import lead_times, match_alarm_types
+from etl_app.rollups import alarm_rollup, outage_rollup
+from etl_app.aggregates import timeseries_points
+from etl_app.sketches import QuantileSketch, merge_payloads
+from etl_app import quality, jobs, snapshot, reports
+from etl_app.admin import EstimatedCountPaginator
+from etl_app.middleware import IMMUTABLE_CACHE, SHORT_CACHE, CompressedStaticMiddleware, accepted_encodings
+from etl_app.models import (
+    EtlJob, JobLock, Region, Site, AlarmType, Alarm, Outage, JoinedRecord, WeekPartition,
+    SiteAvailability, RegionAvailability, BackupSketch, AlarmLeadTime, AlarmRollup, OutageRollup,
+)
+from etl_app.partitions import (
+    PARTITIONED_MODELS, WEEKLY_SUMMARY_MODELS, drop_partition, partitioned, week_from_filename,
+    weeks_in_range,
+)
+from etl_app.management.commands import load_test
+from etl_app.pipeline import join_alarms_outages, store_results, resolve_dimensions
 
-# Create your tests here.
+###############################################
+# Motor de intervalos (barrido) contra fuerza bruta
+###############################################
+class OutageCoverageTests(SimpleTestCase):
+    """
+    Compara el barrido de outage_coverage con una cuadrícula minuto a minuto. Los
+    extremos caen en minutos enteros, así que la cuadrícula es exacta.
+    """
+    WINDOW_MINUTES = 1440
+    BASE = pd.Timestamp('2025-01-06 00:00')
+
+    def random_intervals(self, rng, sites, key, start_col, end_col):
+        rows = []
+        for site in sites:
+            for _ in range(rng.integers(0, 9)):
+                # Algunos empiezan antes o terminan después de la ventana, otros siguen abiertos
+                start = int(rng.integers(-120, self.WINDOW_MINUTES + 60))
+                end = start + int(rng.integers(0, 400))
+                rows.append({
+                    key: site,
+                    start_col: self.BASE + pd.Timedelta(minutes=start),
+                    end_col: pd.NaT if rng.random() < 0.1 else self.BASE + pd.Timedelta(minutes=end),
+                })
+        return pd.DataFrame(rows, columns=[key, start_col, end_col]).astype(
+            {start_col: 'datetime64[ns]', end_col: 'datetime64[ns]'})
+
+    def minute_grid(self, df, key, start_col, end_col, site):
+        covered = np.zeros(self.WINDOW_MINUTES, dtype=bool)
+        for row in df[df[key] == site].itertuples(index=False):
+            start = int((getattr(row, start_col) - self.BASE).total_seconds() // 60)
+            end_value = getattr(row, end_col)
+            end = self.WINDOW_MINUTES if pd.isnull(end_value) else int((end_value - self.BASE).total_seconds() // 60)
+            start, end = max(start, 0), min(end, self.WINDOW_MINUTES)
+            if end > start:
+                covered[start:end] = True
+        return covered
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(31)
+        sites = [f'SITIO{i}' for i in range(12)]
+        window_start = self.BASE
+        window_end = self.BASE + pd.Timedelta(minutes=self.WINDOW_MINUTES)
+        for _ in range(20):
+            outages = self.random_intervals(rng, sites, 'site_parsed_outage',
+                                            'outage_occurred_on', 'outage_cleared_on')
+            windows = self.random_intervals(rng, sites, 'site_parsed_alarm',
+                                            'alarm_occurred_on', 'alarm_cleared_on')
+            result = outage_coverage(outages, windows, window_start, window_end)
+
+            expected = {}
+            for site in sites:
+                covered = self.minute_grid(outages, 'site_parsed_outage', 'outage_occurred_on',
+                                           'outage_cleared_on', site)
+                in_window = self.minute_grid(windows, 'site_parsed_alarm', 'alarm_occurred_on',
+                                             'alarm_cleared_on', site)
+                runs = int(np.count_nonzero(np.diff(covered.astype(int), prepend=0) == 1))
+                if runs:
+                    expected[site] = (int(covered.sum()), runs, int((covered & in_window).sum()))
+
+            self.assertEqual(set(result.index), set(expected))
+            for site, (minutes, runs, overlap) in expected.items():
+                row = result.loc[site]
+                self.assertAlmostEqual(row['outage_minutes'], minutes, places=6)
+                self.assertEqual(int(row['outage_intervals']), runs)
+                self.assertAlmostEqual(row['overlap_minutes'], overlap, places=6)
+                self.assertAlmostEqual(availability(row['outage_minutes'], self.WINDOW_MINUTES),
+                                       100.0 * (1 - minutes / self.WINDOW_MINUTES), places=6)
+
+    def test_empty_inputs(self):
+        outages = self.random_intervals(np.random.default_rng(0), [], 'site_parsed_outage',
+                                        'outage_occurred_on', 'outage_cleared_on')
+        windows = self.random_intervals(np.random.default_rng(0), [], 'site_parsed_alarm',
+                                        'alarm_occurred_on', 'alarm_cleared_on')
+        result = outage_coverage(outages, windows, self.BASE, self.BASE + pd.Timedelta(days=1))
+        self.assertTrue(result.empty)
+
+    def test_region_availability_uses_site_count(self):
+        self.assertEqual(availability(0, 1440), 100.0)
+        self.assertAlmostEqual(availability(720, 1440, site_count=2), 75.0)
+        self.assertEqual(availability(10, 0), 100.0)
+
+
+###############################################
+# Sketch de cuantiles
+###############################################
+class QuantileSketchTests(SimpleTestCase):
+    QUANTILES = [0.0, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 1.0]
+
+    def values(self, seed, size=5000):
+        rng = np.random.default_rng(seed)
+        values = rng.lognormal(mean=4.0, sigma=1.5, size=size)
+        values[:size // 50] = 0.0
+        return values
+
+    def test_relative_error_bound(self):
+        for accuracy in (0.01, 0.05):
+            values = self.values(34)
+            sketch = QuantileSketch(accuracy).add_many(values)
+            ordered = np.sort(values)
+            for q in self.QUANTILES:
+                exact = ordered[int(q * (len(values) - 1))]
+                self.assertLessEqual(abs(sketch.quantile(q) - exact), accuracy * exact + 1e-9,
+                                     f"q={q} precisión={accuracy}")
+            self.assertAlmostEqual(sketch.mean(), values.mean())
+
+    def test_ignores_negative_and_nan(self):
+        sketch = QuantileSketch().add_many([np.nan, -5.0, 10.0, np.inf])
+        self.assertEqual(sketch.count, 1)
+        self.assertIsNone(QuantileSketch().quantile(0.5))
+
+    def test_serialize_round_trip(self):
+        sketch = QuantileSketch().add_many(self.values(1))
+        restored = QuantileSketch.from_bytes(sketch.to_bytes())
+        self.assertEqual(restored.buckets, sketch.buckets)
+        self.assertEqual(restored.zero_count, sketch.zero_count)
+        self.assertEqual((restored.total, restored.min, restored.max), (sketch.total, sketch.min, sketch.max))
+        self.assertEqual([restored.quantile(q) for q in self.QUANTILES],
+                         [sketch.quantile(q) for q in self.QUANTILES])
+
+    def test_merge_equals_sketch_of_union(self):
+        parts = [self.values(seed, size) for seed, size in ((2, 3000), (3, 10), (4, 800))]
+        whole = QuantileSketch().add_many(np.concatenate(parts))
+        merged = merge_payloads([QuantileSketch().add_many(part).to_bytes() for part in parts])
+        self.assertEqual(merged.buckets, whole.buckets)
+        self.assertEqual(merged.count, whole.count)
+        self.assertEqual((merged.min, merged.max), (whole.min, whole.max))
+        self.assertAlmostEqual(merged.total, whole.total)
+        self.assertEqual([merged.quantile(q) for q in self.QUANTILES],
+                         [whole.quantile(q) for q in self.QUANTILES])
+
+    def test_merge_requires_same_accuracy(self):
+        with self.assertRaises(ValueError):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+
+###############################################
+# Calidad de datos y huellas
+###############################################
+class ValidateTests(SimpleTestCase):
+    def alarms(self):
+        t = pd.Timestamp('2025-01-06 08:00')
+        rows = [
+            # occurred, cleared, cleared_raw, site
+            (t, t + pd.Timedelta(hours=1), np.nan, 'TAMREY1591'),             # válida
+            (pd.NaT, t, np.nan, 'TAMREY1592'),                              # sin inicio
+            (t, pd.NaT, 'ayer', 'TAMREY1593'),                              # fin ilegible
+            (t, t - pd.Timedelta(minutes=5), np.nan, 'TAMREY1594'),          # fin antes de inicio
+            (t, pd.NaT, np.nan, 'NAN'),                                     # sitio vacío
+            (t, t + pd.Timedelta(hours=1), np.nan, 'TAMREY1591'),             # duplicado de la primera
+            (pd.NaT, pd.NaT, np.nan, ''),                                   # dos motivos
+            (t, pd.NaT, np.nan, 'TAMREY1595'),                              # alarma aún activa: válida
+        ]
+        df = pd.DataFrame(rows, columns=['alarm_occurred_on', 'alarm_cleared_on', 'alarm_cleared_on_raw',
+                                         'site_parsed_alarm'])
+        df['alarm_source'] = 'NODEB NAME=' + df['site_parsed_alarm']
+        df['alarm_name'] = 'LOW DC VOLTAGE'
+        df['region'] = 'NORTE'
+        return df
+
+    def test_reason_codes(self):
+        valid, quarantined = quality.validate_alarms(self.alarms())
+        self.assertEqual(valid.index.tolist(), [0, 7])
+        self.assertNotIn('alarm_cleared_on_raw', valid.columns)
+        self.assertEqual(quarantined['reasons'].tolist(), [
+            quality.FECHA_INICIO_INVALIDA,
+            quality.FECHA_FIN_INVALIDA,
+            quality.FIN_ANTES_DE_INICIO,
+            quality.SITIO_VACIO,
+            quality.DUPLICADO,
+            f"{quality.FECHA_INICIO_INVALIDA},{quality.SITIO_VACIO}",
+        ])
+        self.assertTrue((quarantined['source'] == 'alarmas').all())
+        self.assertTrue((quarantined['sheet'] == 'NORTE').all())
+        # La fila en cuarentena conserva el texto original de la fecha ilegible
+        self.assertIn('"alarm_cleared_on":"ayer"', quarantined['raw'].iloc[1])
+
+    def test_parse_dates_keeps_only_unparseable_text(self):
+        parsed, text = quality.parse_dates(pd.Series(['06/01/2025 08:00', '-', None, 'ayer']))
+        self.assertEqual(parsed.iloc[0], pd.Timestamp('2025-01-06 08:00'))
+        self.assertTrue(parsed.iloc[1:].isna().all())
+        self.assertEqual(text.isna().tolist(), [True, True, True, False])
+
+class RowFingerprintTests(SimpleTestCase):
+    def alarms(self):
+        return pd.DataFrame({
+            'alarm_occurred_on': pd.to_datetime(['2025-01-06 08:15', '2025-01-06 09:30', '2025-01-06 08:15']),
+            'alarm_source': ['NODEB NAME=TAMREY1591, LOGICRNCID=141', 'NODEB NAME=YUCYAX0519', 'NODEB NAME=YUCYAX0519'],
+            'alarm_name': ['LOW DC VOLTAGE', 'MAINS FAILURE', 'LOW DC VOLTAGE'],
+            'region': ['NORTE', 'PENINSULA', 'PENINSULA'],
+        })
+
+    def test_known_value(self):
+        # Cambiar la huella haría que un reenvío del mismo reporte se insertara de nuevo
+        fingerprints = quality.row_fingerprint(self.alarms(), quality.ALARM_KEY_COLUMNS)
+        self.assertEqual(fingerprints.iloc[0], -3104779449937625338)
+
+    def test_independent_of_representation(self):
+        df = self.alarms()
+        expected = quality.row_fingerprint(df, quality.ALARM_KEY_COLUMNS)
+        lean = df.astype({'alarm_source': 'category', 'alarm_name': 'category', 'region': 'category'})
+        seconds = df.astype({'alarm_occurred_on': 'datetime64[s]'})
+        shuffled = df.iloc[[2, 0, 1]]
+        pd.testing.assert_series_equal(quality.row_fingerprint(lean, quality.ALARM_KEY_COLUMNS), expected)
+        pd.testing.assert_series_equal(quality.row_fingerprint(seconds, quality.ALARM_KEY_COLUMNS), expected)
+        pd.testing.assert_series_equal(quality.row_fingerprint(shuffled, quality.ALARM_KEY_COLUMNS),
+                                       expected.iloc[[2, 0, 1]])
+
+    def test_depends_on_every_key_column(self):
+        df = self.alarms()
+        expected = quality.row_fingerprint(df, quality.ALARM_KEY_COLUMNS)
+        self.assertEqual(expected.nunique(), len(df))
+        for column in quality.ALARM_KEY_COLUMNS:
+            changed = df.copy()
+            if column == 'alarm_occurred_on':
+                changed[column] = changed[column] + pd.Timedelta(seconds=1)
+            else:
+                changed[column] = changed[column] + 'X'
+            fingerprints = quality.row_fingerprint(changed, quality.ALARM_KEY_COLUMNS)
+            self.assertTrue((fingerprints != expected).all(), column)
+
+
+###############################################
+# Cola de trabajos: cron y candados
+###############################################
+class CronTests(SimpleTestCase):
+    def test_parse_cron_field(self):
+        self.assertEqual(jobs.parse_cron_field('*', 0, 5), {0, 1, 2, 3, 4, 5})
+        self.assertEqual(jobs.parse_cron_field('5', 0, 59), {5})
+        self.assertEqual(jobs.parse_cron_field('1-5', 0, 59), {1, 2, 3, 4, 5})
+        self.assertEqual(jobs.parse_cron_field('*/15', 0, 59), {0, 15, 30, 45})
+        self.assertEqual(jobs.parse_cron_field('10-20/5,59', 0, 59), {10, 15, 20, 59})
+        self.assertEqual(jobs.parse_cron_field('5/10', 0, 59), {5, 15, 25, 35, 45, 55})
+        self.assertEqual(jobs.parse_cron_field('mon,FRI', 0, 7, jobs.DAY_NAMES), {1, 5})
+        self.assertEqual(jobs.parse_cron_field('MON-WED', 0, 7, jobs.DAY_NAMES), {1, 2, 3})
+
+    def test_cron_matches(self):
+        friday = datetime.datetime(2025, 1, 10, 2, 0)
+        self.assertTrue(jobs.cron_matches('0 2 * * FRI', friday))
+        self.assertFalse(jobs.cron_matches('0 2 * * FRI', friday + datetime.timedelta(minutes=1)))
+        self.assertFalse(jobs.cron_matches('0 2 * * FRI', friday + datetime.timedelta(days=1)))
+        self.assertTrue(jobs.cron_matches('*/15 * 10 1 *', friday + datetime.timedelta(minutes=45)))
+        self.assertFalse(jobs.cron_matches('*/15 * 11 1 *', friday))
+        sunday = datetime.datetime(2025, 1, 12, 6, 30)
+        # 0 y 7 son domingo
+        self.assertTrue(jobs.cron_matches('30 6 * * 0', sunday))
+        self.assertTrue(jobs.cron_matches('30 6 * * 7', sunday))
+        self.assertFalse(jobs.cron_matches('30 6 * * 1-6', sunday))
+
+    def test_last_due(self):
+        friday = datetime.datetime(2025, 1, 10, 2, 0)
+        self.assertEqual(jobs.last_due('0 2 * * FRI', friday - datetime.timedelta(minutes=1),
+                                       friday + datetime.timedelta(minutes=40)), friday)
+        # Varias ejecuciones perdidas: la más reciente
+        self.assertEqual(jobs.last_due('0 2 * * FRI', friday - datetime.timedelta(days=15),
+                                       friday + datetime.timedelta(hours=1)), friday)
+        # El límite inferior es exclusivo
+        self.assertIsNone(jobs.last_due('0 2 * * FRI', friday, friday + datetime.timedelta(days=6)))
+        self.assertEqual(jobs.last_due('*/15 * * * *', friday, friday + datetime.timedelta(minutes=44)),
+                         friday + datetime.timedelta(minutes=30))
+
+class JobLockTests(TestCase):
+    def stale_running_job(self, job_type='process_etl'):
+        job = EtlJob.objects.create(job_type=job_type, status=EtlJob.RUNNING, worker='muerto:1')
+        old = timezone.now() - jobs.LOCK_TIMEOUT - datetime.timedelta(minutes=1)
+        JobLock.objects.create(job_type=jobs.lock_key(job_type), job=job, owner='muerto:1',
+                               acquired_at=old, heartbeat=old)
+        return job
+
+    def test_stale_lock_takeover_fails_old_job(self):
+        dead = self.stale_running_job()
+        queued = EtlJob.objects.create(job_type='process_etl')
+        claimed = jobs.claim_next_job()
+        self.assertEqual(claimed.pk, queued.pk)
+        self.assertEqual(claimed.status, EtlJob.RUNNING)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, EtlJob.FAILED)
+        self.assertIn('muerto:1', dead.error)
+        self.assertEqual(JobLock.objects.get().job_id, queued.pk)
+
+    def test_fresh_lock_is_not_taken_over(self):
+        running = EtlJob.objects.create(job_type='process_etl', status=EtlJob.RUNNING)
+        JobLock.objects.create(job_type=jobs.lock_key('process_etl'), job=running, owner='vivo:1',
+                               acquired_at=timezone.now())
+        EtlJob.objects.create(job_type='backfill_etl')
+        # backfill_etl comparte el candado de process_etl
+        self.assertIsNone(jobs.claim_next_job())
+        running.refresh_from_db()
+        self.assertEqual(running.status, EtlJob.RUNNING)
+
+    def test_heartbeat_keeps_long_job_alive(self):
+        # Tomado hace más de LOCK_TIMEOUT pero con latido reciente: sigue vivo
+        running = EtlJob.objects.create(job_type='backfill_etl', status=EtlJob.RUNNING)
+        JobLock.objects.create(job_type=jobs.lock_key('backfill_etl'), job=running, owner=jobs.worker_name(),
+                               acquired_at=timezone.now() - 2 * jobs.LOCK_TIMEOUT,
+                               heartbeat=timezone.now() - jobs.LOCK_TIMEOUT - datetime.timedelta(minutes=1))
+        jobs.heartbeat('backfill_etl')
+        EtlJob.objects.create(job_type='process_etl')
+        self.assertIsNone(jobs.claim_next_job())
+        self.assertEqual(jobs.expire_stale_locks(), 0)
+        running.refresh_from_db()
+        self.assertEqual(running.status, EtlJob.RUNNING)
+
+    def test_single_flight_replaces_dead_job(self):
+        dead = self.stale_running_job()
+        job, created = jobs.enqueue('process_etl')
+        self.assertTrue(created)
+        self.assertNotEqual(job.pk, dead.pk)
+        dead.refresh_from_db()
+        self.assertEqual(dead.status, EtlJob.FAILED)
+        self.assertEqual(jobs.enqueue('process_etl'), (job, False))
+
+    def test_command_lock(self):
+        with jobs.command_lock('process_etl'):
+            self.assertEqual(JobLock.objects.get().owner, jobs.worker_name())
+            # Reentrante en el mismo proceso (el worker llama a backfill_etl con call_command)
+            with jobs.command_lock('backfill_etl'):
+                pass
+            self.assertTrue(JobLock.objects.exists())
+        self.assertFalse(JobLock.objects.exists())
+
+        JobLock.objects.create(job_type=jobs.lock_key('backfill_etl'), owner='otro:2', acquired_at=timezone.now())
+        with self.assertRaises(CommandError):
+            with jobs.command_lock('process_etl'):
+                pass
+
+@override_settings(ETL_SCHEDULES=[
+    {'name': 'etl-semanal', 'cron': '0 2 * * FRI', 'job_type': 'process_etl', 'params': {}},
+])
+class ScheduleTests(TestCase):
+    def at(self, *args):
+        return timezone.make_aware(datetime.datetime(*args))
+
+    def test_fires_once_per_due_minute(self):
+        self.assertEqual(jobs.enqueue_due_schedules(self.at(2025, 1, 10, 1, 59)), [])
+        created = jobs.enqueue_due_schedules(self.at(2025, 1, 10, 2, 0))
+        self.assertEqual(len(created), 1)
+        self.assertEqual(jobs.enqueue_due_schedules(self.at(2025, 1, 10, 2, 0)), [])
+        self.assertEqual(jobs.enqueue_due_schedules(self.at(2025, 1, 10, 2, 1)), [])
+
+    def test_catches_up_missed_runs(self):
+        jobs.enqueue_due_schedules(self.at(2025, 1, 10, 1, 59))
+        # El worker estuvo ocupado de 1:59 a 2:40: la ejecución de las 2:00 se recupera
+        created = jobs.enqueue_due_schedules(self.at(2025, 1, 10, 2, 40))
+        self.assertEqual([job.scheduled_for for job in created], [self.at(2025, 1, 10, 2, 0)])
+        # Tres semanas detenido: una sola ejecución, la más reciente
+        created = jobs.enqueue_due_schedules(self.at(2025, 1, 31, 3, 0))
+        self.assertEqual([job.scheduled_for for job in created], [self.at(2025, 1, 31, 2, 0)])
+        self.assertEqual(EtlJob.objects.filter(schedule='etl-semanal').count(), 2)
+
+class EtlRefreshTests(TestCase):
+    def test_requires_staff(self):
+        response = self.client.post(reverse('etl-refresh'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(EtlJob.objects.exists())
+
+        self.client.force_login(User.objects.create_user('operador', is_staff=False))
+        self.assertEqual(self.client.post(reverse('etl-refresh')).status_code, 302)
+
+        self.client.force_login(User.objects.create_user('admin', is_staff=True))
+        response = self.client.post(reverse('etl-refresh'))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], EtlJob.QUEUED)
+        self.assertEqual(self.client.post(reverse('etl-refresh')).status_code, 200)
+
+class LoadTestRegressionTests(SimpleTestCase):
+    def metrics(self, errors=0, p95=10.0, queries=3):
+        return {'errors': errors, 'p95_ms': p95, 'queries': queries}
+
+    def test_regressions(self):
+        regressions = load_test.Command().regressions
+        baseline = {'x1 /api/availability/': self.metrics()}
+        self.assertEqual(regressions({'x1 /api/availability/': self.metrics(p95=12.0)}, baseline, 0.25), [])
+        found = regressions({'x1 /api/availability/': self.metrics(p95=13.0, queries=4)}, baseline, 0.25)
+        self.assertEqual(len(found), 2)
+        # Sin referencia no se comparan p95 ni consultas, pero los errores sí cuentan
+        self.assertEqual(regressions({'x1 /nuevo/': self.metrics(p95=99.0, queries=9)}, baseline, 0.25), [])
+        self.assertEqual(regressions({'x1 /nuevo/': self.metrics(errors=2)}, baseline, 0.25),
+                         ['x1 /nuevo/: 2 errores'])
+
+###############################################
+# Carga de semanas sintéticas (misma forma que deja el ETL)
+###############################################
+def load_week(week, sites=3, seed=1, prepare=None):
+    """
+    Genera y guarda una semana con load_test.synthetic_week (más una fila en
+    cuarentena). `prepare` puede modificar los DataFrames antes de guardarlos.
+    Devuelve (alarmas, outages).
+    """
+    df_alarms, df_outages = load_test.synthetic_week(week, sites, np.random.default_rng(seed))
+    if prepare is not None:
+        prepare(df_alarms, df_outages)
+    quarantine = [quality.quarantine_frame(df_alarms.head(1), 'alarmas', quality.COLUMNAS_FALTANTES, sheet='NORTE')]
+    store_results(df_alarms, df_outages, join_alarms_outages(df_alarms, df_outages), week,
+                  f"alarmas_{week}.xlsx", f"outages_{week}.csv", quarantine)
+    return df_alarms, df_outages
+
+###############################################
+# API de disponibilidad
+###############################################
+class AvailabilityDataTests(TestCase):
+    def test_site_intervals_match_outage_minutes(self):
+        def open_outage(df_alarms, df_outages):
+            # Un outage sin fecha de fin: dura hasta el final de la partición
+            df_outages.loc[0, 'outage_cleared_on'] = pd.NaT
+        _, df_outages = load_week(202501, prepare=open_outage)
+        site = df_outages.loc[0, 'site_parsed_outage']
+
+        payload = self.client.get(reverse('availability-data'), {'site': site}).json()
+        intervals = payload['merged_intervals']
+        minutes = sum((pd.Timestamp(i['end']) - pd.Timestamp(i['start'])).total_seconds() / 60.0
+                      for i in intervals)
+        self.assertEqual(len(intervals), payload['results'][0]['outage_intervals'])
+        self.assertAlmostEqual(minutes, payload['results'][0]['outage_minutes'], places=6)
+
+###############################################
+# Dimensiones
+###############################################
+class DimensionTests(TestCase):
+    def frames(self, alarms, outages):
+        df_alarms = pd.DataFrame(alarms, columns=['site_parsed_alarm', 'region', 'alarm_name'])
+        df_outages = pd.DataFrame(outages, columns=['site_parsed_outage', 'outage_name'])
+        return df_alarms, df_outages
+
+    def test_keys_are_stable_across_loads(self):
+        df_alarms, df_outages = self.frames(
+            [('MEX001', 'NORTE', 'AC POWER FAIL'), ('MEX002', 'CENTRO', 'HIGH TEMPERATURE')],
+            [('MEX001', 'NODEB UNAVAILABLE')],
+        )
+        region_keys, type_keys, site_keys = resolve_dimensions(df_alarms, df_outages)
+        self.assertEqual(set(site_keys), {'MEX001', 'MEX002'})
+        self.assertEqual(set(type_keys), {'AC POWER FAIL', 'HIGH TEMPERATURE', 'NODEB UNAVAILABLE'})
+        self.assertEqual(Site.objects.get(code='MEX002').region_id, region_keys['CENTRO'])
+        # Una segunda carga reutiliza las mismas llaves enteras sin crear filas
+        self.assertEqual(resolve_dimensions(df_alarms, df_outages), (region_keys, type_keys, site_keys))
+        self.assertEqual((Region.objects.count(), AlarmType.objects.count(), Site.objects.count()), (2, 3, 2))
+
+    def test_site_seen_first_in_outages_gets_its_region(self):
+        resolve_dimensions(*self.frames([], [('MEX009', 'NODEB UNAVAILABLE')]))
+        self.assertIsNone(Site.objects.get(code='MEX009').region_id)
+        region_keys, _, _ = resolve_dimensions(*self.frames([('MEX009', 'NORTE', 'AC POWER FAIL')], []))
+        self.assertEqual(Site.objects.get(code='MEX009').region_id, region_keys['NORTE'])
+
+###############################################
+# Particiones semanales
+###############################################
+class PartitionTests(TestCase):
+    def setUp(self):
+        load_week(202501)
+        load_week(202502, seed=2)
+
+    def counts(self, week):
+        return {model.__name__: model.objects.filter(week=week).count()
+                for model in list(PARTITIONED_MODELS) + WEEKLY_SUMMARY_MODELS}
+
+    def test_week_from_filename(self):
+        self.assertEqual(week_from_filename("LOGS DE AE SEMANA 01-2025.xlsx"), 202501)
+        self.assertEqual(week_from_filename("nodeb_unavailable_2025 01.csv"), 202501)
+        self.assertIsNone(week_from_filename("reporte.xlsx"))
+
+    def test_pruning(self):
+        start = timezone.make_aware(datetime.datetime(2024, 12, 31))
+        end = timezone.make_aware(datetime.datetime(2025, 1, 4))
+        self.assertEqual(weeks_in_range(start, end), [202501])
+        self.assertEqual(sorted(weeks_in_range(start, None)), [202501, 202502])
+        expected = Alarm.objects.filter(alarm_occurred_on__gte=start, alarm_occurred_on__lt=end)
+        self.assertEqual(set(partitioned(Alarm, start, end).values_list('pk', flat=True)),
+                         set(expected.values_list('pk', flat=True)))
+
+    def test_drop_partition_only_touches_its_week(self):
+        kept = self.counts(202502)
+        self.assertTrue(all(self.counts(202501).values()))
+        deleted = drop_partition(202501)
+        self.assertGreater(deleted, 0)
+        self.assertFalse(any(self.counts(202501).values()))
+        self.assertEqual(self.counts(202502), kept)
+        self.assertEqual(list(WeekPartition.objects.values_list('key', flat=True)), [202502])
+        self.assertEqual(Outage.objects.count(), kept['Outage'])
+
+###############################################
+# Estáticos precomprimidos
+###############################################
+class CompressedStaticTests(SimpleTestCase):
+    HASHED = 'js/app.0123456789ab.js'
+
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        os.makedirs(os.path.join(folder.name, 'js'))
+        for name, content in [(self.HASHED, b'plano'), (self.HASHED + '.br', b'br'),
+                              (self.HASHED + '.gz', b'gzip'), ('js/sin_hash.js', b'plano')]:
+            with open(os.path.join(folder.name, name), 'wb') as f:
+                f.write(content)
+        settings = override_settings(STATIC_ROOT=folder.name, STATIC_URL='/static/')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.middleware = CompressedStaticMiddleware(lambda request: HttpResponse('vista'))
+
+    def get(self, name, accept_encoding=None):
+        headers = {'HTTP_ACCEPT_ENCODING': accept_encoding} if accept_encoding is not None else {}
+        response = self.middleware(RequestFactory().get('/static/' + name, **headers))
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        response.close()
+        return response, content
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings('br;q=1.0, GZIP;q=0.5, *;q=0'), {'br': 1.0, 'gzip': 0.5, '*': 0.0})
+        self.assertEqual(accepted_encodings('gzip;q=abc'), {'gzip': 0.0})
+        self.assertEqual(accepted_encodings(''), {})
+
+    def test_negotiation(self):
+        cases = [
+            ('gzip, deflate, br', 'br', b'br'),
+            ('gzip', 'gzip', b'gzip'),
+            ('x-gzip', 'gzip', b'gzip'),
+            ('br;q=0.5, gzip', 'gzip', b'gzip'),
+            ('*', 'br', b'br'),
+            ('br;q=0, *;q=0.1', 'gzip', b'gzip'),
+            ('br;q=0, gzip;q=0', None, b'plano'),
+            (None, None, b'plano'),
+        ]
+        for accept_encoding, encoding, content in cases:
+            with self.subTest(accept_encoding=accept_encoding):
+                response, body = self.get(self.HASHED, accept_encoding)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(body, content)
+                self.assertEqual(response['Content-Length'], str(len(content)))
+                self.assertEqual(response['Content-Type'], 'text/javascript')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+                self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE)
+                self.assertNotIn('Content-Disposition', response)
+
+    def test_unhashed_and_missing_files(self):
+        response, body = self.get('js/sin_hash.js', 'br, gzip')
+        self.assertIsNone(response.get('Content-Encoding'))
+        self.assertEqual(response['Cache-Control'], SHORT_CACHE)
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        # Lo que no está en STATIC_ROOT (o sale de él) sigue a las vistas
+        self.assertEqual(self.get('js/no_existe.js')[1], b'vista')
+        self.assertEqual(self.get('../etc/passwd')[1], b'vista')
+
+###############################################
+# Huellas y recarga idempotente
+###############################################
+class IdempotentLoadTests(TestCase):
+    WEEK = 202501
+
+    def frames(self):
+        df_alarms, df_outages = load_test.synthetic_week(self.WEEK, 3, np.random.default_rng(1))
+        return df_alarms, df_outages, join_alarms_outages(df_alarms, df_outages)
+
+    def store(self, df_alarms, df_outages, df_joined, week=WEEK):
+        return store_results(df_alarms, df_outages, df_joined, week, 'alarmas.xlsx', 'outages.csv')
+
+    def state(self):
+        """
+        Hechos y resúmenes de la base en una forma comparable entre cargas.
+        """
+        return {
+            'facts': [sorted(model.objects.values_list('fingerprint', 'week'))
+                      for model in (Alarm, Outage, JoinedRecord)],
+            'site': sorted(SiteAvailability.objects.values_list(
+                'week', 'site__code', 'outage_minutes', 'outage_intervals', 'window_minutes')),
+            'region': sorted(RegionAvailability.objects.values_list(
+                'week', 'region__name', 'outage_minutes', 'site_count')),
+            'sketches': BackupSketch.objects.count(),
+            'lead_times': list(AlarmLeadTime.objects.order_by('week', 'site__code', 'alarm_occurred_on', 'lead_minutes')
+                               .values_list('week', 'site__code', 'alarm_occurred_on', 'lead_minutes')),
+            'rollups': (AlarmRollup.objects.count(), OutageRollup.objects.count()),
+            'partitions': list(WeekPartition.objects.values_list(
+                'key', 'start', 'end', 'alarm_count', 'outage_count', 'joined_count')),
+        }
+
+    def test_rerun_inserts_nothing(self):
+        frames = self.frames()
+        # Con la semilla fija: 60 alarmas, 6 outages y 2 filas del JOIN
+        self.assertEqual(self.store(*frames), 68)
+        self.assertEqual(Alarm.objects.exclude(fingerprint=None).values('fingerprint').distinct().count(), 60)
+        before = self.state()
+        self.assertEqual(self.store(*frames), 0)
+        self.assertEqual(self.state(), before)
+
+    def test_partial_then_full_load_matches_full_load(self):
+        df_alarms, df_outages, df_joined = self.frames()
+        half = [df.iloc[:len(df) // 2] for df in (df_alarms, df_outages)]
+        self.store(*half, join_alarms_outages(*half))
+        self.store(df_alarms, df_outages, df_joined)
+        incremental = self.state()
+        drop_partition(self.WEEK)
+        self.store(df_alarms, df_outages, df_joined)
+        self.assertEqual(self.state(), incremental)
+
+    def test_rows_of_another_week_are_not_reloaded(self):
+        frames = self.frames()
+        self.store(*frames)
+        before = self.state()['facts']
+        # El mismo reporte reenviado con el nombre de otra semana
+        self.assertEqual(self.store(*frames, week=202502), 0)
+        self.assertEqual(self.state()['facts'], before)
+
+###############################################
+# Correlación alarma -> outage
+###############################################
+class LeadTimeTests(SimpleTestCase):
+    def frames(self):
+        t = lambda hhmm: pd.Timestamp(f'2025-01-06 {hhmm}')
+        df_alarms = pd.DataFrame([
+            ('A', 'NORTE', 'AC POWER FAIL', t('10:00')),
+            ('A', 'NORTE', 'LOW DC VOLTAGE', t('10:40')),
+            ('A', 'NORTE', 'AC POWER FAIL', t('12:00')),
+            ('B', 'CENTRO', 'AC POWER FAIL', t('10:00')),
+            ('A', 'NORTE', 'HIGH TEMPERATURE', t('10:00')),
+        ], columns=['site_parsed_alarm', 'region', 'alarm_name', 'alarm_occurred_on'])
+        df_outages = pd.DataFrame([
+            ('A', t('09:00')),
+            ('A', t('10:30')),
+            ('A', t('12:00')),
+            ('C', t('10:05')),
+        ], columns=['site_parsed_outage', 'outage_occurred_on'])
+        return df_alarms, df_outages
+
+    def leads(self, result):
+        return {(row.site_parsed_alarm, row.alarm_name, row.alarm_occurred_on.strftime('%H:%M')):
+                None if pd.isna(row.lead_minutes) else row.lead_minutes
+                for row in result.itertuples()}
+
+    def test_match_alarm_types(self):
+        names = pd.Series(['AC POWER FAIL', 'LOW DC VOLTAGE', 'HIGH TEMPERATURE', None])
+        self.assertEqual(match_alarm_types(names, ['ac power', 'LOW .* VOLTAGE']).tolist(),
+                         [True, True, False, False])
+        self.assertFalse(match_alarm_types(names, []).any())
+
+    def test_forward_direction_and_tolerance(self):
+        df_alarms, df_outages = self.frames()
+        patterns = ['AC POWER FAIL', 'LOW DC VOLTAGE']
+        # Siguiente outage del mismo sitio, en o después de la alarma; el de las 9:00
+        # es anterior y el de C es de otro sitio
+        self.assertEqual(self.leads(lead_times(df_alarms, df_outages, patterns)), {
+            ('A', 'AC POWER FAIL', '10:00'): 30.0,
+            ('A', 'LOW DC VOLTAGE', '10:40'): 80.0,
+            ('A', 'AC POWER FAIL', '12:00'): 0.0,
+            ('B', 'AC POWER FAIL', '10:00'): None,
+        })
+        # Con tolerancia de una hora la alarma de las 10:40 se conserva sin outage
+        limited = lead_times(df_alarms, df_outages, patterns, max_lead=pd.Timedelta(hours=1))
+        self.assertIsNone(self.leads(limited)[('A', 'LOW DC VOLTAGE', '10:40')])
+        self.assertEqual(self.leads(limited)[('A', 'AC POWER FAIL', '10:00')], 30.0)
+
+    def test_lean_categorical_sites(self):
+        df_alarms, df_outages = self.frames()
+        expected = self.leads(lead_times(df_alarms, df_outages, ['AC POWER FAIL']))
+        df_alarms['site_parsed_alarm'] = df_alarms['site_parsed_alarm'].astype('category')
+        df_outages['site_parsed_outage'] = df_outages['site_parsed_outage'].astype('category')
+        self.assertEqual(self.leads(lead_times(df_alarms, df_outages, ['AC POWER FAIL'])), expected)
+
+###############################################
+# Rollups por hora y por día
+###############################################
+class RollupTests(TestCase):
+    def test_alarm_buckets_sum_to_raw_counts(self):
+        df_alarms, _ = load_test.synthetic_week(202501, 5, np.random.default_rng(3))
+        for freq in ('h', 'D'):
+            rollup = alarm_rollup(df_alarms, freq)
+            self.assertEqual(rollup['count'].sum(), len(df_alarms))
+            raw = df_alarms.groupby(df_alarms['alarm_occurred_on'].dt.floor(freq)).size()
+            self.assertEqual(rollup.groupby('bucket')['count'].sum().sort_index().tolist(), raw.tolist())
+
+    def test_outage_minutes_split_across_buckets(self):
+        t = lambda hhmm: pd.Timestamp(f'2025-01-06 {hhmm}')
+        df_outages = pd.DataFrame({
+            'site_parsed_outage': ['A', 'A', 'B'],
+            'outage_occurred_on': [t('10:30'), t('11:00'), t('10:50')],
+            # Los dos outages de A se traslapan: la unión es 10:30-12:15
+            'outage_cleared_on': [t('11:45'), t('12:15'), pd.NaT],
+        })
+        rollup = outage_rollup(df_outages, t('00:00'), t('11:30'), 'h').set_index(['key', 'bucket'])
+        self.assertEqual(rollup.loc[('A', t('10:00')), 'minutes'], 30.0)
+        self.assertEqual(rollup.loc[('A', t('11:00')), 'minutes'], 30.0)
+        self.assertEqual(rollup.loc[('A', t('11:00')), 'count'], 1)
+        # B sigue abierto: cuenta hasta el final de la ventana
+        self.assertEqual(rollup.loc[('B', t('10:00')), 'minutes'], 10.0)
+        self.assertEqual(rollup.loc[('B', t('11:00')), 'minutes'], 30.0)
+        self.assertEqual(rollup['count'].sum(), 3)
+
+    def test_stored_rollups_match_facts(self):
+        load_week(202501, sites=5)
+        load_week(202502, sites=5, seed=2)
+        for granularity in ('hour', 'day'):
+            points = timeseries_points('alarms', granularity)
+            self.assertEqual(sum(p['count'] for p in points), Alarm.objects.count())
+            points = timeseries_points('alarms', granularity, region='norte')
+            self.assertEqual(sum(p['count'] for p in points), Alarm.objects.filter(region__name='NORTE').count())
+            points = timeseries_points('outages', granularity)
+            self.assertEqual(sum(p['count'] for p in points), Outage.objects.count())
+            self.assertAlmostEqual(sum(p['minutes'] for p in points),
+                                   sum(SiteAvailability.objects.values_list('outage_minutes', flat=True)), places=6)
+        # Con rango de días completos: las cubetas diarias suman lo mismo que las alarmas del rango
+        start = timezone.make_aware(datetime.datetime(2025, 1, 3))
+        end = timezone.make_aware(datetime.datetime(2025, 1, 8))
+        points = timeseries_points('alarms', 'day', start, end)
+        self.assertEqual(sum(p['count'] for p in points),
+                         Alarm.objects.filter(alarm_occurred_on__gte=start, alarm_occurred_on__lt=end).count())
+
+###############################################
+# Snapshot compartido del dashboard
+###############################################
+def reset_snapshot_cache():
+    """
+    Olvida el snapshot mapeado por este proceso (estado de módulo de current_snapshot).
+    """
+    snapshot._current, snapshot._file_key, snapshot._checked_at = None, None, 0.0
+
+class SnapshotTests(SimpleTestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'dashboard.snapshot')
+        settings = override_settings(ETL_SNAPSHOT_PATH=self.path, ETL_SNAPSHOT_CHECK_SECONDS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_snapshot_cache()
+        self.addCleanup(reset_snapshot_cache)
+
+    def test_round_trip(self):
+        version = snapshot.write_snapshot(self.path, {
+            'codes': ['MEX001', 'PEÑASCO', ''],
+            'counts': [3, 0, -7],
+            'averages': np.array([1.5, np.nan, 2.25]),
+            'empty': [],
+        })
+        loaded = snapshot.Snapshot(self.path)
+        self.assertEqual(loaded.version, version)
+        self.assertEqual(loaded.strings('codes'), ['MEX001', 'PEÑASCO', ''])
+        self.assertEqual(loaded.array('counts').tolist(), [3, 0, -7])
+        self.assertEqual(loaded.array('counts').dtype, np.dtype('<i8'))
+        averages = loaded.array('averages')
+        self.assertEqual(averages[[0, 2]].tolist(), [1.5, 2.25])
+        self.assertTrue(np.isnan(averages[1]))
+        self.assertEqual(loaded.array('empty').tolist(), [])
+        self.assertIn('codes', loaded)
+        self.assertNotIn('otra', loaded)
+        # Vistas de solo lectura sobre el mapeo, no copias
+        with self.assertRaises(ValueError):
+            loaded.array('counts')[0] = 1
+
+    def test_invalid_files(self):
+        with self.assertRaises(ValueError):
+            snapshot.write_snapshot(self.path, {'nombre_de_seccion_largo': [1]})
+        with open(self.path, 'wb') as f:
+            f.write(b'NOSNAP00' + b'\0' * 32)
+        with self.assertRaises(ValueError):
+            snapshot.Snapshot(self.path)
+        # current_snapshot no falla con un archivo inválido: sigue sin snapshot
+        with self.assertLogs(level='WARNING'):
+            self.assertIsNone(snapshot.current_snapshot())
+
+    def test_reload_on_change(self):
+        self.assertIsNone(snapshot.current_snapshot())
+        first = snapshot.write_snapshot(self.path, {'counts': [1]}, version=1)
+        current = snapshot.current_snapshot()
+        self.assertEqual(current.version, first)
+        # Sin cambios en el archivo se reutiliza el mismo mapeo
+        self.assertIs(snapshot.current_snapshot(), current)
+        snapshot.write_snapshot(self.path, {'counts': [1, 2]}, version=2)
+        self.assertEqual(snapshot.current_snapshot().version, 2)
+        self.assertEqual(snapshot.current_snapshot().array('counts').tolist(), [1, 2])
+        # El mapeo anterior sigue siendo válido para una petición que aún lo use
+        self.assertEqual(current.array('counts').tolist(), [1])
+        os.remove(self.path)
+        self.assertIsNone(snapshot.current_snapshot())
+
+    def test_check_interval(self):
+        snapshot.write_snapshot(self.path, {'counts': [1]}, version=1)
+        self.assertEqual(snapshot.current_snapshot().version, 1)
+        snapshot.write_snapshot(self.path, {'counts': [2]}, version=2)
+        # Dentro del intervalo no se revisa el archivo
+        with self.settings(ETL_SNAPSHOT_CHECK_SECONDS=3600):
+            self.assertEqual(snapshot.current_snapshot().version, 1)
+        self.assertEqual(snapshot.current_snapshot().version, 2)
+
+class DashboardMixin:
+    """
+    Dos semanas cargadas y un snapshot en una ruta temporal (aún sin publicar).
+    """
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.path = os.path.join(folder.name, 'dashboard.snapshot')
+        settings = override_settings(ETL_SNAPSHOT_PATH=self.path, ETL_SNAPSHOT_CHECK_SECONDS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        reset_snapshot_cache()
+        self.addCleanup(reset_snapshot_cache)
+        load_week(202501, sites=5)
+        load_week(202502, sites=5, seed=2)
+
+    def context(self, url):
+        """
+        Variables de la plantilla que arma la vista (sin las de los context processors).
+        """
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return {key: response.context[key] for key in response.context.flatten()
+                if key not in ('csrf_token', 'request', 'user', 'perms', 'messages', 'view')
+                and not key.startswith('DEFAULT_') and key not in ('True', 'False', 'None')}
+
+class SnapshotDashboardTests(DashboardMixin, TestCase):
+
+    def test_snapshot_matches_database(self):
+        from_db = {url: self.context(url) for url in ('/', '/dashboard-mas/')}
+        snapshot.publish_snapshot()
+        for url, expected in from_db.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    served = self.context(url)
+                self.assertEqual(served, expected)
+
+###############################################
+# Dashboards asíncronos
+###############################################
+class AsyncDashboardTests(DashboardMixin, TransactionTestCase):
+    # Las consultas de las vistas asíncronas corren en otros hilos con su propia
+    # conexión: los datos deben estar confirmados, no dentro de la transacción del test
+    RANGE = '?start=2024-12-31&end=2025-01-08'
+
+    def test_same_context_as_sync_views(self):
+        for sync_url, async_url in [('/', '/async/'), ('/dashboard-mas/', '/async/dashboard-mas/')]:
+            for query in ('', self.RANGE):
+                with self.subTest(url=async_url + query):
+                    expected = self.context(sync_url + query)
+                    self.assertTrue(all(expected.values()))
+                    self.assertEqual(self.context(async_url + query), expected)
+        snapshot.publish_snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.context('/async/dashboard-mas/'), self.context('/dashboard-mas/'))
+
+###############################################
+# Reporte Excel
+###############################################
+class ReportTests(TestCase):
+    def setUp(self):
+        load_week(202501, sites=5)
+        load_week(202502, sites=5, seed=2)
+
+    def workbook(self, weeks=None):
+        target = io.BytesIO()
+        total = reports.write_report(target, weeks)
+        target.seek(0)
+        return total, load_workbook(target, read_only=True)
+
+    def detail_rows(self, wb):
+        return {ws.title: list(ws.iter_rows(min_row=2, values_only=True)) for ws in wb.worksheets[1:]}
+
+    def test_sheet_title(self):
+        used = set()
+        self.assertEqual(reports.sheet_title('NORTE/SUR [1]', used), 'NORTE SUR  1')
+        self.assertEqual(reports.sheet_title('norte/sur [1]', used), 'norte sur  1 (2)')
+        self.assertEqual(len(reports.sheet_title('X' * 40, used)), 31)
+        self.assertEqual(reports.sheet_title('X' * 40, used), 'X' * 27 + ' (2)')
+        self.assertEqual(reports.sheet_title('', used), 'SIN REGION')
+
+    def test_summary_and_details_match_the_join(self):
+        total, wb = self.workbook()
+        self.assertEqual(total, JoinedRecord.objects.count())
+        summary = list(wb['Resumen'].iter_rows(min_row=2, values_only=True))
+        details = self.detail_rows(wb)
+        self.assertEqual([row[0] for row in summary], list(details))
+        for row in summary:
+            self.assertEqual(row[2], JoinedRecord.objects.filter(region__name=row[0]).count())
+            self.assertEqual(len(details[row[0]]), row[2])
+        self.assertEqual(sum(len(rows) for rows in details.values()), total)
+
+        total, wb = self.workbook([202501])
+        self.assertEqual(total, JoinedRecord.objects.filter(week=202501).count())
+        self.assertEqual({row[0] for rows in self.detail_rows(wb).values() for row in rows}, {202501})
+
+    def test_long_regions_continue_on_a_new_sheet(self):
+        expected = self.detail_rows(self.workbook()[1])
+        # Encabezado + 1 registro por hoja: cada registro extra abre "REGION (n)"
+        with mock.patch.object(reports, 'MAX_SHEET_ROWS', 2):
+            total, wb = self.workbook()
+        details = self.detail_rows(wb)
+        self.assertTrue(all(len(rows) <= 1 for rows in details.values()))
+        for region, rows in expected.items():
+            continued = [title for title in details if title == region or title.startswith(region + ' (')]
+            self.assertEqual(len(continued), max(len(rows), 1))
+            self.assertEqual([row for title in continued for row in details[title]], rows)
+
+    def test_download(self):
+        response = self.client.get(reverse('report-xlsx'), {'week': '202501'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="reporte_202501.xlsx"')
+        content = b''.join(response.streaming_content)
+        response.close()
+        wb = load_workbook(io.BytesIO(content), read_only=True)
+        self.assertEqual(wb.sheetnames[0], 'Resumen')
+
+###############################################
+# Admin de las tablas de hechos
+###############################################
+class FactAdminTests(TestCase):
+    def setUp(self):
+        load_week(202501, sites=5)
+        load_week(202502, sites=5, seed=2)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'clave'))
+
+    def changelist(self, model, params=None):
+        response = self.client.get(reverse(f'admin:etl_app_{model._meta.model_name}_changelist'), params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.context['cl']
+
+    def test_estimated_count(self):
+        # Sin filtros: suma de WeekPartition, sin COUNT(*) sobre los hechos
+        for model in (Alarm, Outage, JoinedRecord):
+            with CaptureQueriesContext(connection) as captured:
+                count = EstimatedCountPaginator(model.objects.order_by('-pk'), 100).count
+            self.assertEqual(count, model.objects.count())
+            self.assertEqual(len(captured), 1)
+            self.assertNotIn(model._meta.db_table, captured[0]['sql'])
+        # Con filtros: conteo exacto hasta COUNT_LIMIT
+        filtered = Alarm.objects.filter(week=202501).order_by('-pk')
+        self.assertEqual(EstimatedCountPaginator(filtered, 100).count, filtered.count())
+        with mock.patch.object(EstimatedCountPaginator, 'COUNT_LIMIT', 5):
+            self.assertEqual(EstimatedCountPaginator(filtered, 100).count, 5)
+
+    def test_date_range_filter_bounds(self):
+        cl = self.changelist(Alarm, {'alarm_occurred_on_desde': '2024-12-31', 'alarm_occurred_on_hasta': '2025-01-04'})
+        start = timezone.make_aware(datetime.datetime(2024, 12, 31))
+        # "hasta" es inclusivo: se corta al inicio del día siguiente
+        end = timezone.make_aware(datetime.datetime(2025, 1, 5))
+        expected = Alarm.objects.filter(alarm_occurred_on__gte=start, alarm_occurred_on__lt=end)
+        self.assertEqual(set(cl.queryset.values_list('pk', flat=True)), set(expected.values_list('pk', flat=True)))
+        self.assertEqual(cl.result_count, expected.count())
+        self.assertLess(cl.result_count, Alarm.objects.count())
+
+        cl = self.changelist(Outage, {'outage_occurred_on_desde': '2025-01-06'})
+        self.assertEqual(cl.result_count, Outage.objects.filter(week=202502).count())
+        # Una fecha inválida no filtra
+        cl = self.changelist(JoinedRecord, {'alarm_occurred_on_hasta': 'ayer'})
+        self.assertEqual(cl.result_count, JoinedRecord.objects.count())
+
+    def test_week_site_and_search_filters(self):
+        cl = self.changelist(Alarm, {'week': '202502'})
+        self.assertEqual(cl.result_count, Alarm.objects.filter(week=202502).count())
+        cl = self.changelist(Alarm, {'site_code': ' syn00001 '})
+        self.assertEqual(cl.result_count, Alarm.objects.filter(site__code='SYN00001').count())
+        cl = self.changelist(Outage, {'q': 'syn0000'})
+        self.assertEqual(cl.result_count, Outage.objects.filter(site__code__startswith='SYN0000').count())
+        cl = self.changelist(Outage, {'q': 'xyz'})
+        self.assertEqual(cl.result_count, 0)
@@ -5,4 +5,14 @@ urlpatterns = [
  
     path('', views.dashboard, name='dashboard'),
     path('dashboard-mas/', views.dashboard_mas, name='dashboard-mas'),
+    path('async/', views.dashboard_async, name='dashboard-async'),
+    path('async/dashboard-mas/', views.dashboard_mas_async, name='dashboard-mas-async'),
+    path('api/availability/', views.availability_data, name='availability-data'),
+    path('api/backup-distribution/', views.backup_distribution, name='backup-distribution'),
+    path('api/timeseries/', views.timeseries, name='timeseries'),
+    path('api/lead-times/', views.lead_time_comparison, name='lead-times'),
+    path('api/data-quality/', views.data_quality, name='data-quality'),
+    path('reports/xlsx/', views.report_xlsx, name='report-xlsx'),
+    path('etl/refresh/', views.etl_refresh, name='etl-refresh'),
+    path('etl/jobs/<int:job_id>/', views.etl_job_status, name='etl-job-status'),
 ]
\ No newline at end of file
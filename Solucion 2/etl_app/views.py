@@ -1,20 +1,83 @@
-from django.shortcuts import render
-from django.db.models import Avg ,Count
-from etl_app.models import JoinedRecord
-from etl_app.models import Alarm, JoinedRecord
-from collections import defaultdict
+import asyncio
+import tempfile
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
+from django.shortcuts import render, get_object_or_404
+from django.db import connections
+from django.db.models import Count, Sum, F
+from django.http import JsonResponse, FileResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from etl_app.models import (
+    Outage, Site, Region, EtlJob, WeekPartition,
+    SiteAvailability, RegionAvailability, QuarantinedRow,
+)
+from etl_app.analytics import merged_intervals, availability
+from etl_app.jobs import enqueue
+from etl_app.aggregates import (
+    backup_by_site, alarm_summary, alarm_type_counts, minor_rect_site_count, region_top_alarms,
+    summary_context, backup_percentiles, lead_times_by_type, timeseries_points, charts_context,
+)
+from etl_app.snapshot import current_snapshot
+from etl_app.reports import write_report
+from etl_app.partitions import partitioned, parse_date_range, weeks_in_range
+import pandas as pd
+
+def _backup_from_snapshot(snapshot):
+    labels = snapshot.strings('site_code')
+    # NaN (sitio sin promedio) se muestra igual que el None de la consulta
+    values = [None if v != v else v for v in snapshot.array('site_avg_backup').tolist()]
+    return labels, values
+
+# Gráficas 4-6: secciones del snapshot con el mismo nombre que la llave de charts_context
+CHART_STRINGS = ['backup_regions', 'lead_types']
+CHART_ARRAYS = ['backup_p50', 'backup_p90', 'backup_p99', 'lead_avg_minutes', 'lead_matched', 'lead_alarms',
+                'alarm_days', 'alarm_day_counts', 'outage_days', 'outage_minutes']
+
+def _summary_from_snapshot(snapshot):
+    context = {
+        'graph1_labels': snapshot.strings('type_name')[:20],
+        'graph1_counts': snapshot.array('type_count')[:20].tolist(),
+        'minor_site_count': int(snapshot.array('minor_sites')[0]),
+        'region_labels': snapshot.strings('region_name'),
+        'region_top_counts': snapshot.array('region_top_count').tolist(),
+        'region_top_alarm': snapshot.strings('region_top_alarm'),
+    }
+    context.update({name: snapshot.strings(name) for name in CHART_STRINGS})
+    context.update({name: snapshot.array(name).tolist() for name in CHART_ARRAYS})
+    return context
+
+EMPTY_SUMMARY = {
+    'graph1_labels': [], 'graph1_counts': [], 'minor_site_count': 0,
+    'region_labels': [], 'region_top_counts': [], 'region_top_alarm': [],
+    **{name: [] for name in CHART_STRINGS + CHART_ARRAYS},
+}
+
+def _mas_snapshot(start, end):
+    # Un snapshot publicado antes de agregar las gráficas 4-6 no las trae: se consulta la base
+    snapshot = current_snapshot() if start is None and end is None else None
+    if snapshot is not None and all(name in snapshot for name in CHART_STRINGS + CHART_ARRAYS):
+        return snapshot
+    return None
+
+def _render_dashboard_mas(request, context):
+    print("Regiones:", context['region_labels'])
+    print("Fallas top:", context['region_top_alarm'])
+    print("Conteos:", context['region_top_counts'])
+    return render(request, 'dashboard_mas.html', context)
 
 def dashboard(request):
-    # Obtener los datos agrupados por sitio y calcular el promedio
-    data = (
-        JoinedRecord.objects
-        .values('site_parsed_alarm')
-        .annotate(avg_backup=Avg('backup_minutes'))
-        .order_by('site_parsed_alarm')
-    )
-    labels = [d['site_parsed_alarm'] for d in data]
-    values = [d['avg_backup'] for d in data]
-    
+    # Rango opcional ?start=AAAA-MM-DD&end=AAAA-MM-DD (solo se leen las particiones que lo cubren)
+    start, end = parse_date_range(request.GET)
+
+    # Sin rango se sirve el snapshot publicado por el ETL (sin consultar la base)
+    snapshot = current_snapshot() if start is None and end is None else None
+    if snapshot is not None:
+        labels, values = _backup_from_snapshot(snapshot)
+    else:
+        # Obtener los datos agrupados por sitio (llave entera) y calcular el promedio
+        labels, values = backup_by_site(start, end)
+
     context = {
         'labels': labels,
         'values': values,
@@ -29,73 +92,298 @@ def dashboard_mas(request):
     1) Gráfico 1: Top 20 tipos de alarma (Eje X: tipo de alarma, Eje Y: conteo total de registros).
     2) Gráfico 2: Total de sitios (site_parsed_alarm) que presentan "MINOR RECT FAILURE".
     3) Gráfico 3: Por cada región, determina cuál es la alarma más frecuente (falla top) y muestra su conteo.
+
+    Acepta ?start=AAAA-MM-DD&end=AAAA-MM-DD para limitar las particiones semanales consultadas;
+    sin rango los datos salen del snapshot publicado por el ETL.
     """
+    start, end = parse_date_range(request.GET)
+    snapshot = _mas_snapshot(start, end)
+    if snapshot is not None:
+        context = _summary_from_snapshot(snapshot)
+    else:
+        try:
+            context = {**alarm_summary(start, end), **charts_context(start, end)}
+        except Exception as e:
+            print("Error en consulta de alarmas:", e)
+            context = dict(EMPTY_SUMMARY)
+    return _render_dashboard_mas(request, context)
+
+
+###############################################
+# Dashboards asíncronos (despliegue ASGI)
+###############################################
+# El ORM asíncrono de Django (aget, acount, async for) ejecuta cada consulta con
+# sync_to_async(thread_sensitive=True), es decir, en un único hilo compartido, así
+# que varias consultas "a la vez" terminan en serie. Para que las agregaciones
+# independientes corran de verdad en paralelo cada una va a su propio hilo
+# (thread_sensitive=False) con su propia conexión, que se cierra al terminar.
+# SQLite admite varios lectores simultáneos y libera el GIL mientras consulta.
+
+def _in_thread(func):
+    def run(*args):
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+    return sync_to_async(run, thread_sensitive=False)
 
-    # --- Gráfico 1: Top 20 tipos de alarma ---
-    try:
-        alarm_type_data = (
-            Alarm.objects
-            .values('alarm_name')
-            .annotate(total=Count('id'))
-            .order_by('-total')[:20]
+async def dashboard_async(request):
+    """
+    Igual que `dashboard`, sin bloquear el event loop mientras corre la consulta.
+    """
+    start, end = parse_date_range(request.GET)
+    snapshot = current_snapshot() if start is None and end is None else None
+    if snapshot is not None:
+        labels, values = _backup_from_snapshot(snapshot)
+    else:
+        labels, values = await _in_thread(backup_by_site)(start, end)
+    return render(request, 'dashboard.html', {'labels': labels, 'values': values})
+
+async def dashboard_mas_async(request):
+    """
+    Igual que `dashboard_mas`, pero las tres agregaciones (top de tipos, sitios con
+    MINOR RECT FAILURE y falla top por región) se ejecutan concurrentemente: la
+    latencia es la de la consulta más lenta y no la suma de las tres.
+    """
+    start, end = parse_date_range(request.GET)
+    snapshot = _mas_snapshot(start, end)
+    if snapshot is not None:
+        context = _summary_from_snapshot(snapshot)
+    else:
+        try:
+            *summary, charts = await asyncio.gather(
+                _in_thread(alarm_type_counts)(start, end, 20),
+                _in_thread(minor_rect_site_count)(start, end),
+                _in_thread(region_top_alarms)(start, end),
+                _in_thread(charts_context)(start, end),
+            )
+            context = {**summary_context(*summary), **charts}
+        except Exception as e:
+            print("Error en consulta de alarmas:", e)
+            context = dict(EMPTY_SUMMARY)
+    return _render_dashboard_mas(request, context)
+
+
+###############################################
+# Distribución del tiempo de respaldo (p50/p90/p99)
+###############################################
+def backup_distribution(request):
+    """
+    Percentiles de backup_minutes por región (por defecto) o por sitio
+    (?level=site o ?site=CODIGO) para el rango ?start/?end. Se combinan los
+    sketches semanales guardados por el ETL, sin leer JoinedRecord.
+    """
+    start, end = parse_date_range(request.GET)
+    site_code = request.GET.get('site')
+    level = 'site' if site_code or request.GET.get('level') == 'site' else 'region'
+    return JsonResponse({'level': level, 'results': backup_percentiles(start, end, level, site_code)})
+
+def lead_time_comparison(request):
+    """
+    Comparación por tipo de alarma del tiempo hasta el siguiente outage del sitio
+    (ETL_CORRELATION_PATTERNS) para el rango ?start/?end y, opcionalmente, ?region.
+    """
+    start, end = parse_date_range(request.GET)
+    return JsonResponse({'results': lead_times_by_type(start, end, request.GET.get('region'))})
+
+
+###############################################
+# Series de tiempo (rollups por hora / día)
+###############################################
+def timeseries(request):
+    """
+    Serie de tiempo para cualquier rango leída de los rollups del ETL, sin tocar
+    las tablas de hechos.
+
+    Parámetros: ?series=alarms|outages, ?start/?end (AAAA-MM-DD),
+    ?granularity=hour|day (por defecto hour si el rango es de 7 días o menos),
+    y filtros ?region y ?alarm_type (alarmas) o ?site (outages).
+    """
+    start, end = parse_date_range(request.GET)
+    granularity = request.GET.get('granularity')
+    if granularity not in ('hour', 'day'):
+        short_range = start is not None and end is not None and (end - start).days <= 7
+        granularity = 'hour' if short_range else 'day'
+    series = 'outages' if request.GET.get('series') == 'outages' else 'alarms'
+    points = timeseries_points(series, granularity, start, end, region=request.GET.get('region'),
+                               alarm_type=request.GET.get('alarm_type'), site=request.GET.get('site'))
+    return JsonResponse({'series': series, 'granularity': granularity, 'points': points})
+
+
+###############################################
+# Ejecución del ETL desde la web (vía la cola del worker)
+###############################################
+def job_status_payload(job):
+    return {
+        'id': job.pk,
+        'job_type': job.job_type,
+        'status': job.status,
+        'stage': job.stage,
+        'stage_durations': job.stage_durations,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+        'status_url': reverse('etl-job-status', args=[job.pk]),
+    }
+
+
+@staff_member_required
+@require_POST
+def etl_refresh(request):
+    """
+    Encola una actualización del ETL y responde de inmediato; el trabajo lo ejecuta
+    el worker (run_etl_worker), no el proceso de gunicorn. Si ya hay una en cola o
+    en ejecución se devuelve esa. Solo para personal (mismo acceso que el admin).
+    """
+    job, created = enqueue('process_etl')
+    return JsonResponse(job_status_payload(job), status=202 if created else 200)
+
+
+def etl_job_status(request, job_id):
+    job = get_object_or_404(EtlJob, pk=job_id)
+    return JsonResponse(job_status_payload(job))
+
+
+###############################################
+# Disponibilidad por sitio / región
+###############################################
+def availability_data(request):
+    """
+    Disponibilidad calculada por el ETL para el rango pedido.
+
+    Parámetros: ?level=region|site, ?start/?end (AAAA-MM-DD), ?limit (sitios con
+    menor disponibilidad, por defecto 50) y ?site=CODIGO, que además devuelve los
+    intervalos de outage fusionados de ese sitio (recortados a cada partición y con
+    los abiertos hasta su final, por lo que suman sus outage_minutes).
+    """
+    start, end = parse_date_range(request.GET)
+    partitions = WeekPartition.objects.all()
+    if start is not None or end is not None:
+        partitions = partitions.filter(key__in=weeks_in_range(start, end))
+    partitions = [p for p in partitions if p.start and p.end]
+    weeks = {p.key: (p.end - p.start).total_seconds() / 60.0 for p in partitions}
+    level = request.GET.get('level', 'region')
+    site_code = request.GET.get('site')
+
+    if level == 'site' or site_code:
+        rows = SiteAvailability.objects.filter(week__in=list(weeks))
+        if site_code:
+            rows = rows.filter(site__code=site_code.upper())
+        rows = (
+            rows.values('site_id')
+            .annotate(outage=Sum('outage_minutes'), intervals=Sum('outage_intervals'),
+                      overlap=Sum('minor_overlap_minutes'))
+            .order_by('-outage')
         )
-    except Exception as e:
-        print("Error en consulta Gráfico 1:", e)
-        alarm_type_data = []
-
-    graph1_labels = [record['alarm_name'] for record in alarm_type_data]
-    graph1_counts = [record['total'] for record in alarm_type_data]
-
-    # --- Gráfico 2: Total de sitios con "MINOR RECT FAILURE" ---
-    try:
-        minor_site_count = (
-            Alarm.objects
-            .filter(alarm_name__icontains="MINOR RECT FAILURE")
-            .values('site_parsed_alarm')
-            .distinct()
-            .count()
+        try:
+            limit = int(request.GET.get('limit', 50))
+        except ValueError:
+            limit = 50
+        rows = list(rows[:limit])
+        names = dict(Site.objects.filter(id__in=[r['site_id'] for r in rows]).values_list('id', 'code'))
+        # Un sitio sin outages en una semana estuvo disponible toda esa semana
+        window = sum(weeks.values())
+        results = [{
+            'site': names[r['site_id']],
+            'outage_minutes': r['outage'],
+            'outage_intervals': r['intervals'],
+            'minor_overlap_minutes': r['overlap'],
+            'availability_pct': availability(r['outage'], window),
+        } for r in rows]
+    else:
+        rows = (
+            RegionAvailability.objects.filter(week__in=list(weeks))
+            .values('region_id')
+            .annotate(outage=Sum('outage_minutes'), intervals=Sum('outage_intervals'),
+                      overlap=Sum('minor_overlap_minutes'),
+                      site_window=Sum(F('window_minutes') * F('site_count')))
+            .order_by()
         )
-    except Exception as e:
-        print("Error en consulta Gráfico 2:", e)
-        minor_site_count = 0
-
-    # --- Gráfico 3: Falla más común por región ---
-    try:
-        region_alarm_data = (
-            Alarm.objects
-            .values('region', 'alarm_name')
-            .annotate(count=Count('id'))
+        names = dict(Region.objects.values_list('id', 'name'))
+        results = [{
+            'region': names.get(r['region_id'], ''),
+            'outage_minutes': r['outage'],
+            'outage_intervals': r['intervals'],
+            'minor_overlap_minutes': r['overlap'],
+            'availability_pct': availability(r['outage'], r['site_window']),
+        } for r in rows]
+
+    payload = {'level': 'site' if site_code else level, 'weeks': sorted(weeks), 'results': results}
+    if site_code:
+        outages = pd.DataFrame.from_records(
+            partitioned(Outage, start, end)
+            .filter(site__code=site_code.upper())
+            .values('site_id', 'week', 'outage_occurred_on', 'outage_cleared_on')
         )
-    except Exception as e:
-        print("Error en consulta Gráfico 3:", e)
-        region_alarm_data = []
-
-    # Agrupar por región, y obtener la alarma con mayor count
-    region_top = defaultdict(lambda: {'alarm_name': '', 'count': 0})
-    for record in region_alarm_data:
-        reg = record['region']
-        alarm = record['alarm_name']
-        count = record['count']
-        if count > region_top[reg]['count']:
-            region_top[reg] = {'alarm_name': alarm, 'count': count}
-
-    # Extraer para frontend
-    region_labels = list(region_top.keys())
-    region_top_counts = [region_top[reg]['count'] for reg in region_labels]
-    region_top_alarm = [region_top[reg]['alarm_name'] for reg in region_labels]
-
-    print("Regiones:", region_labels)
-    print("Fallas top:", region_top_alarm)
-    print("Conteos:", region_top_counts)
+        intervals = []
+        if not outages.empty:
+            # Igual que outage_minutes (clip_intervals): cada outage se recorta a la
+            # ventana de su partición y uno aún abierto dura hasta el final de ella
+            # (o hasta el fin pedido si la partición no tiene rango)
+            window_start = pd.to_datetime(outages['week'].map({p.key: p.start for p in partitions}),
+                                          utc=True)
+            window_end = pd.to_datetime(outages['week'].map({p.key: p.end for p in partitions}), utc=True)
+            cleared = pd.to_datetime(outages['outage_cleared_on'], utc=True).fillna(window_end)
+            if end is not None:
+                cleared = cleared.fillna(pd.Timestamp(end))
+            occurred = pd.to_datetime(outages['outage_occurred_on'], utc=True)
+            outages['outage_occurred_on'] = occurred.clip(lower=window_start, upper=window_end)
+            outages['outage_cleared_on'] = cleared.clip(lower=window_start, upper=window_end)
+            outages = outages[outages['outage_cleared_on'] > outages['outage_occurred_on']]
+            merged = merged_intervals(outages, 'site_id', 'outage_occurred_on', 'outage_cleared_on')
+            intervals = [{'start': row.start, 'end': row.end} for row in merged.itertuples()]
+        payload['merged_intervals'] = intervals
+    return JsonResponse(payload)
 
-    context = {
-        # Gráfico 1 y 2...
-        'graph1_labels': graph1_labels,
-        'graph1_counts': graph1_counts,
-        'minor_site_count': minor_site_count,
-        # Gráfico 3:
-        'region_labels': region_labels,
-        'region_top_counts': region_top_counts,
-        'region_top_alarm': region_top_alarm,
-    }
-    return render(request, 'dashboard_mas.html', context)
+
+###############################################
+# Calidad de datos (cuarentena)
+###############################################
+def data_quality(request):
+    """
+    Filas en cuarentena por semana, origen y motivo. Con ?week=AAAASS también
+    devuelve una muestra de filas rechazadas (?limit, por defecto 20).
+    """
+    rows = QuarantinedRow.objects.all()
+    week = request.GET.get('week')
+    if week and week.isdigit():
+        rows = rows.filter(week=int(week))
+    summary = list(
+        rows.values('week', 'source', 'reasons')
+        .annotate(rows=Count('id'))
+        .order_by('week', 'source', '-rows')
+    )
+    payload = {'summary': summary}
+    if week and week.isdigit():
+        try:
+            limit = int(request.GET.get('limit', 20))
+        except ValueError:
+            limit = 20
+        payload['rows'] = list(rows.order_by('id').values('source', 'sheet', 'reasons', 'raw')[:limit])
+    return JsonResponse(payload)
+
+
+###############################################
+# Reporte Excel por región
+###############################################
+def report_xlsx(request):
+    """
+    Descarga el reporte .xlsx (hoja Resumen + una hoja por región) de ?week=AAAASS
+    o de las semanas que cubre ?start/?end (sin parámetros: todas). Se escribe en un
+    archivo temporal en disco que FileResponse envía por bloques y borra al cerrar.
+    """
+    week = request.GET.get('week')
+    if week and week.isdigit():
+        weeks, filename = [int(week)], f"reporte_{week}.xlsx"
+    else:
+        start, end = parse_date_range(request.GET)
+        weeks = None if start is None and end is None else weeks_in_range(start, end)
+        filename = "reporte.xlsx"
+    report = tempfile.TemporaryFile()
+    write_report(report, weeks)
+    report.seek(0)
+    return FileResponse(
+        report, as_attachment=True, filename=filename,
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
@@ -0,0 +1,30 @@
+# Configuración de gunicorn para el contenedor (docker-compose.yml).
+# Uso: gunicorn -c gunicorn.conf.py core.wsgi:application
+# ASGI: GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker gunicorn -c gunicorn.conf.py core.asgi:application
+import os
+import multiprocessing
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Las vistas solo hacen consultas agregadas a SQLite y renderizan plantillas, así que
+# pocos procesos con algunos hilos cada uno bastan. El contenedor ve los CPUs del host,
+# por eso el límite real se fija con WEB_CONCURRENCY / GUNICORN_THREADS en docker-compose.yml.
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 5)))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Solo aplica a gthread; con el worker de uvicorn la concurrencia la da el event loop
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Cargar Django una vez antes del fork (memoria compartida copy-on-write)
+preload_app = True
+
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+# Reciclar procesos periódicamente para acotar el crecimiento de memoria
+max_requests = 1000
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')